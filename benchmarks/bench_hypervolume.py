@@ -0,0 +1,86 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Benchmarks of the hypervolume calculations, as the Pareto front
+grows."""
+
+from nevergrad.functions.multiobjective.hypervolume import (
+    HypervolumeIndicator
+)
+import numpy as np
+
+from force_nevergrad.engine.hypervolume import (
+    HypervolumeLoss,
+    hypervolume,
+    hypervolume_contribution
+)
+from force_nevergrad.engine.pareto_archive import ParetoArchive
+
+
+def _front(front_size, n_objectives, random_state):
+    """ Returns front_size mutually non-dominated points, on the unit
+    sphere in the positive orthant, and a reference point beyond them.
+    """
+    points = np.abs(random_state.normal(size=(front_size, n_objectives)))
+    points /= np.linalg.norm(points, axis=1)[:, np.newaxis]
+    return points, np.full(n_objectives, 1.1)
+
+
+class Hypervolume:
+    """ Cost of the plugin hypervolume, of the contribution of a new
+    point to it, and of the aggregate loss and Pareto archive updates
+    made on each evaluation."""
+
+    params = ([10, 100, 1000], [2, 3, 4])
+    param_names = ["front_size", "n_objectives"]
+
+    def setup(self, front_size, n_objectives):
+        random_state = np.random.RandomState(0)
+        self.front, self.reference = _front(
+            front_size, n_objectives, random_state)
+
+        # A new member of the front, and a point dominated by the
+        # first member
+        self.improving = 0.99 * _front(
+            1, n_objectives, random_state)[0][0]
+        self.dominated = 1.01 * self.front[0]
+
+        self.loss = HypervolumeLoss(
+            lambda *args: None, upper_bounds=self.reference)
+        for index, losses in enumerate(self.front):
+            self.loss.archive.add(((index,), {}), losses)
+        self.loss.volume = hypervolume(self.front, self.reference)
+
+    def time_hypervolume(self, front_size, n_objectives):
+        hypervolume(self.front, self.reference)
+
+    def time_hypervolume_contribution(self, front_size, n_objectives):
+        hypervolume_contribution(self.improving, self.front, self.reference)
+
+    def time_aggregate_loss(self, front_size, n_objectives):
+        # A dominated point leaves the loss unchanged between calls
+        self.loss.compute_aggregate_loss(self.dominated)
+
+    def time_pareto_archive(self, front_size, n_objectives):
+        archive = ParetoArchive(upper_bounds=self.reference)
+        for losses in self.front:
+            archive.add(None, losses)
+
+
+class NevergradHypervolume:
+    """ Cost of the nevergrad hypervolume indicator, for comparison with
+    the plugin hypervolume."""
+
+    params = ([10, 100, 1000], [2, 3, 4])
+    param_names = ["front_size", "n_objectives"]
+
+    def setup(self, front_size, n_objectives):
+        # Takes about a minute per call
+        if front_size * n_objectives >= 4000:
+            raise NotImplementedError
+        self.front, reference = _front(
+            front_size, n_objectives, np.random.RandomState(0))
+        self.indicator = HypervolumeIndicator(reference)
+
+    def time_hypervolume(self, front_size, n_objectives):
+        self.indicator.compute(list(self.front))
@@ -0,0 +1,74 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Benchmarks of the memory used by long optimization runs."""
+
+import sys
+
+from .common import ZeroCostObjective, make_optimizer, run_optimizer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _peak_memory():
+    """ Returns the peak resident memory of the process, in bytes"""
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, but kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak_memory
+    return peak_memory * 1024
+
+
+class MemoryGrowth:
+    """ Memory retained by the plugin optimizers as evaluations
+    accumulate, with an objective of negligible cost.
+
+    The nevergrad aggregate loss is left out, as recomputing the
+    hypervolume of its ever larger Pareto front makes runs of this
+    length impractical.
+    """
+
+    params = ["scalar", "hypervolume"]
+    param_names = ["aggregate_loss"]
+    timeout = 600
+
+    #: Number of evaluations over which memory growth is measured
+    n_evaluations = 10000
+
+    #: Number of evaluations made before measuring, so that the
+    #: optimizer and its caches are already set up
+    n_warmup = 100
+
+    def setup(self, aggregate_loss):
+        if resource is None:
+            raise NotImplementedError
+        probe = ZeroCostObjective()
+        self.objective = probe.objective
+        self.mco_params = probe.get_params()
+
+    def track_memory_growth(self, aggregate_loss):
+        optimizer = make_optimizer(
+            aggregate_loss, budget=self.n_warmup + self.n_evaluations)
+
+        # A verbose run yields after every evaluation, so the memory
+        # held by the optimizer can be measured mid-run. What the run
+        # retains only grows, so its peak tracks its current size.
+        start_memory = end_memory = 0
+        results = optimizer.optimize_function(
+            self.objective, self.mco_params, verbose_run=True)
+        for index, _ in enumerate(results, 1):
+            if index == self.n_warmup:
+                start_memory = _peak_memory()
+            elif index == self.n_warmup + self.n_evaluations:
+                end_memory = _peak_memory()
+
+        return (end_memory - start_memory) * 10000 / self.n_evaluations
+
+    track_memory_growth.unit = "bytes per 10k evaluations"
+
+    def peakmem_optimization(self, aggregate_loss):
+        optimizer = make_optimizer(aggregate_loss, budget=self.n_evaluations)
+        run_optimizer(optimizer, self.objective, self.mco_params)
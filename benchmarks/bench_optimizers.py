@@ -0,0 +1,163 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Benchmarks of the overhead and throughput of the plugin optimizers,
+with an objective of negligible cost."""
+
+import time
+
+import nevergrad as ng
+import numpy as np
+
+from force_nevergrad.engine.parameter_translation import (
+    translate_mco_to_ng
+)
+
+from .common import (
+    SurrogateObjective,
+    ZeroCostObjective,
+    make_optimizer,
+    run_optimizer,
+    sphere_objective,
+    sphere_parameters
+)
+
+
+class AskTellOverhead:
+    """ Time spent by the plugin on each ask and tell, over and above a
+    bare nevergrad ask and tell loop on the same objective."""
+
+    params = ["scalar", "nevergrad", "hypervolume"]
+    param_names = ["aggregate_loss"]
+    timeout = 300
+
+    #: Number of evaluations of each optimization
+    n_evaluations = 1000
+
+    #: Nevergrad algorithm driven by both loops
+    algorithm = "TwoPointsDE"
+
+    def setup(self, aggregate_loss):
+        probe = ZeroCostObjective()
+        self.objective = probe.objective
+        self.mco_params = probe.get_params()
+
+    def time_nevergrad(self, aggregate_loss):
+        self._run_nevergrad()
+
+    def time_plugin(self, aggregate_loss):
+        self._run_plugin(aggregate_loss)
+
+    def track_overhead_per_evaluation(self, aggregate_loss):
+        start_time = time.perf_counter()
+        self._run_nevergrad()
+        nevergrad_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        self._run_plugin(aggregate_loss)
+        plugin_time = time.perf_counter() - start_time
+
+        return 1e6 * (plugin_time - nevergrad_time) / self.n_evaluations
+
+    track_overhead_per_evaluation.unit = "microseconds"
+
+    def _run_nevergrad(self):
+        optimizer = ng.optimizers.registry[self.algorithm](
+            parametrization=translate_mco_to_ng(self.mco_params),
+            budget=self.n_evaluations
+        )
+        for _ in range(self.n_evaluations):
+            x = optimizer.ask()
+            value = self.objective(list(x.args))
+            optimizer.tell(x, float(np.sum(value)))
+
+    def _run_plugin(self, aggregate_loss):
+        optimizer = make_optimizer(
+            aggregate_loss,
+            algorithms=self.algorithm,
+            budget=self.n_evaluations
+        )
+        run_optimizer(optimizer, self.objective, self.mco_params)
+
+
+class Throughput:
+    """ Evaluations per second of the plugin optimizers, with an
+    objective of negligible cost evaluated in series or by a pool of
+    threads."""
+
+    params = (["scalar", "nevergrad", "hypervolume"], [1, 4])
+    param_names = ["aggregate_loss", "num_workers"]
+    timeout = 300
+
+    #: Number of evaluations of each optimization
+    n_evaluations = 1000
+
+    def setup(self, aggregate_loss, num_workers):
+        probe = ZeroCostObjective()
+        self.objective = probe.objective
+        self.mco_params = probe.get_params()
+
+    def track_evaluations_per_second(self, aggregate_loss, num_workers):
+        optimizer = make_optimizer(
+            aggregate_loss,
+            budget=self.n_evaluations,
+            num_workers=num_workers
+        )
+        run_optimizer(optimizer, self.objective, self.mco_params)
+        return optimizer.statistics.evaluations_per_second
+
+    track_evaluations_per_second.unit = "evaluations/s"
+
+
+class Encoding:
+    """ Time spent optimizing a parameter space of negligible cost to
+    evaluate, with each parameter a separate nevergrad parameter, or
+    with all of them packed into a single array."""
+
+    params = (["separate", "flat"], [10, 100, 300])
+    param_names = ["encoding", "n_dimensions"]
+    timeout = 300
+
+    #: Number of evaluations of each optimization
+    n_evaluations = 200
+
+    def setup(self, encoding, n_dimensions):
+        self.mco_params = sphere_parameters(n_dimensions)
+
+    def time_optimization(self, encoding, n_dimensions):
+        optimizer = make_optimizer(
+            "scalar",
+            budget=self.n_evaluations,
+            encoding=encoding
+        )
+        run_optimizer(optimizer, sphere_objective, self.mco_params)
+
+
+class BatchThroughput:
+    """ Evaluations per second of the plugin optimizers, with a cheap
+    surrogate objective evaluated one point at a time (batch_size 0) or
+    in batches by a single NumPy call."""
+
+    params = (["scalar", "hypervolume"], [0, 10, 100])
+    param_names = ["aggregate_loss", "batch_size"]
+    timeout = 300
+
+    #: Number of evaluations of each optimization
+    n_evaluations = 1000
+
+    def setup(self, aggregate_loss, batch_size):
+        probe = SurrogateObjective()
+        self.objective = (
+            probe.batch_objective if batch_size else probe.objective)
+        self.mco_params = probe.get_params()
+
+    def track_evaluations_per_second(self, aggregate_loss, batch_size):
+        optimizer = make_optimizer(
+            aggregate_loss,
+            budget=self.n_evaluations,
+            batch_size=batch_size
+        )
+        run_optimizer(optimizer, self.objective, self.mco_params)
+        return optimizer.statistics.evaluations_per_second
+
+    track_evaluations_per_second.unit = "evaluations/s"
@@ -0,0 +1,159 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Benchmarks of the quality of the Pareto front each algorithm finds
+within a fixed budget of evaluations."""
+
+import numpy as np
+
+from force_bdss.api import FixedMCOParameter
+
+from force_nevergrad.engine.hypervolume import hypervolume
+from force_nevergrad.engine.multi_fidelity import (
+    NevergradMultiFidelityOptimizer
+)
+from force_nevergrad.engine.nevergrad_optimizers import (
+    NevergradMultiOptimizer
+)
+from force_nevergrad.engine.surrogate import SURROGATES
+
+from .common import (
+    FidelityObjective,
+    PROBE_OBJECTIVES,
+    minimization_function,
+    run_optimizer
+)
+
+
+class SampleEfficiency:
+    """ Hypervolume and size of the Pareto front of the probe objectives
+    found by each algorithm."""
+
+    params = (
+        ["TwoPointsDE", "OnePlusOne", "CMA", "PSO", "DE", "RandomSearch"],
+        list(PROBE_OBJECTIVES)
+    )
+    param_names = ["algorithm", "objective"]
+    timeout = 300
+
+    #: Number of evaluations of each optimization
+    budget = 200
+
+    def setup(self, algorithm, objective):
+        probe_class, reference = PROBE_OBJECTIVES[objective]
+        probe = probe_class()
+        self.reference = reference
+
+        # nevergrad draws its random state from numpy's
+        np.random.seed(0)
+        self.optimizer = NevergradMultiOptimizer(
+            algorithms=algorithm,
+            budget=self.budget,
+            upper_bounds=reference,
+            aggregate_loss="hypervolume"
+        )
+        run_optimizer(
+            self.optimizer, minimization_function(probe), probe.get_params())
+
+    def track_front_hypervolume(self, algorithm, objective):
+        return hypervolume(self.optimizer.archive.losses(), self.reference)
+
+    track_front_hypervolume.unit = "hypervolume"
+
+    def track_front_size(self, algorithm, objective):
+        return len(self.optimizer.archive)
+
+    track_front_size.unit = "points"
+
+
+class SurrogateEfficiency:
+    """ Hypervolume of the Pareto front of the probe objectives found
+    with candidates pre-screened by each surrogate model, or without
+    pre-screening, along with the time spent on the surrogate."""
+
+    params = (["none"] + list(SURROGATES), list(PROBE_OBJECTIVES))
+    param_names = ["surrogate", "objective"]
+    timeout = 300
+
+    #: Number of evaluations of each optimization
+    budget = 100
+
+    #: Number of candidates screened for each evaluation
+    screening_ratio = 10
+
+    def setup(self, surrogate, objective):
+        probe_class, reference = PROBE_OBJECTIVES[objective]
+        probe = probe_class()
+        self.reference = reference
+
+        np.random.seed(0)
+        self.optimizer = NevergradMultiOptimizer(
+            budget=self.budget,
+            upper_bounds=reference,
+            aggregate_loss="hypervolume",
+            screening_ratio=self.screening_ratio
+        )
+        if surrogate != "none":
+            self.optimizer.surrogate = SURROGATES[surrogate]()
+        run_optimizer(
+            self.optimizer, minimization_function(probe), probe.get_params())
+
+    def track_front_hypervolume(self, surrogate, objective):
+        return hypervolume(self.optimizer.archive.losses(), self.reference)
+
+    track_front_hypervolume.unit = "hypervolume"
+
+    def track_surrogate_seconds(self, surrogate, objective):
+        if self.optimizer.surrogate is None:
+            return 0.0
+        statistics = self.optimizer.surrogate.statistics()
+        return statistics["fit_time"] + statistics["predict_time"]
+
+    track_surrogate_seconds.unit = "seconds"
+
+
+class MultiFidelityEfficiency:
+    """ Hypervolume of the Pareto front of the FidelityObjective found
+    for the same total cost, evaluating every candidate at full
+    fidelity, or screening them at low fidelity by successive halving
+    or hyperband."""
+
+    params = ["full", "successive_halving", "hyperband"]
+    param_names = ["schedule"]
+    timeout = 300
+
+    #: Total cost of each optimization, in full fidelity evaluations
+    n_full_evaluations = 60
+
+    def setup(self, schedule):
+        probe = FidelityObjective()
+        self.reference = probe.reference
+        params = probe.get_params()
+        traits = dict(
+            budget=10 * self.n_full_evaluations,
+            cost_budget=float(self.n_full_evaluations * probe.fidelities[-1]),
+            cost_function=probe.cost,
+            upper_bounds=self.reference,
+            aggregate_loss="hypervolume",
+        )
+
+        np.random.seed(0)
+        if schedule == "full":
+            params[0] = FixedMCOParameter(
+                factory=None, value=probe.fidelities[-1])
+            self.optimizer = NevergradMultiOptimizer(**traits)
+        else:
+            self.optimizer = NevergradMultiFidelityOptimizer(
+                schedule=schedule, fidelities=probe.fidelities, **traits)
+        run_optimizer(
+            self.optimizer, minimization_function(probe), params)
+
+    def track_front_hypervolume(self, schedule):
+        return hypervolume(self.optimizer.archive.losses(), self.reference)
+
+    track_front_hypervolume.unit = "hypervolume"
+
+    def track_full_fidelity_evaluations(self, schedule):
+        return self.optimizer.statistics.n_evaluations
+
+    track_full_fidelity_evaluations.unit = "evaluations"
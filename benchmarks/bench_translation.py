@@ -0,0 +1,63 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Benchmarks of the translation between MCO and nevergrad
+parameters."""
+
+from functools import partial
+
+from force_nevergrad.engine.nevergrad_optimizers import (
+    nevergrad_function
+)
+from force_nevergrad.engine.parameter_translation import (
+    translate_mco_to_ng,
+    translate_ng_to_mco,
+    translation_plan
+)
+from force_nevergrad.tests.probe_classes.optimizer import (
+    GridValleyObjective,
+    TwoMinimaObjective
+)
+
+
+def _zero_cost(mco_params):
+    return 0.0
+
+
+class Translation:
+    """ Cost of translating parameters, for parametrizations repeating
+    those of the probe objectives: two listed parameters and a ranged
+    vector."""
+
+    params = [1, 10, 100]
+    param_names = ["n_repeats"]
+
+    def setup(self, n_repeats):
+        self.mco_params = (
+            GridValleyObjective().get_params()
+            + TwoMinimaObjective().get_params()
+        ) * n_repeats
+        instrumentation = translate_mco_to_ng(self.mco_params)
+        self.ng_values = list(instrumentation.spawn_child().args)
+        self.function = partial(nevergrad_function, function=_zero_cost)
+        self.plan = translation_plan(self.mco_params)
+        self.plan_function = partial(
+            nevergrad_function, function=_zero_cost, plan=self.plan)
+
+    def time_translate_mco_to_ng(self, n_repeats):
+        translate_mco_to_ng(self.mco_params)
+
+    def time_translate_ng_to_mco(self, n_repeats):
+        translate_ng_to_mco(self.ng_values)
+
+    def time_translation_plan(self, n_repeats):
+        translation_plan(self.mco_params)
+
+    def time_plan_to_mco(self, n_repeats):
+        self.plan.to_mco(self.ng_values)
+
+    def time_nevergrad_function(self, n_repeats):
+        self.function(*self.ng_values)
+
+    def time_nevergrad_function_plan(self, n_repeats):
+        self.plan_function(*self.ng_values)
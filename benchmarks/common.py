@@ -0,0 +1,181 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Objectives and helpers shared by the benchmark suites."""
+
+import numpy as np
+
+from force_bdss.api import ListedMCOParameter, RangedMCOParameter
+
+from force_nevergrad.engine.nevergrad_optimizers import (
+    NevergradMultiOptimizer,
+    NevergradScalarOptimizer
+)
+from force_nevergrad.tests.probe_classes.optimizer import (
+    GridValleyObjective,
+    TwoMinimaObjective
+)
+
+
+class ZeroCostObjective(TwoMinimaObjective):
+    """ Two conflicting quadratic objectives on the x-y plane, of
+    negligible cost to evaluate.
+    Useful for:
+    Measuring the overhead of the plugin itself, as almost all of the
+    time of an optimization is spent outside of the objective.
+    """
+
+    def objective(self, p):
+        x, y = p[0]
+        return np.array([x * x + y * y, (x - 1.0) ** 2 + y * y])
+
+
+class SurrogateObjective(TwoMinimaObjective):
+    """ Two objectives interpolated by Gaussian radial basis functions
+    over a fixed set of centres, like a cheap surrogate model of a
+    workflow.
+    Useful for:
+    Measuring the gain of evaluating many points in a single NumPy
+    call, with batch_objective, over evaluating them one at a time.
+    """
+
+    #: Number of centres of the radial basis functions
+    n_centres = 500
+
+    def __init__(self):
+        random_state = np.random.RandomState(0)
+        self.centres = random_state.uniform(
+            -2.0, 2.0, size=(self.n_centres, 2))
+        self.weights = random_state.normal(size=(self.n_centres, 2))
+
+    def objective(self, p):
+        return self.batch_objective(np.array([p[0]]))[0]
+
+    def batch_objective(self, parameters):
+        squared_distances = np.sum(
+            (parameters[:, np.newaxis, :] - self.centres) ** 2, axis=2)
+        return np.exp(-squared_distances) @ self.weights
+
+
+class FidelityObjective(TwoMinimaObjective):
+    """ Two conflicting quadratic objectives on the x-y plane, both
+    minimized, computed to a fidelity given by a first, listed
+    parameter, as a number of iterations. Errors fall as the inverse
+    of the fidelity, down to none at the highest, while the cost of an
+    evaluation, given by cost, is the fidelity itself.
+    Useful for:
+    Comparing the Pareto fronts found for the same total cost with and
+    without screening candidates at low fidelity.
+    """
+
+    #: Values of the fidelity parameter
+    fidelities = [1, 3, 9, 27]
+
+    #: Reference point of the hypervolume of the Pareto front
+    reference = [4.0, 4.0]
+
+    def get_params(self):
+        return [
+            ListedMCOParameter(
+                name="iterations",
+                factory=None,
+                levels=self.fidelities
+            )
+        ] + super(FidelityObjective, self).get_params()
+
+    def get_kpis(self):
+        kpis = super(FidelityObjective, self).get_kpis()
+        for kpi in kpis:
+            kpi.objective = "MINIMISE"
+        return kpis
+
+    def objective(self, p):
+        fidelity = p[0]
+        x, y = p[1]
+        error = (1.0 / fidelity - 1.0 / self.fidelities[-1]) * np.array(
+            [np.sin(5.0 * x), np.cos(5.0 * y)])
+        return np.array([x * x + y * y, (x - 1.0) ** 2 + y * y]) + error
+
+    def cost(self, p, value):
+        return float(p[0])
+
+
+#: Probe objectives used to compare the sample efficiency of the
+#: algorithms, with the reference point of the hypervolume of their
+#: Pareto fronts
+PROBE_OBJECTIVES = {
+    "GridValley": (GridValleyObjective, [2.5, 2.5]),
+    "TwoMinima": (TwoMinimaObjective, [0.0, 0.0])
+}
+
+
+def sphere_parameters(n_dimensions):
+    """ Returns a parameter space of n_dimensions, alternating ranged
+    and listed parameters over [-1, 1], for the sphere_objective.
+    """
+    params = []
+    for index in range(n_dimensions):
+        if index % 2:
+            params.append(ListedMCOParameter(
+                factory=None,
+                levels=list(np.linspace(-1.0, 1.0, 21))
+            ))
+        else:
+            params.append(RangedMCOParameter(
+                factory=None,
+                lower_bound=-1.0,
+                upper_bound=1.0,
+                initial_value=0.5
+            ))
+    return params
+
+
+def sphere_objective(p):
+    """ Sum of squares of the parameter values, of negligible cost"""
+    return float(np.sum(np.square(p)))
+
+
+def minimization_function(probe):
+    """ Returns the minimization score function of a probe objective,
+    negating the KPIs that are to be maximised.
+
+    Parameters
+    ----------
+    probe: BaseObjective
+        The probe objective
+
+    Return
+    ------
+    Callable
+        Function of a list of MCO parameter values, returning an
+        array of scores to be minimized
+    """
+    signs = np.array([
+        -1.0 if kpi.objective == "MAXIMISE" else 1.0
+        for kpi in probe.get_kpis()
+    ])
+
+    def function(p):
+        return signs * probe.objective(p)
+
+    return function
+
+
+def make_optimizer(aggregate_loss, **traits):
+    """ Returns a plugin optimizer: the scalar optimizer if the
+    aggregate loss is "scalar", or otherwise the multi-objective
+    optimizer with that aggregate loss. Unless given, the upper bounds
+    of both objectives of the ZeroCostObjective are estimated from a
+    calibration sample.
+    """
+    if aggregate_loss == "scalar":
+        return NevergradScalarOptimizer(**traits)
+    traits.setdefault("upper_bounds", [None, None])
+    return NevergradMultiOptimizer(aggregate_loss=aggregate_loss, **traits)
+
+
+def run_optimizer(optimizer, function, params, verbose_run=False):
+    """ Runs an optimization to completion, discarding its results."""
+    for _ in optimizer.optimize_function(
+            function, params, verbose_run=verbose_run):
+        pass
@@ -0,0 +1,128 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import itertools
+from unittest import TestCase
+
+from benchmarks.bench_hypervolume import Hypervolume, NevergradHypervolume
+from benchmarks.bench_memory import MemoryGrowth
+from benchmarks.bench_optimizers import (
+    AskTellOverhead,
+    BatchThroughput,
+    Encoding,
+    Throughput
+)
+from benchmarks.bench_sample_efficiency import (
+    MultiFidelityEfficiency,
+    SampleEfficiency,
+    SurrogateEfficiency
+)
+from benchmarks.bench_translation import Translation
+
+#: Prefixes of the benchmark methods run by asv
+BENCHMARK_PREFIXES = ("time_", "track_", "peakmem_")
+
+
+def run_suite(suite_class, params=None, **attributes):
+    """ Runs every benchmark of a suite, for every combination of its
+    parameters, overriding the suite attributes to keep it quick.
+
+    Parameters
+    ----------
+    suite_class: type
+        The asv benchmark suite
+    params: list or tuple of list, optional
+        Parameters replacing those of the suite, such as smaller
+        sizes than are worth timing
+    **attributes: Any
+        Suite attributes to override
+
+    Returns
+    -------
+    dict
+        The value returned by each benchmark, keyed by its name and
+        parameters
+    """
+    if params is None:
+        params = suite_class.params
+    if not isinstance(params, tuple):
+        params = (params,)
+
+    results = {}
+    for combination in itertools.product(*params):
+        suite = suite_class()
+        for name, value in attributes.items():
+            setattr(suite, name, value)
+        try:
+            suite.setup(*combination)
+        except NotImplementedError:
+            continue
+        for name in dir(suite):
+            if name.startswith(BENCHMARK_PREFIXES):
+                results[(name,) + combination] = getattr(suite, name)(
+                    *combination)
+    return results
+
+
+class TestBenchmarks(TestCase):
+
+    def test_optimizers(self):
+        results = run_suite(AskTellOverhead, n_evaluations=20)
+        self.assertEqual(9, len(results))
+
+        results = run_suite(Throughput, n_evaluations=20)
+        self.assertEqual(6, len(results))
+        for value in results.values():
+            self.assertGreater(value, 0)
+
+        results = run_suite(Encoding, n_evaluations=20)
+        self.assertEqual(6, len(results))
+
+        results = run_suite(BatchThroughput, n_evaluations=20)
+        self.assertEqual(6, len(results))
+        for value in results.values():
+            self.assertGreater(value, 0)
+
+    def test_translation(self):
+        results = run_suite(Translation, params=[1])
+        self.assertEqual(6, len(results))
+
+    def test_hypervolume(self):
+        results = run_suite(Hypervolume, params=([10], [2, 3, 4]))
+        self.assertEqual(12, len(results))
+
+    def test_nevergrad_hypervolume(self):
+        results = run_suite(NevergradHypervolume, params=([10], [2, 3, 4]))
+        self.assertEqual(3, len(results))
+
+        # The largest front in four dimensions is skipped
+        self.assertEqual(
+            {}, run_suite(NevergradHypervolume, params=([1000], [4])))
+
+    def test_memory(self):
+        results = run_suite(MemoryGrowth, n_warmup=5, n_evaluations=20)
+        self.assertEqual(4, len(results))
+        for key, value in results.items():
+            if key[0] == "track_memory_growth":
+                self.assertGreaterEqual(value, 0)
+
+    def test_sample_efficiency(self):
+        results = run_suite(SampleEfficiency, budget=20)
+        self.assertEqual(24, len(results))
+        for key, value in results.items():
+            if key[0] == "track_front_size":
+                self.assertGreater(value, 0)
+
+    def test_surrogate_efficiency(self):
+        results = run_suite(SurrogateEfficiency, budget=30)
+        self.assertEqual(12, len(results))
+        for key, value in results.items():
+            if key[0] == "track_surrogate_seconds" and key[1] != "none":
+                self.assertGreater(value, 0)
+
+    def test_multi_fidelity_efficiency(self):
+        results = run_suite(MultiFidelityEfficiency, n_full_evaluations=5)
+        self.assertEqual(6, len(results))
+        for key, value in results.items():
+            if key[0] == "track_full_fidelity_evaluations":
+                self.assertGreater(value, 0)
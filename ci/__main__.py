@@ -98,6 +98,36 @@ def coverage(python_version):
         )
 
 
+@cli.command(help="Runs the performance benchmarks")
+@python_version_option
+@click.option(
+    "--quick", is_flag=True, help="Run each benchmark only once."
+)
+@click.option(
+    "--bench", default=None, help="Regular expression of benchmarks to run."
+)
+def benchmark(python_version, quick, bench):
+    env_name = get_env_name(python_version)
+
+    returncode = edm_run(env_name, ["pip", "install", "asv"])
+    if returncode:
+        raise click.ClickException("Error while installing asv.")
+
+    returncode = edm_run(env_name, ["asv", "machine", "--yes"])
+    if returncode:
+        raise click.ClickException("Error while configuring asv.")
+
+    cmd = ["asv", "run", "--python=same", "--show-stderr"]
+    if quick:
+        cmd.append("--quick")
+    if bench:
+        cmd.extend(["--bench", bench])
+
+    returncode = edm_run(env_name, cmd)
+    if returncode:
+        raise click.ClickException("There were benchmark failures.")
+
+
 @cli.command(help="Builds the documentation")
 @python_version_option
 @click.option("--apidoc-only", is_flag=True, help="Only generate API doc.")
@@ -0,0 +1,607 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import asyncio
+from concurrent.futures import Future
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from traits.api import (
+    Any,
+    Bool,
+    Callable,
+    Float,
+    HasStrictTraits,
+    Int,
+    List,
+    Property,
+    Str
+)
+
+log = logging.getLogger(__name__)
+
+#: Largest message of the broker protocol, in bytes
+MESSAGE_LIMIT = 2 ** 24
+
+
+def encode_message(message):
+    """ Encodes a message of the broker protocol: a JSON object, with
+    a "type" entry, on a single line.
+
+    Parameters
+    ----------
+    message: dict
+        The message
+
+    Return
+    ------
+    bytes
+        The line of the message, including the newline
+    """
+    data = json.dumps(message, separators=(',', ':'))
+    return (data + '\n').encode('utf-8')
+
+
+def decode_message(line):
+    """ Decodes a line of the broker protocol into a message.
+
+    Raises
+    ------
+    ValueError
+        If the line is not a message of the protocol
+    """
+    message = json.loads(line.decode('utf-8'))
+    if not isinstance(message, dict) or "type" not in message:
+        raise ValueError("Not a broker message: {!r}".format(line))
+    return message
+
+
+def parse_address(address):
+    """ Splits a "host:port" address into its host and port number.
+
+    Raises
+    ------
+    ValueError
+        If the address has no host or port number
+    """
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(
+            "Broker addresses must be 'host:port', not {!r}".format(
+                address))
+    return host, int(port)
+
+
+def serializable(value):
+    """ Converts MCO parameter values, which may be numpy arrays or
+    scalars, into values that can be encoded as JSON"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [serializable(element) for element in value]
+    return value
+
+
+class _Task:
+    """ A set of MCO parameter values to evaluate, and the future of
+    its KPI values"""
+
+    def __init__(self, task_id, parameters):
+        self.id = task_id
+        self.parameters = parameters
+        self.attempts = 0
+        self.future = Future()
+
+
+class TaskBroker(HasStrictTraits):
+    """ Distributes the evaluation of MCO parameter values to worker
+    processes, possibly on other nodes, connected to it over TCP.
+
+    The broker listens on its address from a background thread running
+    its own event loop, so evaluations can be submitted from any thread
+    or event loop. Each connected worker is sent one task at a time.
+    A worker that sends no message for heartbeat_timeout seconds, or
+    whose connection is closed, is considered lost, and its task, if
+    any, is re-queued for another worker, up to max_attempts times.
+    Queued tasks fail once no worker has been connected for
+    worker_timeout seconds.
+
+    Workers started with run_worker can either be started by hand on
+    any node, or by the broker itself on this machine (local_workers).
+
+    The broker does not authenticate its workers, nor encrypt their
+    connections: anyone able to connect to its address is sent the
+    parameter values, and can report KPI values. Its address must
+    therefore be on a trusted interface or network only, such as the
+    loopback interface (the default) or a private cluster network.
+
+    Notes
+    -----
+    Messages are JSON objects on a single line, with a "type" entry:
+
+    - "hello" (worker): first message of a worker, with its "worker"
+      name
+    - "task" (broker): the "parameters" of a task to evaluate, and its
+      "id"
+    - "result" (worker): the "kpis" of the task "id"
+    - "error" (worker): the error "message" of the failed task "id"
+    - "heartbeat" (worker): sent every few seconds while connected
+    - "shutdown" (broker): asks the worker to exit
+    """
+
+    #: Address the broker listens on, as "host:port" (port 0 picks
+    #: any free port)
+    address = Str("127.0.0.1:0")
+
+    #: Address workers on this machine connect to, with the actual port
+    bound_address = Property(Str)
+
+    #: Seconds without a message from a worker evaluating a task, after
+    #: which the worker is considered lost
+    heartbeat_timeout = Float(30.0)
+
+    #: Number of workers a task is sent to before it fails
+    max_attempts = Int(3)
+
+    #: Seconds queued tasks wait while no worker is connected, after
+    #: which they fail (0 waits forever)
+    worker_timeout = Float(300.0)
+
+    #: Number of worker processes started on this machine
+    local_workers = Int(0)
+
+    #: Function evaluating a list of MCO parameter values in the local
+    #: workers, returning their KPI values
+    local_function = Callable()
+
+    #: Seconds between the heartbeats of the local workers (by default,
+    #: a quarter of the heartbeat timeout)
+    heartbeat_interval = Float()
+
+    #: Number of tasks completed by the workers
+    n_completed = Int(0)
+
+    #: Number of tasks re-queued after their worker was lost
+    n_requeued = Int(0)
+
+    #: Names of the connected workers
+    workers = List(Str)
+
+    #: Listening socket
+    _socket = Any()
+
+    #: Event loop of the broker thread
+    _loop = Any()
+
+    #: Thread running the event loop
+    _thread = Any()
+
+    #: Tasks waiting for a worker
+    _queue = Any()
+
+    #: Writers of the connections to the workers
+    _writers = Any()
+
+    #: Tasks serving the connected workers
+    _handlers = Any()
+
+    #: Task failing the queued tasks when no worker is connected
+    _watcher = Any()
+
+    #: Time since which no worker has been connected
+    _idle_since = Float()
+
+    #: Whether or not the broker is closing
+    _closing = Bool(False)
+
+    #: Local worker processes
+    _processes = List()
+
+    #: Source of task identifiers
+    _task_ids = Any()
+
+    def _heartbeat_interval_default(self):
+        return self.heartbeat_timeout / 4
+
+    def _get_bound_address(self):
+        host, port = self._socket.getsockname()[:2]
+        if host in ("0.0.0.0", "::"):
+            host = "127.0.0.1"
+        return "{}:{}".format(host, port)
+
+    def start(self):
+        """ Starts listening for workers, after starting the local
+        workers, if any"""
+        host, port = parse_address(self.address)
+        self._socket = socket.socket()
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._socket.listen()
+
+        # Local workers are started before the broker thread, so they
+        # are not forked with it. They can connect as soon as the
+        # socket is listening.
+        for index in range(self.local_workers):
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(self.bound_address, self.local_function),
+                kwargs=dict(
+                    heartbeat_interval=self.heartbeat_interval,
+                    name="local-{}".format(index)
+                ),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        self._task_ids = itertools.count()
+        self._writers = set()
+        self._handlers = set()
+        self._closing = False
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run_loop, args=(started,), daemon=True)
+        self._thread.start()
+        started.wait()
+        log.info("Task broker listening on {}".format(
+            "{}:{}".format(*self._socket.getsockname()[:2])))
+
+    def submit(self, parameter_values):
+        """ Queues the evaluation of a list of MCO parameter values by
+        the workers.
+
+        Return
+        ------
+        concurrent.futures.Future
+            The future list of KPI values
+        """
+        if self._loop is None or self._loop.is_closed():
+            raise RuntimeError("The task broker is not running")
+        task = _Task(next(self._task_ids), serializable(parameter_values))
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, task)
+        return task.future
+
+    def evaluate(self, parameter_values):
+        """ Returns the KPI values of a list of MCO parameter values,
+        once a worker has evaluated them.
+
+        Raises
+        ------
+        RuntimeError
+            If the evaluation failed, or every worker it was sent to
+            was lost
+        TimeoutError
+            If no worker was connected for worker_timeout seconds while
+            the evaluation was queued
+        """
+        return np.array(self.submit(parameter_values).result())
+
+    async def evaluate_async(self, parameter_values):
+        """ Coroutine counterpart of evaluate"""
+        kpis = await asyncio.wrap_future(self.submit(parameter_values))
+        return np.array(kpis)
+
+    def close(self):
+        """ Asks the workers to exit, and stops listening. Evaluations
+        still waiting for a worker fail."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(
+            self._shutdown(), self._loop).result()
+        self._thread.join()
+        self._socket.close()
+
+        for process in self._processes:
+            process.join(timeout=self.heartbeat_interval)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+        log.info(
+            "Task broker: {n_completed} tasks completed, {n_requeued} "
+            "re-queued".format(**self.statistics()))
+
+    def statistics(self):
+        """ Returns a summary of the tasks and workers"""
+        return {
+            'n_completed': self.n_completed,
+            'n_requeued': self.n_requeued,
+            'n_workers': len(self.workers)
+        }
+
+    def _run_loop(self, started):
+        """Serves the workers from the broker thread, until the broker
+        closes"""
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        server = self._loop.run_until_complete(asyncio.start_server(
+            self._accept, sock=self._socket, limit=MESSAGE_LIMIT))
+        self._idle_since = self._loop.time()
+        self._watcher = asyncio.ensure_future(self._watch_workers())
+        started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    async def _shutdown(self):
+        """Fails the tasks still queued, asks the workers to exit, and
+        stops the event loop once their connections are closed"""
+        self._closing = True
+        while not self._queue.empty():
+            self._fail(
+                self._queue.get_nowait(),
+                RuntimeError("The task broker was closed"))
+
+        for writer in list(self._writers):
+            try:
+                writer.write(encode_message({"type": "shutdown"}))
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+        handlers = list(self._handlers) + [self._watcher]
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        self._loop.stop()
+
+    async def _watch_workers(self):
+        """Fails the queued tasks once no worker has been connected for
+        worker_timeout seconds"""
+        while True:
+            await asyncio.sleep(min(1.0, self.worker_timeout / 4 or 1.0))
+            if self.workers or not self.worker_timeout:
+                continue
+            idle_time = self._loop.time() - self._idle_since
+            if idle_time < self.worker_timeout:
+                continue
+            while not self._queue.empty():
+                self._fail(self._queue.get_nowait(), TimeoutError(
+                    "No worker connected to the task broker for {:.0f} "
+                    "seconds".format(idle_time)))
+
+    def _accept(self, reader, writer):
+        """Serves a newly connected worker, unless the broker is
+        closing"""
+        if self._closing:
+            writer.close()
+            return
+        handler = asyncio.ensure_future(self._serve_worker(reader, writer))
+        self._handlers.add(handler)
+        handler.add_done_callback(self._handlers.discard)
+
+    async def _serve_worker(self, reader, writer):
+        """Sends tasks to a newly connected worker, one at a time,
+        until it is lost or the broker closes"""
+        try:
+            hello = decode_message(await asyncio.wait_for(
+                reader.readline(), self.heartbeat_timeout))
+        except (asyncio.CancelledError, asyncio.TimeoutError, ValueError,
+                ConnectionError):
+            writer.close()
+            return
+        if self._closing:
+            # The hello arrived as the broker was cancelling the handler
+            writer.close()
+            return
+        name = str(hello.get("worker", writer.get_extra_info("peername")))
+
+        self._writers.add(writer)
+        self.workers.append(name)
+        log.info("Worker {} connected".format(name))
+
+        # Messages are read as long as the worker is connected, so an
+        # idle worker that is lost is not sent a task
+        messages = asyncio.Queue()
+        listener = asyncio.ensure_future(
+            self._read_messages(reader, messages))
+        task = None
+        try:
+            while not self._closing:
+                task = await self._while_connected(
+                    self._queue.get(), listener)
+                if task.future.done():
+                    task = None
+                    continue
+                if listener.done():
+                    # Lost as the task was taken from the queue
+                    self._queue.put_nowait(task)
+                    task = None
+                    listener.result()
+                task.attempts += 1
+                writer.write(encode_message({
+                    "type": "task",
+                    "id": task.id,
+                    "parameters": task.parameters
+                }))
+                await writer.drain()
+                await self._receive_result(messages, listener, task, name)
+                task = None
+        except (asyncio.TimeoutError, ConnectionError, ValueError) as error:
+            log.warning("Worker {} lost: {}".format(
+                name, str(error) or type(error).__name__))
+            if task is not None:
+                self._requeue(task)
+                task = None
+        except asyncio.CancelledError:
+            # The broker closed while waiting for the worker
+            pass
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            if task is not None:
+                self._fail(task, RuntimeError("The task broker was closed"))
+            self._writers.discard(writer)
+            self.workers.remove(name)
+            if not self.workers:
+                self._idle_since = self._loop.time()
+            writer.close()
+
+    async def _read_messages(self, reader, messages):
+        """Reads the messages of a worker, queueing the outcomes of its
+        tasks, until it is lost"""
+        while True:
+            line = await asyncio.wait_for(
+                reader.readline(), self.heartbeat_timeout)
+            if not line:
+                raise ConnectionError("connection closed")
+            message = decode_message(line)
+            if message["type"] in ("result", "error"):
+                messages.put_nowait(message)
+
+    async def _while_connected(self, coroutine, listener):
+        """Awaits a coroutine, unless the worker read by the listener is
+        lost first, raising the error it was lost with"""
+        future = asyncio.ensure_future(coroutine)
+        try:
+            await asyncio.wait(
+                {future, listener}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not future.done():
+                future.cancel()
+        if future.done() and not future.cancelled():
+            return future.result()
+        return listener.result()
+
+    async def _receive_result(self, messages, listener, task, name):
+        """Waits for the outcome of the task sent to a worker"""
+        while True:
+            message = await self._while_connected(messages.get(), listener)
+            if message.get("id") != task.id:
+                # Stale messages
+                continue
+            if message["type"] == "result":
+                self.n_completed += 1
+                if not task.future.done():
+                    task.future.set_result(message["kpis"])
+            else:
+                self._fail(task, RuntimeError(
+                    "Evaluation failed on worker {}: {}".format(
+                        name, message.get("message"))))
+            return
+
+    def _requeue(self, task):
+        """Queues the task of a lost worker again, unless it has been
+        sent to max_attempts workers already"""
+        if self._closing:
+            self._fail(task, RuntimeError("The task broker was closed"))
+            return
+        if task.attempts >= self.max_attempts:
+            self._fail(task, RuntimeError(
+                "Task {} was lost by {} workers".format(
+                    task.id, task.attempts)))
+            return
+        self.n_requeued += 1
+        self._queue.put_nowait(task)
+
+    def _fail(self, task, error):
+        """Fails the evaluation of a task, unless it is already done"""
+        if not task.future.done():
+            task.future.set_exception(error)
+
+
+def run_worker(address, evaluate, heartbeat_interval=5.0, name=None,
+               connect_timeout=30.0):
+    """ Connects to a TaskBroker and evaluates the tasks it sends,
+    until it shuts down or the connection is lost. The connection is
+    neither authenticated nor encrypted, so the broker must be reached
+    over a trusted network.
+
+    Parameters
+    ----------
+    address: str
+        Address of the broker, as "host:port"
+    evaluate: Callable
+        Function evaluating a list of MCO parameter values, returning
+        their KPI values
+    heartbeat_interval: float, optional
+        Seconds between heartbeats sent to the broker, which must be
+        shorter than its heartbeat_timeout
+    name: str, optional
+        Name of the worker, by default its host name and process id
+    connect_timeout: float, optional
+        Seconds to keep trying to connect to the broker
+
+    Return
+    ------
+    int
+        The number of tasks evaluated
+    """
+    host, port = parse_address(address)
+    if name is None:
+        name = "{}-{}".format(socket.gethostname(), os.getpid())
+
+    connection = _connect(host, port, connect_timeout)
+    lock = threading.Lock()
+    stopped = threading.Event()
+
+    def send(message):
+        with lock:
+            connection.sendall(encode_message(message))
+
+    def send_heartbeats():
+        while not stopped.wait(heartbeat_interval):
+            try:
+                send({"type": "heartbeat"})
+            except OSError:
+                return
+
+    send({"type": "hello", "worker": name})
+    threading.Thread(target=send_heartbeats, daemon=True).start()
+
+    n_tasks = 0
+    try:
+        with connection.makefile('rb') as lines:
+            for line in lines:
+                message = decode_message(line)
+                if message["type"] == "shutdown":
+                    break
+                if message["type"] != "task":
+                    continue
+                try:
+                    kpis = np.asarray(
+                        evaluate(message["parameters"]), dtype=float)
+                except Exception as error:
+                    log.exception("Evaluation of task {} failed".format(
+                        message["id"]))
+                    send({"type": "error", "id": message["id"],
+                          "message": repr(error)})
+                else:
+                    send({"type": "result", "id": message["id"],
+                          "kpis": kpis.tolist()})
+                n_tasks += 1
+    except OSError as error:
+        log.warning("Connection to the broker lost: {}".format(error))
+    finally:
+        stopped.set()
+        connection.close()
+    return n_tasks
+
+
+def _connect(host, port, timeout):
+    """Connects to the broker, retrying until the timeout"""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            connection = socket.create_connection((host, port), timeout)
+        except OSError:
+            if time.time() >= deadline:
+                raise
+            time.sleep(0.1)
+        else:
+            connection.settimeout(None)
+            return connection
@@ -0,0 +1,123 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import logging
+import os
+import pickle
+import time
+
+from traits.api import (
+    Float,
+    HasStrictTraits,
+    HasTraits,
+    Int,
+    Str
+)
+
+log = logging.getLogger(__name__)
+
+
+def archive_state(ob_func):
+    """ Returns the state of a multi-objective function archive
+    (Pareto front, upper bounds, hyper-volume, etc), without the
+    objective function it wraps, which may not be picklable.
+
+    Archives defined by traits classes, such as HypervolumeLoss, give
+    their own state to pickle, while the attributes of others, such as
+    the nevergrad MultiobjectiveFunction, are copied.
+    """
+    if isinstance(ob_func, HasTraits):
+        return ob_func.__getstate__()
+    return {
+        name: value for name, value in vars(ob_func).items()
+        if name != 'multiobjective_function'
+    }
+
+
+def restore_archive_state(ob_func, state):
+    """ Restores the state of a multi-objective function archive,
+    as returned by archive_state"""
+    if isinstance(ob_func, HasTraits):
+        ob_func.__setstate__(state)
+    else:
+        vars(ob_func).update(state)
+
+
+class Checkpointer(HasStrictTraits):
+    """ Periodically saves the state of an optimization run to disk,
+    every `every_evaluations` evaluations and / or every `every_seconds`
+    seconds, so that it can later be resumed.
+
+    Notes
+    -----
+    The state is pickled, and written to a temporary file that then
+    replaces the previous checkpoint, so that a crash while saving
+    never corrupts the last complete checkpoint.
+    """
+
+    #: Path of the checkpoint file
+    path = Str()
+
+    #: Number of evaluations between checkpoints (0 disables)
+    every_evaluations = Int(0)
+
+    #: Number of seconds between checkpoints (0 disables)
+    every_seconds = Float(0.0)
+
+    #: Number of evaluations at the last checkpoint
+    _last_evaluations = Int(0)
+
+    #: Time of the last checkpoint
+    _last_time = Float()
+
+    def __init__(self, *args, **kwargs):
+        super(Checkpointer, self).__init__(*args, **kwargs)
+        self._last_time = time.time()
+
+    def exists(self):
+        """ Whether or not a checkpoint has been saved"""
+        return os.path.exists(self.path)
+
+    def is_due(self, n_evaluations):
+        """ Whether or not a checkpoint is due after n_evaluations"""
+        if (self.every_evaluations > 0
+                and n_evaluations - self._last_evaluations
+                >= self.every_evaluations):
+            return True
+        if (self.every_seconds > 0
+                and time.time() - self._last_time >= self.every_seconds):
+            return True
+        return False
+
+    def save(self, state, n_evaluations):
+        """ Saves the state of an optimization run after n_evaluations
+
+        Parameters
+        ----------
+        state: dict
+            Picklable state of the optimization run
+        n_evaluations: int
+            Number of evaluations performed so far
+        """
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            pickle.dump(state, file)
+        os.replace(temp_path, self.path)
+
+        self._last_evaluations = n_evaluations
+        self._last_time = time.time()
+        log.info("Saved checkpoint after {} evaluations to {}".format(
+            n_evaluations, self.path))
+
+    def load(self):
+        """ Loads the state of the last checkpoint, or returns None if
+        no checkpoint has been saved"""
+        if not self.exists():
+            return None
+
+        with open(self.path, 'rb') as file:
+            state = pickle.load(file)
+
+        self._last_evaluations = state.get('n_evaluations', 0)
+        self._last_time = time.time()
+        return state
@@ -0,0 +1,127 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from traits.api import (
+    Dict,
+    Enum,
+    HasStrictTraits,
+    Instance,
+    Int,
+    Property
+)
+
+from force_nevergrad.engine.evaluation_cache import (
+    canonical_key,
+    EvaluationCache
+)
+
+
+class CandidateDeduplicator(HasStrictTraits):
+    """ Tracks the candidates of an optimization run that are being
+    evaluated, and those evaluated recently, by the canonical key of
+    their MCO parameter values, so that duplicate candidates do not
+    start another evaluation of the same point.
+
+    Optimizers of discrete or low-resolution parameters often ask for
+    candidates that are identical once translated to MCO parameter
+    values, sometimes while the first of them is still being evaluated
+    by another worker. A duplicate of a recent evaluation is told its
+    objective value straight away. A duplicate of an evaluation in
+    flight is held until the evaluation completes, and is then told the
+    same value. Meanwhile, the optimizer is either asked for no other
+    candidate ("wait"), or for another candidate straight away
+    ("reask").
+    """
+
+    #: What happens to duplicates of candidates being evaluated
+    policy = Enum("wait", "reask")
+
+    #: Number of recently evaluated candidates remembered (0 only
+    #: suppresses duplicates of candidates in flight)
+    recent_size = Int(256)
+
+    #: Number of duplicates told the value of a recent evaluation
+    n_recent = Int(0)
+
+    #: Number of duplicates that waited for an evaluation in flight
+    n_waited = Int(0)
+
+    #: Number of duplicates held while the optimizer was asked for
+    #: another candidate
+    n_reasked = Int(0)
+
+    #: Total number of duplicates that were not evaluated
+    n_suppressed = Property(Int, depends_on="n_recent,n_waited,n_reasked")
+
+    #: Candidates waiting for each evaluation in flight, by key
+    _in_flight = Dict()
+
+    #: Objective values of the recent evaluations
+    _recent = Instance(EvaluationCache)
+
+    def __init__(self, **traits):
+        super(CandidateDeduplicator, self).__init__(**traits)
+        self.reset()
+
+    def _get_n_suppressed(self):
+        return self.n_recent + self.n_waited + self.n_reasked
+
+    def key(self, mco_params):
+        """ Returns the key of a list of MCO parameter values, shared
+        only by identical values"""
+        return canonical_key(mco_params)
+
+    def lookup(self, key):
+        """ Returns the objective value of a recent evaluation of the
+        key, counting it as a duplicate, or None if there is none."""
+        value = self._recent.lookup(key)
+        if value is not None:
+            self.n_recent += 1
+        return value
+
+    def is_in_flight(self, key):
+        """ Whether or not the key is being evaluated"""
+        return key in self._in_flight
+
+    def start(self, key):
+        """ Records the start of an evaluation of the key"""
+        self._in_flight[key] = []
+
+    def suppress(self, key, candidate):
+        """ Suppresses a duplicate candidate of an evaluation in flight,
+        holding it until the evaluation completes"""
+        self._in_flight[key].append(candidate)
+        if self.policy == "wait":
+            self.n_waited += 1
+        else:
+            self.n_reasked += 1
+
+    def finish(self, key, value):
+        """ Records the objective value of an evaluation of the key,
+        which is no longer in flight.
+
+        Return
+        ------
+        list
+            The duplicate candidates held for the evaluation
+        """
+        self._recent.store(key, value)
+        return self._in_flight.pop(key, [])
+
+    def reset(self):
+        """ Forgets the candidates of a previous run, and resets the
+        counters"""
+        self._in_flight = {}
+        self._recent = EvaluationCache(maxsize=self.recent_size)
+        self.n_recent = 0
+        self.n_waited = 0
+        self.n_reasked = 0
+
+    def statistics(self):
+        """ Returns a summary of the suppressed duplicates"""
+        return {
+            'recent': self.n_recent,
+            'waited': self.n_waited,
+            'reasked': self.n_reasked,
+            'suppressed': self.n_suppressed
+        }
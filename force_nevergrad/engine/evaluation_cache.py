@@ -0,0 +1,151 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from collections import OrderedDict
+import hashlib
+import json
+from numbers import Real
+
+import numpy as np
+
+from traits.api import (
+    Float,
+    HasStrictTraits,
+    Instance,
+    Int,
+    Property
+)
+
+
+def canonical_form(value, tolerance=0.0):
+    """ Convert a (possibly nested) MCO parameter value into a canonical,
+    JSON-serializable form.
+
+    Parameters
+    ----------
+    value: Any (but usually float, list or string)
+        The MCO parameter value.
+    tolerance: float, optional
+        If greater than zero, numerical values are rounded to the
+        nearest multiple of tolerance.
+
+    Return
+    ------
+    Any
+        The canonical form of the value: lists of floats, integers,
+        booleans or strings.
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+
+    if isinstance(value, (list, tuple)):
+        return [canonical_form(element, tolerance) for element in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, Real):
+        if tolerance > 0:
+            # Index of the nearest multiple of tolerance
+            return int(round(float(value) / tolerance))
+        return float(value)
+    if isinstance(value, str):
+        return value
+
+    return repr(value)
+
+
+def canonical_key(mco_params, tolerance=0.0):
+    """ Hash a list of MCO parameter values into a canonical key.
+
+    Parameters
+    ----------
+    mco_params: list of Any (but usually float, list or string)
+        Parameter values in the MCO form, as returned by
+        translate_ng_to_mco.
+    tolerance: float, optional
+        If greater than zero, numerical values within the same
+        multiple of tolerance share a key.
+
+    Return
+    ------
+    str
+        The hexadecimal digest of the canonical form of the values.
+    """
+    data = json.dumps(
+        canonical_form(list(mco_params), tolerance),
+        separators=(',', ':')
+    )
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache(HasStrictTraits):
+    """ Least-recently-used cache of objective function values, keyed on
+    the canonical hash of the MCO parameter values they were evaluated at.
+    """
+
+    #: Maximum number of objective values to hold
+    maxsize = Int(1024)
+
+    #: Numerical parameter values within the same multiple of
+    #: tolerance are considered equal (0 requires an exact match)
+    tolerance = Float(0.0)
+
+    #: Number of lookups that found a cached value
+    hits = Int(0)
+
+    #: Number of lookups that did not find a cached value
+    misses = Int(0)
+
+    #: Fraction of lookups that found a cached value
+    hit_rate = Property(Float, depends_on='hits,misses')
+
+    #: Cached values, ordered from least to most recently used
+    _values = Instance(OrderedDict, ())
+
+    def __len__(self):
+        return len(self._values)
+
+    def _get_hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def key(self, mco_params):
+        """ Returns the cache key of a list of MCO parameter values"""
+        return canonical_key(mco_params, self.tolerance)
+
+    def lookup(self, key):
+        """ Returns the objective value cached against the key, or None
+        if there is none, and updates the hit / miss statistics.
+        """
+        try:
+            value = self._values[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._values.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        """ Caches the objective value against the key, discarding the
+        least recently used value if the cache is full.
+        """
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+    def clear(self):
+        """ Empties the cache and resets its statistics"""
+        self._values.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def statistics(self):
+        """ Returns a summary of the cache usage"""
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate
+        }
@@ -0,0 +1,134 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from contextlib import closing
+import json
+import sqlite3
+
+import numpy as np
+
+from traits.api import (
+    Float,
+    HasStrictTraits,
+    Int,
+    Str
+)
+
+from .evaluation_cache import canonical_form, canonical_key
+
+
+class EvaluationStore(HasStrictTraits):
+    """ Persistent store of KPI values, keyed on the MCO parameter values
+    they were evaluated at, backed by an SQLite database file.
+
+    Notes
+    -----
+    Each operation opens its own connection to the database, so that a
+    single store can be used from several threads at once. The database
+    is run in write-ahead logging mode, allowing concurrent processes on
+    the same machine to share the file: readers are not blocked by a
+    writer, and writers wait up to `timeout` seconds for each other.
+    The first set of KPIs stored for a point is kept.
+    """
+
+    #: Path of the SQLite database file
+    path = Str()
+
+    #: Name of the study the evaluations belong to. Studies with
+    #: different workflows sharing the same file must use different
+    #: namespaces.
+    namespace = Str()
+
+    #: Number of KPIs of the study. Stored KPIs of another length,
+    #: evaluated by a different workflow, are not returned by lookups
+    #: (0 returns any).
+    n_kpis = Int(0)
+
+    #: Numerical parameter values within the same multiple of
+    #: tolerance are considered equal (0 requires an exact match)
+    tolerance = Float(0.0)
+
+    #: Seconds to wait for another process to release the database
+    timeout = Float(30.0)
+
+    #: Number of lookups that found stored KPIs
+    hits = Int(0)
+
+    #: Number of lookups that did not find stored KPIs
+    misses = Int(0)
+
+    def __init__(self, path, **traits):
+        super(EvaluationStore, self).__init__(path=path, **traits)
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "parameters TEXT NOT NULL, "
+                "kpis TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def __len__(self):
+        with closing(self._connect()) as connection:
+            (count,), = connection.execute(
+                "SELECT COUNT(*) FROM evaluations WHERE namespace = ?",
+                (self.namespace,)
+            )
+        return count
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def lookup(self, parameter_values):
+        """ Returns the KPI values stored for a list of MCO parameter
+        values, or None if there are none.
+
+        Parameters
+        ----------
+        parameter_values: list of Any
+            The MCO parameter values
+
+        Return
+        ------
+        ndarray or None
+            The stored KPI values, if there are n_kpis of them
+        """
+        key = canonical_key(parameter_values, self.tolerance)
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT kpis FROM evaluations "
+                "WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+        kpis = None if row is None else np.array(json.loads(row[0]))
+        if kpis is None or (self.n_kpis and kpis.size != self.n_kpis):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return kpis
+
+    def store(self, parameter_values, kpis):
+        """ Stores the KPI values evaluated for a list of MCO parameter
+        values, unless some have already been stored.
+
+        Parameters
+        ----------
+        parameter_values: list of Any
+            The MCO parameter values
+        kpis: list or ndarray of float
+            The KPI values evaluated at those parameter values
+        """
+        key = canonical_key(parameter_values, self.tolerance)
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO evaluations "
+                "(namespace, key, parameters, kpis) VALUES (?, ?, ?, ?)",
+                (self.namespace,
+                 key,
+                 json.dumps(canonical_form(list(parameter_values))),
+                 json.dumps(np.asarray(kpis, dtype=float).tolist()))
+            )
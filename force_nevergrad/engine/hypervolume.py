@@ -0,0 +1,394 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import numpy as np
+
+from traits.api import (
+    Any,
+    Callable,
+    Float,
+    HasStrictTraits,
+    Instance,
+    Int
+)
+
+from .pareto_archive import ParetoArchive
+
+#: Number of random samples used to estimate hypervolumes in more
+#: than three dimensions
+MONTE_CARLO_SAMPLES = 10000
+
+#: Largest number of point comparisons held in memory at once by the
+#: Monte-Carlo estimate
+_CHUNK_SIZE = 2 ** 20
+
+
+def hypervolume(points, reference, n_samples=MONTE_CARLO_SAMPLES,
+                random_state=None):
+    """ Calculates the hypervolume dominated by a set of points, and
+    bounded by a reference point, for a minimization problem.
+
+    Parameters
+    ----------
+    points: array_like of float
+        Array with a row of objective values for each point
+    reference: array_like of float
+        The reference point, worse than all points of interest in every
+        objective. Points that are not dominate no volume.
+    n_samples: int, optional
+        Number of random samples used to estimate the hypervolume in
+        more than three dimensions
+    random_state: numpy.random.RandomState, optional
+        Source of the random samples
+
+    Return
+    ------
+    float
+        The hypervolume: exact in up to three dimensions, estimated
+        by Monte-Carlo sampling otherwise.
+    """
+    reference = np.asarray(reference, dtype=float).ravel()
+    points = np.asarray(points, dtype=float).reshape(-1, reference.size)
+
+    # Points beyond the reference in any objective dominate no volume
+    points = points[np.all(points < reference, axis=1)]
+    if len(points) == 0:
+        return 0.0
+
+    n_objectives = reference.size
+    if n_objectives == 1:
+        return float(reference[0] - points.min())
+    if n_objectives == 2:
+        return _hypervolume_2d(points, reference)
+    if n_objectives == 3:
+        return _hypervolume_3d(points, reference)
+    return _hypervolume_monte_carlo(
+        points, reference, n_samples, random_state)
+
+
+def hypervolume_contribution(point, points, reference,
+                             n_samples=MONTE_CARLO_SAMPLES,
+                             random_state=None):
+    """ Calculates the increase in the hypervolume of a set of points
+    when a new point is added to it.
+
+    Parameters
+    ----------
+    point: array_like of float
+        Objective values of the new point
+    points: array_like of float
+        Array with a row of objective values for each existing point
+    reference: array_like of float
+        The reference point
+    n_samples: int, optional
+        Number of random samples used in more than three dimensions
+    random_state: numpy.random.RandomState, optional
+        Source of the random samples
+
+    Return
+    ------
+    float
+        The hypervolume dominated by the new point, but by none of the
+        existing points.
+
+    Notes
+    -----
+    The contribution is the volume of the box between the new point and
+    the reference, less the volume of that box already dominated by the
+    existing points. The latter is the hypervolume of the existing
+    points clipped to the box, so only the part of the front that
+    overlaps the box is ever computed.
+    """
+    reference = np.asarray(reference, dtype=float).ravel()
+    point = np.asarray(point, dtype=float).ravel()
+    points = np.asarray(points, dtype=float).reshape(-1, reference.size)
+
+    if np.any(point >= reference):
+        return 0.0
+
+    box = float(np.prod(reference - point))
+    if len(points) == 0:
+        return box
+
+    clipped = np.maximum(points, point)
+    return max(
+        box - hypervolume(clipped, reference, n_samples, random_state),
+        0.0
+    )
+
+
+def _hypervolume_2d(points, reference):
+    """ Exact hypervolume of two-dimensional points within the
+    reference, sweeping along the first objective."""
+    order = np.argsort(points[:, 0], kind='mergesort')
+    first = points[order, 0]
+
+    # The height dominated over each interval of the first objective
+    # is set by the lowest second objective to its left
+    second = np.minimum.accumulate(points[order, 1])
+    widths = np.diff(np.append(first, reference[0]))
+
+    return float(np.dot(widths, reference[1] - second))
+
+
+def _hypervolume_3d(points, reference):
+    """ Exact hypervolume of three-dimensional points within the
+    reference, as a stack of two-dimensional slices along the third
+    objective."""
+    order = np.argsort(points[:, 2], kind='mergesort')
+    points = points[order]
+    depths = np.diff(np.append(points[:, 2], reference[2]))
+
+    volume = 0.0
+    for index in np.flatnonzero(depths > 0):
+        volume += depths[index] * _hypervolume_2d(
+            points[:index + 1, :2], reference[:2])
+    return float(volume)
+
+
+def _hypervolume_monte_carlo(points, reference, n_samples,
+                             random_state):
+    """ Monte-Carlo estimate of the hypervolume of points within the
+    reference, sampling the box between their ideal point and the
+    reference."""
+    if random_state is None:
+        random_state = np.random
+    lower = points.min(axis=0)
+    box = float(np.prod(reference - lower))
+
+    samples = random_state.uniform(
+        lower, reference, size=(n_samples, reference.size))
+
+    # Compare samples with all points a chunk at a time
+    chunk = max(_CHUNK_SIZE // (len(points) * reference.size), 1)
+    n_dominated = 0
+    for start in range(0, n_samples, chunk):
+        block = samples[start:start + chunk, np.newaxis, :]
+        n_dominated += np.count_nonzero(
+            np.any(np.all(points <= block, axis=2), axis=1))
+
+    return box * n_dominated / n_samples
+
+
+class HypervolumeLoss(HasStrictTraits):
+    """ Aggregate loss of a multi-objective function, based on the
+    hypervolume of the Pareto front, which can replace the nevergrad
+    MultiobjectiveFunction.
+
+    Notes
+    -----
+    Like the nevergrad function, a point that improves the Pareto front
+    is given the negated hypervolume of the new front as its loss, a
+    dominated point is given the negated hypervolume plus its distance
+    to the front, and a point beyond the upper bounds is given its
+    distance to them. However, in up to three dimensions, the
+    hypervolume is kept up to date by adding the exact contribution of
+    each new member, instead of computing it over all members on every
+    call. In more dimensions, summing Monte-Carlo contributions would
+    accumulate their noise over the run, so the hypervolume is instead
+    estimated anew whenever the front changes, from the same random
+    samples each time.
+    """
+
+    #: The multi-objective function, returning an array of losses
+    multiobjective_function = Callable()
+
+    #: Upper bounds of the losses, the reference point of the
+    #: hypervolume
+    upper_bounds = Any()
+
+    #: Number of random samples used to estimate the hypervolume in
+    #: more than three dimensions
+    n_samples = Int(MONTE_CARLO_SAMPLES)
+
+    #: Seed of the random samples used to estimate the hypervolume in
+    #: more than three dimensions
+    seed = Int(0)
+
+    #: Hypervolume of the current Pareto front
+    volume = Float(0.0)
+
+    #: Members of the Pareto front, with (args, kwargs) parameters
+    archive = Instance(ParetoArchive)
+
+    def __init__(self, multiobjective_function, upper_bounds=None,
+                 **traits):
+        if upper_bounds is None:
+            raise ValueError(
+                "The hypervolume loss requires the upper bounds of all "
+                "losses")
+        upper_bounds = np.asarray(upper_bounds, dtype=float)
+        super(HypervolumeLoss, self).__init__(
+            multiobjective_function=multiobjective_function,
+            upper_bounds=upper_bounds,
+            **traits
+        )
+        self.archive = ParetoArchive(upper_bounds=upper_bounds)
+
+    def __getstate__(self):
+        """ Returns the state of the loss to pickle, without the
+        multi-objective function, which may not be picklable"""
+        state = super(HypervolumeLoss, self).__getstate__()
+        state.pop("multiobjective_function", None)
+        return state
+
+    def __setstate__(self, state):
+        """ Restores a pickled state. Applied to an existing loss, its
+        multi-objective function is kept, otherwise it must be assigned
+        before the loss is called."""
+        super(HypervolumeLoss, self).__setstate__(dict(state))
+
+    def __call__(self, *args, **kwargs):
+        losses = self.multiobjective_function(*args, **kwargs)
+        return self.compute_aggregate_loss(losses, *args, **kwargs)
+
+    def compute_aggregate_loss(self, losses, *args, **kwargs):
+        """ Computes the aggregate loss of a point from its
+        multi-objective losses, and adds the point to the Pareto front
+        if it belongs there.
+
+        Parameters
+        ----------
+        losses: array_like of float
+            The multi-objective losses of the point
+        *args, **kwargs: Any
+            The parameters of the point
+
+        Return
+        ------
+        float
+            The aggregate loss of the point, to be minimized
+        """
+        losses = np.asarray(losses, dtype=float).ravel()
+
+        excess = losses - self.upper_bounds
+        if np.any(excess > 0):
+            return float(np.max(excess))
+
+        front = self.archive.losses().reshape(-1, len(losses))
+        scale = self._scale()
+        if len(losses) > 3:
+            if self.archive.add((args, kwargs), losses):
+                self.volume = self._front_volume()
+                return -self.volume / np.prod(scale)
+        else:
+            contribution = hypervolume_contribution(
+                losses, front, self.upper_bounds)
+            if contribution > 0 and self.archive.add((args, kwargs),
+                                                     losses):
+                self.volume += contribution
+                return -self.volume / np.prod(scale)
+
+        # Otherwise penalise the point by how far it would need to move
+        # to stop being dominated
+        dominating = np.all(front <= losses, axis=1)
+        if not np.any(dominating):
+            return -self.volume / np.prod(scale)
+        distance = np.min((losses - front[dominating]) / scale, axis=1).min()
+        return -self.volume / np.prod(scale) + float(distance)
+
+    def _front_volume(self):
+        """ Returns the hypervolume of the Pareto front, estimated from
+        the same random samples on every call in more than three
+        dimensions"""
+        return hypervolume(
+            self.archive.losses(), self.upper_bounds,
+            n_samples=self.n_samples,
+            random_state=np.random.RandomState(self.seed)
+        )
+
+    def scaled_volume(self):
+        """ Returns the hypervolume of the Pareto front, in units of the
+        scale the losses are normalized by"""
+        return self.volume / np.prod(self._scale())
+
+    def _scale(self):
+        """ Returns the scale of each loss, by which volumes and
+        distances are normalized"""
+        return np.ones_like(self.upper_bounds)
+
+    def pareto_front(self):
+        """ Returns the Pareto front, as a list of (args, kwargs)"""
+        return self.archive.pareto_front()
+
+
+class OnlineHypervolumeLoss(HypervolumeLoss):
+    """ Hypervolume loss of a multi-objective function whose upper
+    bounds are not known in advance.
+
+    Notes
+    -----
+    The running minimum and maximum of each loss are tracked as points
+    are evaluated. The reference point of the hypervolume lies `margin`
+    times the running range beyond the running maxima, and the losses
+    are normalized by their distance to the reference from the running
+    minima, so that the aggregate loss has a scale independent of the
+    units of each KPI. Whenever the reference point moves, the
+    hypervolume of the Pareto front is recalculated, which happens less
+    and less often as the run progresses.
+    """
+
+    #: Fraction of the running range of each loss by which the
+    #: reference point lies beyond the running maximum
+    margin = Float(0.1)
+
+    #: Running minimum of each loss
+    lower_bounds = Any()
+
+    #: Running maximum of each loss
+    upper_losses = Any()
+
+    def __init__(self, multiobjective_function, upper_bounds=None,
+                 **traits):
+        # Upper bounds are derived from the losses, so any provided
+        # are ignored
+        super(HypervolumeLoss, self).__init__(
+            multiobjective_function=multiobjective_function,
+            **traits
+        )
+        self.archive = ParetoArchive()
+
+    def compute_aggregate_loss(self, losses, *args, **kwargs):
+        """ Updates the running bounds with the multi-objective losses of
+        a point, and then computes its aggregate loss.
+
+        Parameters
+        ----------
+        losses: array_like of float
+            The multi-objective losses of the point
+        *args, **kwargs: Any
+            The parameters of the point
+
+        Return
+        ------
+        float
+            The aggregate loss of the point, to be minimized
+        """
+        losses = np.asarray(losses, dtype=float).ravel()
+        self._update_bounds(losses)
+        return super(OnlineHypervolumeLoss, self).compute_aggregate_loss(
+            losses, *args, **kwargs)
+
+    def _update_bounds(self, losses):
+        """ Updates the running bounds and the reference point, and the
+        hypervolume of the Pareto front if the reference point moved."""
+        if self.lower_bounds is None:
+            self.lower_bounds = losses.copy()
+            self.upper_losses = losses.copy()
+        elif np.all(losses >= self.lower_bounds) \
+                and np.all(losses <= self.upper_losses):
+            return
+        else:
+            self.lower_bounds = np.minimum(self.lower_bounds, losses)
+            self.upper_losses = np.maximum(self.upper_losses, losses)
+
+        # Give losses that have not varied yet a unit range
+        span = self.upper_losses - self.lower_bounds
+        span[span == 0] = 1.0
+        self.upper_bounds = self.upper_losses + self.margin * span
+
+        self.archive.upper_bounds = self.upper_bounds
+        self.volume = self._front_volume()
+
+    def _scale(self):
+        return self.upper_bounds - self.lower_bounds
@@ -0,0 +1,117 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from collections import OrderedDict
+import json
+import os
+import time
+
+from traits.api import (
+    Enum,
+    Float,
+    HasStrictTraits,
+    Str
+)
+
+#: Description of each progress metric of an optimization run
+METRIC_DESCRIPTIONS = OrderedDict([
+    ("evaluations", "Number of evaluations counted towards the budget"),
+    ("evaluations_per_second", "Average number of evaluations per second"),
+    ("in_flight", "Number of evaluations currently in flight"),
+    ("cache_hit_rate", "Fraction of evaluation cache lookups that hit"),
+    ("total_cost", "Accumulated cost of the evaluations"),
+    ("elapsed_seconds", "Seconds elapsed since the start of the run"),
+    ("seconds_to_budget",
+     "Estimated seconds until the first budget is used up"),
+    ("hypervolume", "Hypervolume of the current Pareto front"),
+    ("pareto_size", "Number of members of the current Pareto front"),
+    ("surrogate_fit_seconds",
+     "Seconds spent fitting the surrogate model of the objective"),
+    ("surrogate_predict_seconds",
+     "Seconds spent on predictions of the surrogate model"),
+    ("rejected_candidates",
+     "Number of candidates rejected by the constraints"),
+    ("duplicate_candidates",
+     "Number of duplicate candidates that were not evaluated"),
+    ("low_fidelity_evaluations",
+     "Number of evaluations below full fidelity"),
+    ("promotion_rate",
+     "Fraction of the candidates evaluated below full fidelity that "
+     "were promoted to the next fidelity"),
+    ("finished", "Whether or not the run has ended"),
+])
+
+
+class MetricsExporter(HasStrictTraits):
+    """ Periodically writes the progress metrics of an optimization run
+    to a file, for monitoring by external tools.
+
+    The metrics are either appended as a line of JSON to the file on
+    each export ("jsonl"), or written as a set of gauges in the
+    Prometheus text exposition format, replacing the previous export
+    ("prometheus"), as read by the textfile collector of the node
+    exporter.
+
+    Notes
+    -----
+    Prometheus exports are written to a temporary file that then
+    replaces the previous export, so that a collector never reads a
+    partially written file. Metrics with no value (None) are left out
+    of Prometheus exports.
+    """
+
+    #: Path of the metrics file
+    path = Str()
+
+    #: Format of the metrics file
+    format = Enum("jsonl", "prometheus")
+
+    #: Number of seconds between exports
+    every_seconds = Float(10.0)
+
+    #: Prefix of the Prometheus metric names
+    prefix = Str("force_nevergrad")
+
+    #: Time of the last export
+    _last_time = Float(0.0)
+
+    def is_due(self):
+        """ Whether or not an export is due"""
+        return time.time() - self._last_time >= self.every_seconds
+
+    def export(self, metrics):
+        """ Writes a set of metrics to the file.
+
+        Parameters
+        ----------
+        metrics: dict
+            Value of each metric, by name, or None if it has no value
+        """
+        self._last_time = time.time()
+        if self.format == "jsonl":
+            self._export_jsonl(metrics)
+        else:
+            self._export_prometheus(metrics)
+
+    def _export_jsonl(self, metrics):
+        record = OrderedDict(timestamp=self._last_time)
+        record.update(metrics)
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+
+    def _export_prometheus(self, metrics):
+        lines = []
+        for name, value in metrics.items():
+            if value is None:
+                continue
+            full_name = "{}_{}".format(self.prefix, name)
+            description = METRIC_DESCRIPTIONS.get(name)
+            if description:
+                lines.append("# HELP {} {}".format(full_name, description))
+            lines.append("# TYPE {} gauge".format(full_name))
+            lines.append("{} {}".format(full_name, float(value)))
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, self.path)
@@ -0,0 +1,555 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import logging
+from numbers import Number
+
+import numpy as np
+
+from traits.api import (
+    Any,
+    Enum,
+    Float,
+    HasStrictTraits,
+    Instance,
+    Int,
+    List,
+    Property,
+    provides,
+    Range
+)
+
+from force_bdss.api import IOptimizer, PositiveInt
+
+from .nevergrad_optimizers import (
+    _evaluation_cost,
+    _nevergrad_tell,
+    _surrogate_input,
+    NevergradMultiOptimizer
+)
+from .phase_timer import phase_timer
+from .run_statistics import RunStatistics
+
+log = logging.getLogger(__name__)
+
+
+def fidelity_levels(param, eta=3, n_rungs=3):
+    """ Returns the fidelity values of a fidelity parameter, lowest
+    first: up to n_rungs values, each about eta times the last.
+
+    Parameters
+    ----------
+    param: MCOParameter
+        The fidelity parameter
+    eta: int
+        The ratio between successive fidelities
+    n_rungs: int
+        The largest number of fidelities
+
+    Return
+    ------
+    list of float
+        The upper bound of a ranged parameter divided by successive
+        powers of eta, but no lower than its lower bound, the levels
+        of a listed parameter nearest to its highest level divided by
+        successive powers of eta, or the value of a fixed parameter.
+
+    Raises
+    ------
+    ValueError
+        If the fidelity values of the parameter cannot be determined
+    """
+    divisors = float(eta) ** np.arange(n_rungs)
+
+    levels = getattr(param, "levels", None)
+    if isinstance(levels, list) and levels:
+        levels = np.sort(np.asarray(levels, dtype=float))
+        targets = levels[-1] / divisors
+        nearest = np.argmin(
+            np.abs(levels[:, np.newaxis] - targets), axis=0)
+        return sorted(set(levels[nearest].tolist()))
+
+    lower = getattr(param, "lower_bound", None)
+    upper = getattr(param, "upper_bound", None)
+    if isinstance(lower, Number) and isinstance(upper, Number):
+        return sorted(set(np.maximum(upper / divisors, lower).tolist()))
+
+    value = getattr(param, "value", None)
+    if isinstance(value, Number):
+        return [value]
+
+    raise ValueError(
+        "Fidelity parameter {!r} is not a listed, ranged or fixed "
+        "parameter".format(getattr(param, "name", param)))
+
+
+def promotion_order(values):
+    """ Orders candidates by their objective values, for promotion to
+    the next fidelity: by non-dominated front, and within each front,
+    by the sum of their objective values scaled by their ranges.
+
+    Parameters
+    ----------
+    values: array_like
+        The objective values of each candidate, to be minimized
+
+    Return
+    ------
+    ndarray
+        Indices of the candidates, best first
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    scale = np.ptp(values, axis=0) if len(values) else 1.0
+    scale = np.where(scale > 0, scale, 1.0)
+    scores = np.sum(values / scale, axis=1)
+
+    fronts = np.zeros(len(values), dtype=int)
+    remaining = np.arange(len(values))
+    front = 0
+    while remaining.size:
+        subset = values[remaining]
+        dominated = np.array([
+            np.any(np.all(subset <= value, axis=1)
+                   & np.any(subset < value, axis=1))
+            for value in subset
+        ])
+        fronts[remaining[~dominated]] = front
+        remaining = remaining[dominated]
+        front += 1
+
+    return np.lexsort((scores, fronts))
+
+
+class FidelityTranslation(HasStrictTraits):
+    """ Translation of nevergrad values to MCO parameter values, with
+    the value of the fidelity parameter, which is not optimized,
+    inserted in its place.
+    """
+
+    #: Translation of the optimized parameters: a TranslationPlan or
+    #: FlatEncoding
+    translation = Any()
+
+    #: Index of the fidelity parameter among the MCO parameters
+    index = Int()
+
+    #: Value of the fidelity parameter
+    fidelity = Any()
+
+    def to_mco(self, ng_values):
+        """ Translates a sequence of nevergrad parameter values to a
+        list of MCO parameter values, including the fidelity.
+
+        Parameters
+        ----------
+        ng_values: sequence of Any
+            Parameter values in the nevergrad form
+
+        Return
+        ------
+        list of Any
+            Parameter values in the MCO form
+        """
+        mco_values = self.translation.to_mco(ng_values)
+        mco_values.insert(self.index, self.fidelity)
+        return mco_values
+
+
+class RungStatistics(HasStrictTraits):
+    """ Counters of the candidates evaluated at one fidelity"""
+
+    #: Value of the fidelity parameter
+    fidelity = Any()
+
+    #: Number of candidates evaluated at this fidelity
+    n_evaluated = Int(0)
+
+    #: Number of candidates promoted to the next fidelity
+    n_promoted = Int(0)
+
+    #: Accumulated cost of the evaluations at this fidelity
+    total_cost = Float(0.0)
+
+    #: Fraction of the evaluated candidates that were promoted
+    promotion_rate = Property(Float)
+
+    def _get_promotion_rate(self):
+        if self.n_evaluated == 0:
+            return 0.0
+        return self.n_promoted / self.n_evaluated
+
+
+@provides(IOptimizer)
+class NevergradMultiFidelityOptimizer(NevergradMultiOptimizer):
+    """ Multi-objective optimization using nevergrad, of a workflow
+    with a fidelity parameter trading accuracy for cost, by successive
+    halving.
+
+    The fidelity parameter is not optimized. Instead, candidates are
+    asked for in brackets, and evaluated at the lowest fidelity. Only
+    the best 1 / eta of them are promoted to the next fidelity, and so
+    on up to full fidelity. Only evaluations at full fidelity are
+    reported, and counted towards the budget. The time and cost
+    budgets account for the evaluations at all fidelities.
+
+    Every candidate asked for is told to the optimizer: those evaluated
+    at full fidelity with their aggregate loss, and those left behind
+    at a lower fidelity with a penalized loss, above any told so far
+    at full fidelity, higher for lower fidelities and lower ranks.
+    The budget of the optimizer is the number of candidates the
+    schedule asks for to use up the budget.
+
+    With the "hyperband" schedule, brackets start in turn at each
+    fidelity, from the lowest up, with eta times fewer candidates
+    for each rung skipped, which hedges against low fidelities that
+    rank candidates poorly.
+
+    Notes
+    -----
+    Batch objective functions and checkpoints are not supported.
+    """
+
+    #: Index of the fidelity parameter among the MCO parameters
+    fidelity_index = Int(0)
+
+    #: Values of the fidelity parameter, lowest first. By default, they
+    #: are derived from the fidelity parameter (see fidelity_levels).
+    fidelities = List()
+
+    #: Largest number of fidelities derived from the fidelity parameter
+    n_rungs = PositiveInt(3)
+
+    #: Ratio of the number of candidates evaluated at each fidelity to
+    #: the number promoted to the next
+    eta = Range(2, None, 3)
+
+    #: Number of candidates evaluated at the lowest fidelity in each
+    #: bracket. By default (0), enough for num_workers candidates to
+    #: reach full fidelity.
+    bracket_size = Int(0)
+
+    #: Schedule of the brackets
+    schedule = Enum("successive_halving", "hyperband")
+
+    #: Counters of the candidates evaluated at each fidelity, during
+    #: the current, or last, optimization run
+    rungs = List(Instance(RungStatistics), visible=False, transient=True)
+
+    #: Translation of the candidates evaluated at the current fidelity
+    _translation = Any(transient=True)
+
+    def nevergrad_budget(self, n_rungs, n_evaluations):
+        """Returns the number of candidates asked for in brackets until
+        n_evaluations of them are evaluated at full fidelity
+
+        Parameters
+        ----------
+        n_rungs: int
+            The number of fidelities
+        n_evaluations: int
+            The number of evaluations at full fidelity
+
+        Return
+        ------
+        int
+            The number of candidates asked for
+        """
+        top_rung = n_rungs - 1
+        n_asked = 0
+        brackets = self.brackets(n_rungs)
+        while n_evaluations > 0:
+            first_rung, n_candidates = next(brackets)
+            if first_rung == top_rung:
+                n_candidates = min(n_candidates, n_evaluations)
+            n_asked += n_candidates
+            n_promoted = n_candidates
+            for _ in range(first_rung, top_rung):
+                n_promoted = max(n_promoted // self.eta, 1)
+            n_evaluations -= min(n_promoted, n_evaluations)
+        return n_asked
+
+    def get_fidelities(self, params):
+        """Returns the values of the fidelity parameter, lowest first"""
+        if self.fidelities:
+            return list(self.fidelities)
+        return fidelity_levels(
+            params[self.fidelity_index], eta=self.eta, n_rungs=self.n_rungs)
+
+    def brackets(self, n_rungs):
+        """Yields the first rung and number of candidates of each
+        bracket in turn, endlessly.
+
+        Parameters
+        ----------
+        n_rungs: int
+            The number of fidelities
+
+        Yields
+        ------
+        first_rung: int
+            The index of the fidelity the bracket starts at
+        n_candidates: int
+            The number of candidates evaluated at that fidelity
+        """
+        size = self.bracket_size or (
+            self.eta ** (n_rungs - 1) * self.num_workers)
+        if self.schedule == "hyperband":
+            first_rungs = range(n_rungs)
+        else:
+            first_rungs = [0]
+        while True:
+            for first_rung in first_rungs:
+                yield first_rung, max(size // self.eta ** first_rung, 1)
+
+    async def optimize_function_async(self, func, params,
+                                      verbose_run=False):
+        """ Asynchronously minimize the passed multi-objective function,
+        by successive halving over the fidelity parameter.
+
+        Parameters
+        ----------
+        func: Callable or Coroutine function
+            The MCO function to optimize
+            Takes a list of MCO parameter values, including the
+            fidelity. If a coroutine function, up to num_workers
+            evaluations will be awaited concurrently in the running
+            event loop.
+        params: list of MCOParameter
+            The MCO parameter objects corresponding to the parameters.
+        verbose_run: Bool, optional
+            Whether or not to return all points evaluated at full
+            fidelity, or just those on the Pareto front.
+
+        Yields
+        ------
+        list of float or list:
+            The list of parameter values for a single member
+            of the Pareto set, at full fidelity.
+        """
+        if self.batch_size > 0:
+            raise ValueError(
+                "Batch objective functions are not supported by the "
+                "multi-fidelity optimizer")
+        if self.checkpoint is not None:
+            raise ValueError(
+                "Checkpoints are not supported by the multi-fidelity "
+                "optimizer")
+
+        index = self.fidelity_index
+        fidelities = self.get_fidelities(params)
+        search_params = params[:index] + params[index + 1:]
+
+        # The candidates at each fidelity are evaluated by the same
+        # function, with the fidelity inserted by the translation
+        translation = self.get_translation(search_params)
+        self._flat_encoding = (
+            translation if self.encoding == "flat" else None)
+        translations = [
+            FidelityTranslation(
+                translation=translation, index=index, fidelity=fidelity)
+            for fidelity in fidelities
+        ]
+        full_fidelity = translations[-1]
+        functions = [
+            self._wrap_function(func, is_scalar=False, plan=translation)
+            for translation in translations
+        ]
+        _, executor = self._get_function(
+            func, is_scalar=False, plan=full_fidelity)
+
+        self.statistics = RunStatistics()
+        self.progress.reset()
+        self._stop_asking = False
+        self._reset_constraints()
+        for constraint in self._cheap_constraints:
+            constraint.translation = full_fidelity
+        if self.surrogate is not None:
+            self.surrogate.reset()
+        if self.deduplicator is not None:
+            self.deduplicator.reset()
+        self._volume_loss = None
+        if self.stopping is not None:
+            self.stopping.reset()
+        self.rungs = [
+            RungStatistics(fidelity=fidelity) for fidelity in fidelities]
+
+        try:
+            # The calibration sample, if any, is told to the optimizer
+            # along with the candidates it is asked for
+            if (self.bound_estimation == "online"
+                    or self._valid_upper_bounds()):
+                n_calibration = 0
+            else:
+                n_calibration = self.bound_sample
+            optimizer = self.get_optimizer(
+                search_params,
+                budget=n_calibration + self.nevergrad_budget(
+                    len(fidelities), max(self.budget - n_calibration, 0))
+            )
+
+            # Estimate any undefined upper bounds from a calibration
+            # sample evaluated at full fidelity
+            calibration = []
+            if self.bound_estimation == "online":
+                upper_bounds = None
+            elif self._valid_upper_bounds():
+                upper_bounds = self.upper_bounds
+            else:
+                self._translation = full_fidelity
+                calibration = await self._evaluate_rung_async(
+                    functions[-1],
+                    self.get_calibration_sample(optimizer, search_params),
+                    self.rungs[-1], executor)
+                upper_bounds = self._estimate_upper_bounds(
+                    [value for _, value in calibration])
+
+            ob_func = self.get_multiobjective_function(
+                functions[-1], upper_bounds)
+            self._set_archive(ob_func, upper_bounds)
+
+            async def evaluated():
+                for x, value in calibration:
+                    yield x, value, None
+                async for result in self._successive_halving_async(
+                        optimizer, functions, translations, executor):
+                    yield result
+
+            worst_loss = 0.0
+            async for x, value, penalty in evaluated():
+                if value is None:
+                    # Candidates left behind at a lower fidelity are told
+                    # a loss above any told at full fidelity
+                    with phase_timer.phase("tell"):
+                        optimizer.tell(x, worst_loss + penalty)
+                    self.statistics.n_told += 1
+                    continue
+
+                self.statistics.n_evaluations += 1
+                self.progress.update(self.statistics, self.budget)
+                loss = _nevergrad_tell(optimizer, ob_func, x, value)
+                worst_loss = max(worst_loss, loss)
+                if self.surrogate is not None:
+                    self.surrogate.add(
+                        _surrogate_input(optimizer, x), value)
+                self.statistics.n_told += 1
+
+                point = full_fidelity.to_mco(x.args)
+                is_pareto_optimal = self.archive.add(point, value)
+                self._update_stopping(is_pareto_optimal)
+                if verbose_run or (self.stream_front and is_pareto_optimal):
+                    yield point
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self._export_metrics(finished=True)
+        self._log_surrogate()
+        self._log_constraints()
+        self._log_duplicates()
+        self._log_rungs()
+
+        if not (verbose_run or self.stream_front):
+            for point in self.archive.pareto_front():
+                yield point
+
+    async def _successive_halving_async(self, optimizer, functions,
+                                        translations, executor=None):
+        """Asks for brackets of candidates and evaluates them at each
+        fidelity in turn, promoting the best of them to the next, until
+        the budget is used up or the optimizer is asked to stop.
+
+        Yields
+        ------
+        x: nevergrad.Parameter
+            A candidate asked for
+        value: ndarray or None
+            Its objective values, once evaluated at full fidelity, or
+            None if it was left behind at a lower fidelity
+        penalty: float or None
+            For a candidate left behind, the number of fidelities it
+            fell short of full fidelity, plus its rank at its last
+            fidelity as a fraction of the candidates evaluated there
+        """
+        statistics = self.statistics
+        top_rung = len(functions) - 1
+        for first_rung, n_candidates in self.brackets(len(functions)):
+            self._check_budgets(statistics)
+            self._export_metrics()
+            n_remaining = self.budget - statistics.n_evaluations
+            if n_remaining <= 0 or self._stop_asking:
+                return
+
+            # Only the candidates the budget allows are evaluated at
+            # full fidelity
+            if first_rung == top_rung:
+                n_candidates = min(n_candidates, n_remaining)
+            candidates = self._ask(optimizer, n_candidates)
+            for rung in range(first_rung, top_rung + 1):
+                self._translation = translations[rung]
+                results = await self._evaluate_rung_async(
+                    functions[rung], candidates, self.rungs[rung], executor)
+                if rung == top_rung:
+                    for x, value in results:
+                        yield x, value, None
+                    break
+
+                order = promotion_order([value for _, value in results])
+                n_promoted = max(len(results) // self.eta, 1)
+                self._check_budgets(statistics)
+                if self._stop_asking:
+                    n_promoted = 0
+                elif rung + 1 == top_rung:
+                    n_promoted = min(n_promoted, n_remaining)
+                self.rungs[rung].n_promoted += n_promoted
+
+                for rank, index in enumerate(order[n_promoted:], n_promoted):
+                    yield (results[index][0], None,
+                           top_rung - rung + rank / len(results))
+                if n_promoted == 0:
+                    return
+                candidates = [results[index][0]
+                              for index in order[:n_promoted]]
+
+    async def _evaluate_rung_async(self, function, candidates, rung,
+                                   executor=None):
+        """Evaluates the candidates at the fidelity of a rung, updating
+        its counters"""
+        cost = self.statistics.total_cost
+        results = await self._evaluate_batch_async(
+            function, candidates, executor=executor)
+        rung.n_evaluated += len(results)
+        rung.total_cost += self.statistics.total_cost - cost
+        return results
+
+    def progress_metrics(self):
+        metrics = super(
+            NevergradMultiFidelityOptimizer, self).progress_metrics()
+        if self.rungs:
+            low_rungs = self.rungs[:-1]
+            n_evaluated = sum(rung.n_evaluated for rung in low_rungs)
+            metrics["low_fidelity_evaluations"] = n_evaluated
+            metrics["promotion_rate"] = (
+                sum(rung.n_promoted for rung in low_rungs) / n_evaluated
+                if n_evaluated else None)
+        return metrics
+
+    def _log_rungs(self):
+        """Logs the counters of the candidates evaluated at each
+        fidelity over the run"""
+        for rung in self.rungs:
+            log.info(
+                "Fidelity {}: {} evaluated, {} promoted, at a cost of "
+                "{:.3g}".format(rung.fidelity, rung.n_evaluated,
+                                rung.n_promoted, rung.total_cost))
+
+    def _mco_values(self, x):
+        """Returns the MCO parameter values of candidate x at the
+        current fidelity"""
+        return self._translation.to_mco(x.args)
+
+    def _record_cost(self, x, value, duration):
+        """Adds the cost of an evaluation at the current fidelity to the
+        run statistics"""
+        self.statistics.total_cost += _evaluation_cost(
+            self.cost_function, x, value, duration, plan=self._translation)
@@ -1,19 +1,30 @@
 #  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
 #  All rights reserved.
 
+import asyncio
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
 from functools import partial
 import logging
+import time
 
 import nevergrad as ng
 from nevergrad.functions import MultiobjectiveFunction
 import numpy as np
 
 from traits.api import (
+    Bool,
+    Callable,
     Enum,
     Float,
+    Instance,
+    Int,
     provides,
     HasStrictTraits,
     List,
+    Range,
     Union
 )
 
@@ -22,16 +33,47 @@ from force_bdss.api import (
     IOptimizer
 )
 
+from .checkpoint import (
+    archive_state,
+    Checkpointer,
+    restore_archive_state
+)
+from .deduplication import CandidateDeduplicator
+from .evaluation_cache import EvaluationCache
+from .hypervolume import HypervolumeLoss, OnlineHypervolumeLoss
+from .metrics import MetricsExporter
+from .pareto_archive import ParetoArchive
+from .phase_timer import phase_timer
+from .progress import ProgressReporter
 from .parameter_translation import (
+    CheapConstraint,
+    FlatEncoding,
     translate_mco_to_ng,
-    translate_ng_to_mco
+    translate_ng_to_mco,
+    translation_plan
 )
+from .run_statistics import RunStatistics
+from .stopping import StoppingCriteria
+from .surrogate import BaseSurrogate
 
 
 log = logging.getLogger(__name__)
 
 ALGORITHMS_KEYS = ng.optimizers.registry.keys()
 
+#: Aggregate losses available to turn a multi-objective function into
+#: a scalar loss for the optimizer
+AGGREGATE_LOSSES = {
+    "hypervolume": HypervolumeLoss,
+    "nevergrad": MultiobjectiveFunction
+}
+
+#: Concurrent executors available to evaluate candidates in parallel
+EXECUTOR_TYPES = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor
+}
+
 
 def _nevergrad_ask_tell(optimizer, ob_func, no_bias=False):
     """Exposes the Nevergrad Optimizer ask and tell interface
@@ -55,10 +97,43 @@ def _nevergrad_ask_tell(optimizer, ob_func, no_bias=False):
     """
 
     # Ask the optimizer for a new value
-    x = optimizer.ask()
+    with phase_timer.phase("ask"):
+        x = optimizer.ask()
 
     # Calculate the optimizer objective score values
-    value = ob_func.multiobjective_function(*x.args)
+    with phase_timer.phase("evaluate"):
+        value = ob_func.multiobjective_function(*x.args)
+
+    # Report the objective score values back to the optimizer
+    _nevergrad_tell(optimizer, ob_func, x, value, no_bias=no_bias)
+
+    # Return reference to both input and output values
+    return x, value
+
+
+def _nevergrad_tell(optimizer, ob_func, x, value, no_bias=False):
+    """Tells the Nevergrad Optimizer the result of a candidate that
+    has already been asked for and evaluated
+
+    Parameters
+    ----------
+    optimizer: nevergrad.Optimizer
+        Nevergrad Optimizer instance to perform optimization routine
+    ob_func: nevergrad.MultiobjectiveFunction or HypervolumeLoss
+        Multi-objective function instance to be optimized
+    x: nevergrad.Parameter
+        Parameter values of the evaluated candidate
+    value: float or ndarray
+        Output value calculated from objective function
+    no_bias: bool, optional
+        Whether or nor to calculate hyper-volume from objective
+        function value and return to optimizer
+
+    Return
+    ------
+    float
+        The aggregate loss told to the optimizer
+    """
 
     # Update the objective function with the new value and
     # compute the hyper-volume. If no_bias is enforced, then
@@ -67,20 +142,21 @@ def _nevergrad_ask_tell(optimizer, ob_func, no_bias=False):
     if no_bias:
         volume = 0
     else:
-        volume = ob_func.compute_aggregate_loss(
-            value, *x.args, **x.kwargs
-        )
+        with phase_timer.phase("aggregate_loss"):
+            volume = ob_func.compute_aggregate_loss(
+                value, *x.args, **x.kwargs
+            )
 
     # Tell hyper-volume information to the optimizer
-    optimizer.tell(x, volume)
-
-    # Return reference to both input and output values
-    return x, value
+    with phase_timer.phase("tell"):
+        optimizer.tell(x, volume)
+    return volume
 
 
 def nevergrad_function(*ng_params,
                        function=None,
-                       is_scalar=True):
+                       is_scalar=True,
+                       plan=None):
     """ A wrapper around the MCO objective function,
     that can be optimized by nevergrad.
 
@@ -93,6 +169,10 @@ def nevergrad_function(*ng_params,
     is_scalar: bool
         Whether or not the function should be scalar.
         (be a single-objective function).
+    plan: TranslationPlan, optional
+        Plan translating the parameters to MCO parameter values,
+        specialised for the MCO parameters. By default, the type of
+        each parameter is checked instead.
 
     Return
     ------
@@ -115,7 +195,11 @@ def nevergrad_function(*ng_params,
 
     # pack the nevergrad parameters values
     # into a list of mco parameter values.
-    mco_params = translate_ng_to_mco(list(ng_params))
+    with phase_timer.phase("translate"):
+        if plan is None:
+            mco_params = translate_ng_to_mco(list(ng_params))
+        else:
+            mco_params = plan.to_mco(ng_params)
 
     # call the MCO objective function
     objective = function(mco_params)
@@ -128,9 +212,126 @@ def nevergrad_function(*ng_params,
     return objective
 
 
-@provides(IOptimizer)
-class NevergradScalarOptimizer(HasStrictTraits):
-    """ Optimization of a scalar function using nevergrad.
+async def nevergrad_coroutine(*ng_params,
+                              function=None,
+                              is_scalar=True,
+                              plan=None):
+    """ Coroutine counterpart of nevergrad_function, wrapping an
+    MCO objective function that is itself a coroutine function.
+
+    Parameters
+    ----------
+    *ng_params: Any (but usually float, ndarray or string)
+        Parameters to be optimized.
+    function: Coroutine function
+        The MCO objective coroutine function.
+    is_scalar: bool
+        Whether or not the function should be scalar.
+        (be a single-objective function).
+    plan: TranslationPlan, optional
+        Plan translating the parameters to MCO parameter values.
+
+    Return
+    ------
+    float or ndarray
+        The objectives/kpis or their sum.
+    """
+
+    with phase_timer.phase("translate"):
+        if plan is None:
+            mco_params = translate_ng_to_mco(list(ng_params))
+        else:
+            mco_params = plan.to_mco(ng_params)
+
+    objective = await function(mco_params)
+
+    if is_scalar and not np.isscalar(objective):
+        return np.sum(objective)
+
+    return objective
+
+
+def nevergrad_batch_function(ng_params_batch,
+                             function=None,
+                             is_scalar=True,
+                             plan=None):
+    """ A wrapper around a batch MCO objective function, evaluating a
+    batch of nevergrad candidates in a single call.
+
+    Parameters
+    ----------
+    ng_params_batch: sequence of sequence of Any
+        The parameters of each candidate to be evaluated.
+    function: Callable
+        The batch MCO objective function. Takes an (N, d) array, whose
+        rows are the MCO parameter values of each of the N candidates,
+        with the (flattened) elements of array parameters in place,
+        and returns
+        an (N, k) array of the k objectives/kpis of each candidate.
+    is_scalar: bool
+        Whether or not the function should be scalar.
+        (be a single-objective function).
+    plan: TranslationPlan, optional
+        Plan translating the parameters to MCO parameter values.
+
+    Return
+    ------
+    ndarray
+        The objectives/kpis of each candidate, or their sums.
+    """
+    with phase_timer.phase("translate"):
+        if plan is None:
+            rows = [translate_ng_to_mco(list(ng_params))
+                    for ng_params in ng_params_batch]
+        else:
+            rows = [plan.to_mco(ng_params) for ng_params in ng_params_batch]
+        parameters = np.array([
+            np.concatenate([np.ravel(value) for value in row])
+            for row in rows
+        ])
+
+    objectives = np.asarray(function(parameters))
+    if len(objectives) != len(rows):
+        raise ValueError(
+            "Batch objective function returned {} results for {} "
+            "candidates".format(len(objectives), len(rows)))
+
+    if is_scalar and objectives.ndim > 1:
+        return np.sum(objectives, axis=1)
+
+    return objectives
+
+
+def iterate_async(async_generator):
+    """ Iterates over an asynchronous generator from synchronous code,
+    driving it with a private event loop.
+
+    Parameters
+    ----------
+    async_generator: AsyncGenerator
+        The asynchronous generator to iterate over
+
+    Yields
+    ------
+    Any
+        Each item yielded by the asynchronous generator
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_generator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(async_generator.aclose())
+        loop.close()
+
+
+class BaseNevergradOptimizer(HasStrictTraits):
+    """ Base class of the nevergrad optimizers, driving an ask and tell
+    loop that evaluates up to num_workers candidates concurrently,
+    within budgets of evaluations, time and cost.
     """
 
     #: Algorithms available to work with
@@ -139,19 +340,602 @@ class NevergradScalarOptimizer(HasStrictTraits):
     #: Optimization budget defines the allowed number of objective calls
     budget = PositiveInt(500)
 
-    def _algorithms_default(self):
-        return "TwoPointsDE"
+    #: Seconds the optimization may last, after which it ends cleanly
+    #: with the results found so far (0 disables)
+    time_budget = Range(0.0, None, 0.0)
+
+    #: Accumulated evaluation cost the optimization may incur, after
+    #: which it ends cleanly with the results found so far (0 disables)
+    cost_budget = Range(0.0, None, 0.0)
+
+    #: Optional function returning the cost of an evaluation, from its
+    #: MCO parameter values and objective value. By default, the cost
+    #: of an evaluation is the number of seconds it took.
+    cost_function = Callable()
+
+    #: Number of candidates evaluated concurrently
+    num_workers = PositiveInt(1)
+
+    #: Number of candidates evaluated together by a batch objective
+    #: function, taking the parameters of all of them as a single
+    #: array (0 for an objective function of a single point)
+    batch_size = Int(0)
+
+    #: Type of executor used to evaluate candidates when
+    #: num_workers > 1. Process pools require the objective
+    #: function to be picklable.
+    executor_type = Enum(*EXECUTOR_TYPES)
 
-    def get_optimizer(self, params):
+    #: Optional cache of objective values, used to avoid evaluating
+    #: the objective function at the same point more than once
+    cache = Instance(EvaluationCache)
 
-        instrumentation = translate_mco_to_ng(params)
+    #: Whether or not candidates found in the cache count towards
+    #: the optimization budget
+    cache_uses_budget = Bool(False)
 
+    #: Optional suppression of candidates identical, in MCO parameter
+    #: values, to one being evaluated or evaluated recently
+    deduplicator = Instance(CandidateDeduplicator)
+
+    #: Progress of the current, or last, optimization run
+    statistics = Instance(RunStatistics, visible=False, transient=True)
+
+    #: Optional periodic export of the progress metrics of the run
+    metrics = Instance(MetricsExporter)
+
+    #: Throttled logging of the progress of the run
+    progress = Instance(ProgressReporter, ())
+
+    #: Encoding of the MCO parameters for nevergrad: each one as a
+    #: separate nevergrad parameter, or all continuous and ordinal
+    #: dimensions packed into a single bounded array ("flat"), which
+    #: is much faster to optimize in large parameter spaces
+    encoding = Enum("separate", "flat")
+
+    #: Optional surrogate model of the objective, fitted on the
+    #: evaluations of the run, used to pre-screen candidates before
+    #: they are evaluated
+    surrogate = Instance(BaseSurrogate)
+
+    #: Number of candidates asked for and scored by the surrogate for
+    #: each candidate evaluated
+    screening_ratio = PositiveInt(10)
+
+    #: Weight of the uncertainty of the surrogate predictions in the
+    #: screening: 0 selects the candidates predicted to be best, and
+    #: larger values increasingly favour the most uncertain
+    exploration = Float(1.0)
+
+    #: Constraints on the MCO parameter values: functions of a list of
+    #: values, returning whether or not they are feasible. Candidates
+    #: that are not are rejected by the optimizer as it asks for them,
+    #: and never evaluated.
+    constraints = List(Callable)
+
+    #: Constraints of the current run, counting the candidates they
+    #: reject
+    _cheap_constraints = List(Instance(CheapConstraint), transient=True)
+
+    #: Encoding of the parameters of the current run, if flat
+    _flat_encoding = Instance(FlatEncoding, transient=True)
+
+    #: Whether or not the optimization has been asked to stop
+    #: requesting new candidates
+    _stop_asking = Bool(False)
+
+    def _algorithms_default(self):
+        return "TwoPointsDE"
+
+    def get_parametrization(self, params, constrained=True):
+        """Returns the nevergrad parametrization of the MCO parameters,
+        in the chosen encoding, with the constraints of the run unless
+        constrained is False"""
+        constraints = self._cheap_constraints if constrained else None
+        if self.encoding == "flat":
+            return FlatEncoding(params).parametrization(
+                constraints=constraints)
+        return translate_mco_to_ng(params, constraints=constraints)
+
+    def get_translation(self, params):
+        """Returns the translation of nevergrad values of the
+        parametrization to MCO parameter values: a TranslationPlan,
+        or a FlatEncoding if the parameters are packed into an array.
+        """
+        if self.encoding == "flat":
+            return FlatEncoding(params)
+        return translation_plan(params)
+
+    def get_optimizer(self, params, budget=None):
+        """Returns the nevergrad optimizer of the parameters, expecting
+        to be told budget candidates (by default, the budget)"""
+        instrumentation = self.get_parametrization(params)
         return ng.optimizers.registry[self.algorithms](
             parametrization=instrumentation,
-            budget=self.budget
+            budget=self.budget if budget is None else budget,
+            num_workers=max(self.num_workers, self.batch_size)
         )
 
-    def optimize_function(self, func, params):
+    def get_executor(self):
+        """Returns a concurrent executor with num_workers workers"""
+        return EXECUTOR_TYPES[self.executor_type](
+            max_workers=self.num_workers)
+
+    def _get_function(self, func, is_scalar, plan=None):
+        """Wraps the MCO function into a nevergrad function, along with
+        the executor it should be evaluated in, if any. Parameters are
+        translated by the plan, if one is provided.
+
+        Coroutine functions are awaited in the running event loop, so
+        need no executor. Synchronous functions are evaluated in an
+        executor when num_workers > 1. Batch functions, used when
+        batch_size > 0, are called in turn with each batch.
+        """
+        ng_func = self._wrap_function(func, is_scalar, plan=plan)
+        if self.batch_size > 0 or _is_coroutine_function(func):
+            executor = None
+        else:
+            executor = (
+                self.get_executor() if self.num_workers > 1 else None)
+        return ng_func, executor
+
+    def _wrap_function(self, func, is_scalar, plan=None):
+        """Wraps the MCO function into a nevergrad function: a batch
+        function when batch_size > 0, a coroutine function if the MCO
+        function is one, or otherwise a synchronous function."""
+        if self.batch_size > 0:
+            wrapper = nevergrad_batch_function
+        elif _is_coroutine_function(func):
+            wrapper = nevergrad_coroutine
+        else:
+            wrapper = nevergrad_function
+        return partial(wrapper,
+                       function=func,
+                       is_scalar=is_scalar,
+                       plan=plan
+                       )
+
+    def _record_cost(self, x, value, duration):
+        """Adds the cost of an evaluation to the run statistics"""
+        self.statistics.total_cost += _evaluation_cost(
+            self.cost_function, x, value, duration, plan=self._flat_encoding)
+
+    def _check_budgets(self, statistics):
+        """Stops asking for new candidates once the time or cost budget
+        of the optimization is used up."""
+        if self._stop_asking:
+            return
+        reason = statistics.exhausted_budget(
+            self.time_budget, self.cost_budget)
+        if reason:
+            log.info("Stopping after {} evaluations: {}".format(
+                statistics.n_evaluations, reason))
+            self._stop_asking = True
+
+    def progress_metrics(self):
+        """ Returns the progress metrics of the current, or last, run
+
+        Return
+        ------
+        dict
+            Value of each metric described in METRIC_DESCRIPTIONS, or
+            None if it does not apply
+        """
+        statistics = self.statistics
+        return {
+            "evaluations": statistics.n_evaluations,
+            "evaluations_per_second": statistics.evaluations_per_second,
+            "in_flight": statistics.n_in_flight,
+            "cache_hit_rate": (
+                None if self.cache is None else self.cache.hit_rate),
+            "total_cost": statistics.total_cost,
+            "elapsed_seconds": statistics.elapsed_time,
+            "seconds_to_budget": self._seconds_to_budget(statistics),
+            "hypervolume": None,
+            "pareto_size": None,
+            "surrogate_fit_seconds": (
+                None if self.surrogate is None else self.surrogate.fit_time),
+            "surrogate_predict_seconds": (
+                None if self.surrogate is None
+                else self.surrogate.predict_time),
+            "rejected_candidates": (
+                sum(constraint.n_rejected
+                    for constraint in self._cheap_constraints)
+                if self._cheap_constraints else None),
+            "duplicate_candidates": (
+                None if self.deduplicator is None
+                else self.deduplicator.n_suppressed),
+            "low_fidelity_evaluations": None,
+            "promotion_rate": None,
+        }
+
+    def _seconds_to_budget(self, statistics):
+        """Estimates the seconds until the first of the evaluation,
+        time and cost budgets is used up, at the average rate so far,
+        or returns None before anything can be estimated."""
+        elapsed_time = statistics.elapsed_time
+        estimates = []
+        rate = statistics.evaluations_per_second
+        if rate > 0:
+            estimates.append(
+                max(self.budget - statistics.n_evaluations, 0) / rate)
+        if self.time_budget > 0:
+            estimates.append(max(self.time_budget - elapsed_time, 0.0))
+        if self.cost_budget > 0 and statistics.total_cost > 0:
+            estimates.append(
+                max(self.cost_budget - statistics.total_cost, 0.0)
+                * elapsed_time / statistics.total_cost)
+        return min(estimates) if estimates else None
+
+    def _export_metrics(self, finished=False):
+        """Exports the progress metrics, if an export is due or the
+        run has finished"""
+        if self.metrics is None:
+            return
+        if finished or self.metrics.is_due():
+            metrics = self.progress_metrics()
+            metrics["finished"] = int(finished)
+            self.metrics.export(metrics)
+
+    def _is_serial(self, function, executor):
+        """Whether or not candidates evaluated by the function
+        must be processed one at a time"""
+        return (executor is None
+                and not _is_coroutine_function(function))
+
+    async def _ask_tell_async(self, optimizer, function, tell,
+                              n_evaluations, executor=None,
+                              statistics=None):
+        """Asks for, evaluates and tells n_evaluations candidates,
+        keeping up to num_workers candidates in flight at any time.
+        Each candidate is passed to tell along with its objective
+        values, and then yielded with them, as soon as its evaluation
+        completes.
+
+        Synchronous objective functions are evaluated in the executor,
+        or in turn if no executor is provided. Coroutine functions are
+        awaited in the running event loop.
+
+        Candidates found in the evaluation cache are told straight
+        away, and only count towards n_evaluations if cache_uses_budget
+        is set.
+
+        If a deduplicator is provided, duplicates of recent evaluations
+        are told straight away as well, while duplicates of candidates
+        in flight are told once their evaluation completes. Under the
+        "wait" policy, no other candidate is asked for until then, and
+        under the "reask" policy, others are asked for straight away,
+        until there are as many duplicates in a row as candidates in
+        flight. Duplicates do not count towards n_evaluations.
+
+        If provided, the RunStatistics are updated as candidates are
+        evaluated and told.
+
+        Once the optimizer is asked to stop, no new candidates are
+        asked for, but those in flight are still evaluated and told.
+
+        If batch_size > 0, the function is a batch function, and
+        candidates are asked for, evaluated and told batch_size at a
+        time instead.
+        """
+        if statistics is None:
+            statistics = RunStatistics()
+
+        if self.surrogate is not None:
+            tell = self._surrogate_tell(optimizer, tell)
+
+        if self.batch_size > 0:
+            async for x, value in self._batch_ask_tell_async(
+                    optimizer, function, tell, n_evaluations, statistics):
+                yield x, value
+            return
+
+        serial = self._is_serial(function, executor)
+
+        running = {}
+        n_evaluated = 0
+        n_repeats = 0
+        n_in_flight_repeats = 0
+
+        try:
+            while running or (n_evaluated < n_evaluations
+                              and not self._stop_asking):
+
+                # Top up the pool of candidates being evaluated
+                while n_evaluated < n_evaluations \
+                        and len(running) < self.num_workers:
+                    self._check_budgets(statistics)
+                    self._export_metrics()
+                    if self._stop_asking:
+                        break
+                    x = self._ask(optimizer)[0]
+
+                    key, value = self._cache_lookup(x)
+                    duplicate_key = None
+                    if value is not None:
+                        phase_timer.count("cache_hits")
+                        if self.cache_uses_budget:
+                            n_evaluated += 1
+                            statistics.n_evaluations += 1
+                    else:
+                        duplicate_key, value = self._duplicate_lookup(x)
+                    if value is not None:
+                        tell(x, value)
+                        statistics.n_told += 1
+                        yield x, value
+
+                        n_repeats += 1
+                        if n_repeats >= n_evaluations:
+                            # The optimizer keeps asking for points it
+                            # has already seen, so give up on the rest
+                            log.warning(
+                                "Stopping after {} repeated candidates"
+                                .format(n_repeats))
+                            n_evaluations = n_evaluated
+                        continue
+
+                    if self._is_in_flight(duplicate_key):
+                        # Do not start another evaluation of the same
+                        # point, but tell it the result once it
+                        # completes, and wait for a completion before
+                        # asking for more if the policy or the
+                        # optimizer requires it
+                        phase_timer.count("duplicates")
+                        self.deduplicator.suppress(duplicate_key, x)
+                        n_in_flight_repeats += 1
+                        if (self.deduplicator.policy == "wait"
+                                or n_in_flight_repeats >= len(running)):
+                            break
+                        continue
+
+                    n_repeats = 0
+                    n_in_flight_repeats = 0
+                    n_evaluated += 1
+
+                    if serial:
+                        start_time = time.time()
+                        value = function(*x.args)
+                        duration = time.time() - start_time
+                        phase_timer.record("evaluate", duration)
+                        self._cache_store(key, value)
+                        self._duplicate_store(duplicate_key, value)
+                        statistics.n_evaluations += 1
+                        self.progress.update(statistics, self.budget)
+                        self._record_cost(x, value, duration)
+                        tell(x, value)
+                        statistics.n_told += 1
+                        yield x, value
+                    else:
+                        task = asyncio.ensure_future(
+                            _evaluate_async(function, x, executor))
+                        running[task] = key, duplicate_key, time.time()
+                        statistics.n_in_flight = len(running)
+                        if self.deduplicator is not None:
+                            self.deduplicator.start(duplicate_key)
+
+                if not running:
+                    continue
+
+                # Report back any candidates that have completed
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED)
+                n_in_flight_repeats = 0
+                for task in done:
+                    key, duplicate_key, start_time = running.pop(task)
+                    statistics.n_in_flight = len(running)
+                    x, value = task.result()
+                    duration = time.time() - start_time
+                    phase_timer.record("evaluate", duration)
+                    self._cache_store(key, value)
+                    duplicates = self._duplicate_store(duplicate_key, value)
+                    statistics.n_evaluations += 1
+                    self.progress.update(statistics, self.budget)
+                    self._record_cost(x, value, duration)
+                    for x in [x] + duplicates:
+                        tell(x, value)
+                        statistics.n_told += 1
+                        yield x, value
+        finally:
+            # Do not leave evaluations running if we are stopped early
+            for task in running:
+                task.cancel()
+
+    async def _batch_ask_tell_async(self, optimizer, function, tell,
+                                    n_evaluations, statistics):
+        """Asks for, evaluates and tells n_evaluations candidates in
+        batches of batch_size, each evaluated by a single call of the
+        batch function. Candidates found in the evaluation cache, or
+        duplicates of recent evaluations, are left out of the batch, and
+        told straight away. Duplicates within a batch are evaluated once.
+        """
+        n_evaluated = 0
+        n_repeats = 0
+        while n_evaluated < n_evaluations:
+            self._check_budgets(statistics)
+            self._export_metrics()
+            if self._stop_asking:
+                break
+
+            n_batch = min(self.batch_size, n_evaluations - n_evaluated)
+            candidates = self._ask(optimizer, n_batch)
+
+            batch = []
+            for x in candidates:
+                key, value = self._cache_lookup(x)
+                duplicate_key = None
+                if value is not None:
+                    phase_timer.count("cache_hits")
+                    if self.cache_uses_budget:
+                        n_evaluated += 1
+                        statistics.n_evaluations += 1
+                else:
+                    duplicate_key, value = self._duplicate_lookup(x)
+                if value is not None:
+                    tell(x, value)
+                    statistics.n_told += 1
+                    yield x, value
+                elif self._is_in_flight(duplicate_key):
+                    phase_timer.count("duplicates")
+                    self.deduplicator.suppress(duplicate_key, x)
+                else:
+                    if self.deduplicator is not None:
+                        self.deduplicator.start(duplicate_key)
+                    batch.append((x, key, duplicate_key))
+
+            if not batch:
+                n_repeats += n_batch
+                if n_repeats >= n_evaluations:
+                    log.warning(
+                        "Stopping after {} repeated candidates"
+                        .format(n_repeats))
+                    break
+                continue
+            n_repeats = 0
+
+            start_time = time.time()
+            values = function([x.args for x, _, _ in batch])
+            duration = time.time() - start_time
+            phase_timer.record("evaluate", duration)
+
+            n_evaluated += len(batch)
+            statistics.n_evaluations += len(batch)
+            self.progress.update(statistics, self.budget)
+            for (x, key, duplicate_key), value in zip(batch, values):
+                self._cache_store(key, value)
+                duplicates = self._duplicate_store(duplicate_key, value)
+                self._record_cost(x, value, duration / len(batch))
+                for x in [x] + duplicates:
+                    tell(x, value)
+                    statistics.n_told += 1
+                    yield x, value
+
+    def _ask(self, optimizer, n_candidates=1):
+        """Asks the optimizer for candidates to evaluate.
+
+        Once the surrogate model is ready, screening_ratio times as
+        many candidates are asked for, and only those with the best
+        screening scores, from their optimistic predicted values, are
+        returned.
+
+        Returns
+        -------
+        list of nevergrad.Parameter
+            The n_candidates candidates
+        """
+        screening = (
+            self.surrogate is not None and self.screening_ratio > 1
+            and self.surrogate.is_ready()
+        )
+        n_asked = n_candidates * (self.screening_ratio if screening else 1)
+        with phase_timer.phase("ask"):
+            candidates = [optimizer.ask() for _ in range(n_asked)]
+        if not screening:
+            return candidates
+
+        mean, std = self.surrogate.predict([
+            _surrogate_input(optimizer, x) for x in candidates])
+        scores = self._screening_scores(mean - self.exploration * std)
+        phase_timer.count("screened_out", n_asked - n_candidates)
+        selected = np.argsort(scores, kind="stable")[:n_candidates]
+        return [candidates[index] for index in selected]
+
+    def _screening_scores(self, values):
+        """Scores candidates by their predicted objective values, of
+        shape (n, k): the lower the better"""
+        return np.sum(values, axis=1)
+
+    def _surrogate_tell(self, optimizer, tell):
+        """Wraps tell, to also add each told candidate and its
+        objective values to the surrogate model"""
+        def surrogate_tell(x, value):
+            self.surrogate.add(_surrogate_input(optimizer, x), value)
+            tell(x, value)
+        return surrogate_tell
+
+    def _reset_constraints(self):
+        """Sets up the constraints of a new run, with their counts of
+        rejected candidates at zero"""
+        self._cheap_constraints = [
+            CheapConstraint(function=function)
+            for function in self.constraints
+        ]
+
+    def _log_constraints(self):
+        """Logs the number of candidates rejected by the constraints
+        over the run"""
+        if self._cheap_constraints:
+            log.info(
+                "Constraints rejected {} of {} candidates".format(
+                    sum(constraint.n_rejected
+                        for constraint in self._cheap_constraints),
+                    self._cheap_constraints[0].n_checked))
+
+    def _log_surrogate(self):
+        """Logs the cost of the surrogate model over the run"""
+        if self.surrogate is not None:
+            log.info(
+                "Surrogate model: {fits} fits on {points} points in "
+                "{fit_time:.3f} s, {predictions} predictions in "
+                "{predict_time:.3f} s".format(
+                    **self.surrogate.statistics()))
+
+    def _log_duplicates(self):
+        """Logs the number of duplicate candidates suppressed over the
+        run"""
+        if self.deduplicator is not None:
+            log.info(
+                "Suppressed {suppressed} duplicate candidates: {recent} "
+                "recently evaluated, {waited} waited for an evaluation "
+                "in flight, {reasked} re-asked".format(
+                    **self.deduplicator.statistics()))
+
+    def _mco_values(self, x):
+        """Returns the MCO parameter values of candidate x"""
+        return _to_mco(x.args, self._flat_encoding)
+
+    def _cache_lookup(self, x):
+        """Returns the evaluation cache key of candidate x, along with
+        its cached objective value, or None if it has not been cached.
+        """
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(self._mco_values(x))
+        return key, self.cache.lookup(key)
+
+    def _duplicate_lookup(self, x):
+        """Returns the deduplication key of candidate x, along with the
+        objective value of a recent evaluation of the same point, or
+        None if there is none."""
+        if self.deduplicator is None:
+            return None, None
+        key = self.deduplicator.key(self._mco_values(x))
+        return key, self.deduplicator.lookup(key)
+
+    def _is_in_flight(self, duplicate_key):
+        """Whether or not the same point as a candidate, with the given
+        deduplication key, is being evaluated"""
+        return (self.deduplicator is not None
+                and self.deduplicator.is_in_flight(duplicate_key))
+
+    def _duplicate_store(self, duplicate_key, value):
+        """Records the objective value of an evaluation for its
+        duplicates, returning those that waited for it"""
+        if self.deduplicator is None:
+            return []
+        return self.deduplicator.finish(duplicate_key, value)
+
+    def _cache_store(self, key, value):
+        """Stores the objective value in the evaluation cache"""
+        if self.cache is not None:
+            self.cache.store(key, value)
+
+
+@provides(IOptimizer)
+class NevergradScalarOptimizer(BaseNevergradOptimizer):
+    """ Optimization of a scalar function using nevergrad.
+    """
+
+    def optimize_function(self, func, params, verbose_run=False):
         """ Minimize the passed scalar function.
 
         Parameters
@@ -161,49 +945,163 @@ class NevergradScalarOptimizer(HasStrictTraits):
             Takes a list of MCO parameter values.
         params: list of MCOParameter
             The MCO parameter objects corresponding to the parameters.
+        verbose_run: Bool, optional
+            Whether or not to return all points generated during the
+            optimization procedure, or just those improving on the
+            best point found so far.
 
         Yields
         ------
         list of float or list:
-            The list of optimal parameter values.
+            The list of parameter values of each new best point, as it
+            is found, and finally of the optimal point.
+
+        Notes
+        -----
+        This is a synchronous wrapper around optimize_function_async.
         """
-        # Create optimizer.
-        optimizer = self.get_optimizer(params)
+        yield from iterate_async(
+            self.optimize_function_async(
+                func, params, verbose_run=verbose_run)
+        )
+
+    async def optimize_function_async(self, func, params,
+                                      verbose_run=False):
+        """ Asynchronously minimize the passed scalar function.
+
+        Parameters
+        ----------
+        func: Callable or Coroutine function
+            The MCO function to optimize
+            Takes a list of MCO parameter values. If a coroutine
+            function, up to num_workers evaluations will be awaited
+            concurrently in the running event loop.
+        params: list of MCOParameter
+            The MCO parameter objects corresponding to the parameters.
+        verbose_run: Bool, optional
+            Whether or not to return all points generated during the
+            optimization procedure, or just those improving on the
+            best point found so far.
 
+        Yields
+        ------
+        list of float or list:
+            The list of parameter values of each new best point, as it
+            is found, and finally of the optimal point.
+        """
         # Create a scalar objective Nevergrad function from
         # the MCO function.
-        ng_func = partial(nevergrad_function,
-                          function=func,
-                          is_scalar=True
-                          )
+        plan = self.get_translation(params)
+        self._flat_encoding = plan if self.encoding == "flat" else None
+        ng_func, executor = self._get_function(
+            func, is_scalar=True, plan=plan)
+
+        self.statistics = RunStatistics()
+        self.progress.reset()
+        self._stop_asking = False
+        self._reset_constraints()
+        if self.surrogate is not None:
+            self.surrogate.reset()
+        if self.deduplicator is not None:
+            self.deduplicator.reset()
+
+        # Create optimizer.
+        optimizer = self.get_optimizer(params)
+
+        def tell(x, value):
+            with phase_timer.phase("tell"):
+                optimizer.tell(x, float(value))
+
+        best_value = np.inf
+        best_point = None
+        try:
+            # Optimize, until the budget of evaluations, time or
+            # cost is used up.
+            async for x, value in self._ask_tell_async(
+                    optimizer, ng_func, tell, self.budget,
+                    executor=executor, statistics=self.statistics):
+                point = plan.to_mco(x.args)
+                if value < best_value:
+                    best_value = value
+                    best_point = point
+                    yield point
+                elif verbose_run:
+                    yield point
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self._export_metrics(finished=True)
+        self._log_surrogate()
+        self._log_constraints()
+        self._log_duplicates()
 
-        # Optimize.
         # This returns an nevergrad Instrumentation object.
-        optimization_result = optimizer.minimize(ng_func)
+        optimization_result = optimizer.provide_recommendation()
 
-        # Convert the optimal point into MCO format
-        yield translate_ng_to_mco(list(optimization_result.args))
+        # Convert the optimal point into MCO format, unless it is the
+        # best point already reported
+        optimal_point = _to_mco(
+            optimization_result.args, self._flat_encoding)
+        if optimal_point != best_point:
+            yield optimal_point
 
 
 @provides(IOptimizer)
-class NevergradMultiOptimizer(HasStrictTraits):
+class NevergradMultiOptimizer(BaseNevergradOptimizer):
     """ Optimization of a multi-objective function using nevergrad.
     """
 
-    #: Algorithms available to work with
-    algorithms = Enum(*ALGORITHMS_KEYS)
-
-    #: Optimization budget defines the allowed number of objective calls
-    budget = PositiveInt(500)
-
     #: Defines the sample size to estimate the KPI upper bounds
     bound_sample = PositiveInt(15)
 
+    #: How to set the upper bounds of KPIs without one: either from the
+    #: maxima of a calibration sample evaluated before the optimization
+    #: ("sample"), or from the running minima and maxima of the KPIs,
+    #: adapted as the optimization progresses ("online"). The online
+    #: mode always uses a normalized hypervolume aggregate loss, and
+    #: ignores any defined upper bounds.
+    bound_estimation = Enum("sample", "online")
+
+    #: Nevergrad sampler used to draw the space-filling sample of
+    #: candidates that estimates the KPI upper bounds
+    calibration_sampler = Enum(
+        "ScrHammersleySearch", "LHSSearch", "RandomSearch")
+
     #: List of upper bounds for KPI values
     upper_bounds = List(Union(None, Float), visible=False, transient=True)
 
-    def _algorithms_default(self):
-        return "TwoPointsDE"
+    #: Aggregate loss told to the optimizer: either the incrementally
+    #: updated HypervolumeLoss, or nevergrad's MultiobjectiveFunction,
+    #: which rescans its whole Pareto front on every evaluation
+    aggregate_loss = Enum(*AGGREGATE_LOSSES)
+
+    #: Optional periodic checkpointing of the optimization state
+    checkpoint = Instance(Checkpointer)
+
+    #: Whether or not to resume the optimization from the last
+    #: checkpoint, if there is one
+    resume = Bool(False)
+
+    #: Pareto front of the current, or last, optimization run, updated
+    #: as each candidate is told to the optimizer
+    archive = Instance(ParetoArchive, visible=False, transient=True)
+
+    #: Hypervolume loss measuring the volume of the Pareto front of the
+    #: current, or last, optimization run: the aggregate loss itself,
+    #: or one given each new member of the archive
+    _volume_loss = Instance(HypervolumeLoss, transient=True)
+
+    #: Optional convergence criteria, that end the optimization before
+    #: the budget is used up. Evaluations already in flight when a
+    #: criterion is met are still completed and reported.
+    stopping = Instance(StoppingCriteria)
+
+    #: Whether or not to yield each new member of the Pareto front as
+    #: soon as it is found, rather than the final Pareto front at the
+    #: end of a run that is not verbose. Members that are later
+    #: dominated are reported by the removed event of the archive.
+    stream_front = Bool(False)
 
     def _valid_upper_bounds(self):
         """Returns whether or not the KPI upper bounds need to be
@@ -217,27 +1115,172 @@ class NevergradMultiOptimizer(HasStrictTraits):
         # we need to estimate
         return all([value is not None for value in self.upper_bounds])
 
-    def _calculate_upper_bounds(self, optimizer, function):
-        """Uses Nevergrad's MultiobjectiveFunction.compute_aggregate_loss
-        protocol to estimate the upper bounds of each output KPI. This
-        is only needed if we have a mixture of KPIs that use bounds and
-        do not use bounds.
-        """
+    def get_calibration_sample(self, optimizer, params):
+        """Returns a space-filling sample of candidates, used to estimate
+        the upper bounds of each output KPI.
 
-        ob_func = MultiobjectiveFunction(
-            multiobjective_function=function)
+        The candidates are drawn by the calibration_sampler over a copy
+        of the optimizer parametrization, so they are not asked from the
+        optimizer itself. Once they have been evaluated, and the bounds
+        are known, they can be told to the optimizer like any other.
+        Candidates that do not satisfy the constraints are left out,
+        and replaced by further points of the sampler, up to ten times
+        as many as the sample holds.
+
+        Parameters
+        ----------
+        optimizer: nevergrad.Optimizer
+            Nevergrad Optimizer instance the candidates are drawn for
+        params: list of MCOParameter
+            The MCO parameters of the optimizer parametrization
+
+        Returns
+        -------
+        list of nevergrad.Parameter
+            Distinct candidates of the optimizer parametrization
+
+        Raises
+        ------
+        ValueError
+            If none of the points drawn satisfies the constraints
+        """
+        n_samples = min(self.bound_sample, self.budget)
+        parametrization = optimizer.parametrization
+        n_rounds = 10 if self._cheap_constraints else 1
+
+        # The samplers have a fixed sequence of points, so a single one
+        # is drawn from, without resampling those that violate the
+        # constraints themselves
+        reference = self.get_parametrization(params, constrained=False)
+        sampler = ng.optimizers.registry[self.calibration_sampler](
+            parametrization=reference,
+            budget=n_rounds * n_samples
+        )
+        candidates = []
+        drawn = set()
+        for _ in range(n_rounds * n_samples):
+            sample = sampler.ask()
+            data = sample.get_standardized_data(reference=reference)
+            if data.tobytes() in drawn:
+                continue
+            drawn.add(data.tobytes())
+            candidate = parametrization.spawn_child()
+            candidate.set_standardized_data(data)
+            if candidate.satisfies_constraints():
+                candidates.append(candidate)
+                if len(candidates) == n_samples:
+                    break
+
+        if n_samples and not candidates:
+            raise ValueError(
+                "None of the {} calibration points drawn satisfies the "
+                "constraints".format(len(drawn)))
+        return candidates
+
+    async def _evaluate_batch_async(self, function, candidates,
+                                    executor=None):
+        """Evaluates a batch of candidates, keeping up to num_workers
+        evaluations in flight at once, without telling them to the
+        optimizer.
+
+        If a deduplicator is provided, duplicates of recent evaluations
+        are not evaluated again, and duplicates within the batch are
+        evaluated once.
+
+        Returns
+        -------
+        list of tuple
+            The candidates, each paired with its objective value, in
+            the order they were given
+        """
+        if self.deduplicator is None:
+            return await self._evaluate_unique_async(
+                function, candidates, executor)
+
+        keys = [self.deduplicator.key(self._mco_values(x))
+                for x in candidates]
+        values = {}
+        unique = []
+        for key, x in zip(keys, candidates):
+            if key in values:
+                self.deduplicator.n_waited += 1
+                continue
+            values[key] = self.deduplicator.lookup(key)
+            if values[key] is None:
+                unique.append((key, x))
+
+        results = await self._evaluate_unique_async(
+            function, [x for _, x in unique], executor)
+        for (key, _), (_, value) in zip(unique, results):
+            values[key] = value
+            self._duplicate_store(key, value)
+        return [(x, values[key]) for key, x in zip(keys, candidates)]
+
+    async def _evaluate_unique_async(self, function, candidates,
+                                     executor=None):
+        """Evaluates a batch of candidates, as _evaluate_batch_async,
+        without looking for duplicates"""
+        async def evaluate(x):
+            key, value = self._cache_lookup(x)
+            if value is None:
+                async with semaphore:
+                    start_time = time.time()
+                    _, value = await _evaluate_async(function, x, executor)
+                duration = time.time() - start_time
+                phase_timer.record("evaluate", duration)
+                self._record_cost(x, value, duration)
+                self._cache_store(key, value)
+            return x, value
+
+        if self.batch_size > 0:
+            results = [self._cache_lookup(x) for x in candidates]
+            batch = [
+                (index, key) for index, (key, value) in enumerate(results)
+                if value is None
+            ]
+            if batch:
+                start_time = time.time()
+                values = function([candidates[index].args
+                                   for index, _ in batch])
+                duration = time.time() - start_time
+                phase_timer.record("evaluate", duration)
+                for (index, key), value in zip(batch, values):
+                    self._record_cost(
+                        candidates[index], value, duration / len(batch))
+                    self._cache_store(key, value)
+                    results[index] = key, value
+            return [(x, value)
+                    for x, (_, value) in zip(candidates, results)]
+
+        if self._is_serial(function, executor):
+            results = []
+            for x in candidates:
+                key, value = self._cache_lookup(x)
+                if value is None:
+                    start_time = time.time()
+                    value = function(*x.args)
+                    duration = time.time() - start_time
+                    phase_timer.record("evaluate", duration)
+                    self._record_cost(x, value, duration)
+                    self._cache_store(key, value)
+                results.append((x, value))
+            return results
+
+        semaphore = asyncio.Semaphore(self.num_workers)
+        return await asyncio.gather(*[evaluate(x) for x in candidates])
+
+    def _estimate_upper_bounds(self, values):
+        """Estimates the upper bound of each KPI as the highest value
+        in a sample of KPI scores, and uses it to replace those upper
+        bounds that are not defined.
+        """
 
         # Prior estimate of upper_bounds ensures the calculated KPIs
         # are always higher
         upper_bounds = np.array([-np.inf])
 
-        # Calculate a small random sample of output KPI scores
-        for _ in range(self.bound_sample):
-            # Use the optimizer to generate a new input / output point
-            x, value = _nevergrad_ask_tell(
-                optimizer, ob_func, no_bias=True)
-
-            # Keep track of the highest bound
+        # Keep track of the highest bound
+        for value in values:
             upper_bounds = np.maximum(upper_bounds, value)
 
         # And replace those not defined
@@ -246,16 +1289,10 @@ class NevergradMultiOptimizer(HasStrictTraits):
             for estimate, bound in zip(upper_bounds, self.upper_bounds)
         ]
 
-    def get_optimizer(self, params):
-
-        instrumentation = translate_mco_to_ng(params)
-        return ng.optimizers.registry[self.algorithms](
-            parametrization=instrumentation,
-            budget=self.budget
-        )
-
     def get_multiobjective_function(self, ng_func, upper_bounds=None):
-        return MultiobjectiveFunction(
+        if self.bound_estimation == "online":
+            return OnlineHypervolumeLoss(ng_func)
+        return AGGREGATE_LOSSES[self.aggregate_loss](
             multiobjective_function=ng_func,
             upper_bounds=upper_bounds
         )
@@ -279,44 +1316,301 @@ class NevergradMultiOptimizer(HasStrictTraits):
         list of float or list:
             The list of parameter values for a single member
             of the Pareto set.
+
+        Notes
+        -----
+        This is a synchronous wrapper around optimize_function_async.
         """
+        yield from iterate_async(
+            self.optimize_function_async(
+                func, params, verbose_run=verbose_run)
+        )
 
-        # Create optimizer.
-        optimizer = self.get_optimizer(params)
+    async def optimize_function_async(self, func, params,
+                                      verbose_run=False):
+        """ Asynchronously minimize the passed multi-objective function.
+
+        Parameters
+        ----------
+        func: Callable or Coroutine function
+            The MCO function to optimize
+            Takes a list of MCO parameter values. If a coroutine
+            function, up to num_workers evaluations will be awaited
+            concurrently in the running event loop.
+        params: list of MCOParameter
+            The MCO parameter objects corresponding to the parameters.
+        verbose_run: Bool, optional
+            Whether or not to return all points generated during the
+            optimization procedure, or just those on the Pareto front.
+
+        Yields
+        ------
+        list of float or list:
+            The list of parameter values for a single member
+            of the Pareto set.
+        """
 
         # Create a multi-objective nevergrad function from
         # the MCO function.
-        ng_func = partial(nevergrad_function,
-                          function=func,
-                          is_scalar=False
-                          )
-
-        # If a complete set of KPI upper bounds are defined, use them.
-        # Otherwise use Nevergrad to estimate those not defined
-        if self._valid_upper_bounds():
-            upper_bounds = self.upper_bounds
-        else:
-            # Estimate all KPI upper bounds
-            upper_bounds = self._calculate_upper_bounds(optimizer, ng_func)
-
-        # Create a MultiobjectiveFunction object with assigned upper bounds
-        ob_func = self.get_multiobjective_function(ng_func, upper_bounds)
-
-        # Perform all calculations in the budget
-        for index in range(self.budget):
-            log.info("Doing  MCO run # {} / {}".format(index, self.budget))
-
-            # Generate and solve a new input point
-            x, _ = _nevergrad_ask_tell(optimizer, ob_func)
-
-            # If verbose, report back all points, not just those in
-            # Pareto front
-            if verbose_run:
-                yield translate_ng_to_mco(x.args)
-
-        # If not verbose, yield each member of the Pareto set.
-        # x is a tuple - ((<vargs parameters>), {<kwargs parameters>})
-        # return the vargs, translated into mco.
-        if not verbose_run:
-            for x in ob_func.pareto_front():
-                yield translate_ng_to_mco(list(x[0]))
+        plan = self.get_translation(params)
+        self._flat_encoding = plan if self.encoding == "flat" else None
+        ng_func, executor = self._get_function(
+            func, is_scalar=False, plan=plan)
+
+        self.statistics = RunStatistics()
+        self.progress.reset()
+        self._stop_asking = False
+        self._reset_constraints()
+        if self.surrogate is not None:
+            self.surrogate.reset()
+        if self.deduplicator is not None:
+            self.deduplicator.reset()
+        self._volume_loss = None
+        if self.stopping is not None:
+            self.stopping.reset()
+
+        # Continue from the last checkpoint, if requested
+        state = None
+        if self.resume and self.checkpoint is not None:
+            state = self.checkpoint.load()
+
+        try:
+            if state is not None:
+                log.info("Resuming after {} evaluations from {}".format(
+                    state['n_evaluations'], self.checkpoint.path))
+                optimizer = state['optimizer']
+                # The optimizer checks the constraints it was pickled
+                # with, which hold the counts of the run so far
+                self._cheap_constraints = state.get('constraints', [])
+                upper_bounds = state['upper_bounds']
+                ob_func = self.get_multiobjective_function(
+                    ng_func, upper_bounds)
+                restore_archive_state(ob_func, state['archive'])
+                self._set_archive(
+                    ob_func, upper_bounds, state['pareto_archive'])
+                self.statistics.n_evaluations = state['n_evaluations']
+                self.statistics.total_cost = state.get('total_cost', 0.0)
+            else:
+                # Create optimizer.
+                optimizer = self.get_optimizer(params)
+
+                # Online bounds are adapted by the multi-objective
+                # function itself. Otherwise, if a complete set of KPI
+                # upper bounds are defined, use them, or evaluate a
+                # calibration sample to estimate those not defined
+                calibration = []
+                if self.bound_estimation == "online":
+                    upper_bounds = None
+                elif self._valid_upper_bounds():
+                    upper_bounds = self.upper_bounds
+                else:
+                    calibration = await self._evaluate_batch_async(
+                        ng_func,
+                        self.get_calibration_sample(optimizer, params),
+                        executor=executor
+                    )
+                    upper_bounds = self._estimate_upper_bounds(
+                        [value for _, value in calibration])
+
+                # Create a MultiobjectiveFunction object with assigned
+                # upper bounds
+                ob_func = self.get_multiobjective_function(
+                    ng_func, upper_bounds)
+                self._set_archive(ob_func, upper_bounds)
+
+                # Now that the bounds are known, tell the optimizer the
+                # real losses of the calibration sample, which counts
+                # towards the budget like any other evaluation
+                for x, value in calibration:
+                    self.statistics.n_evaluations += 1
+                    _nevergrad_tell(optimizer, ob_func, x, value)
+                    if self.surrogate is not None:
+                        self.surrogate.add(
+                            _surrogate_input(optimizer, x), value)
+                    self.statistics.n_told += 1
+                    point = plan.to_mco(x.args)
+                    is_pareto_optimal = self.archive.add(point, value)
+                    self._update_stopping(is_pareto_optimal)
+                    if verbose_run or (
+                            self.stream_front and is_pareto_optimal):
+                        yield point
+
+            # Perform all remaining calculations in the budget
+            n_remaining = self.budget - self.statistics.n_evaluations
+            async for x, value in self._ask_tell_async(
+                    optimizer, ob_func.multiobjective_function,
+                    partial(_nevergrad_tell, optimizer, ob_func),
+                    n_remaining, executor=executor,
+                    statistics=self.statistics):
+
+                point = plan.to_mco(x.args)
+                is_pareto_optimal = self.archive.add(point, value)
+                self._update_stopping(is_pareto_optimal)
+
+                if self.checkpoint is not None and self.checkpoint.is_due(
+                        self.statistics.n_evaluations):
+                    self._save_checkpoint(optimizer, ob_func, upper_bounds)
+
+                # If verbose, report back all points, not just those in
+                # Pareto front
+                if verbose_run:
+                    yield point
+                elif self.stream_front and is_pareto_optimal:
+                    yield point
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if self.checkpoint is not None:
+            self._save_checkpoint(optimizer, ob_func, upper_bounds)
+
+        self._export_metrics(finished=True)
+        self._log_surrogate()
+        self._log_constraints()
+        self._log_duplicates()
+
+        if self.cache is not None:
+            log.info(
+                "Evaluation cache: {hits} hits, {misses} misses "
+                "(hit rate {hit_rate:.1%})".format(**self.cache.statistics()))
+
+        # If not verbose, yield each member of the Pareto set, as held
+        # by the archive in MCO parameter values
+        if not (verbose_run or self.stream_front):
+            for point in self.archive.pareto_front():
+                yield point
+
+    def _screening_scores(self, values):
+        """Scores candidates by the additive epsilon indicator of their
+        predicted objective values over the Pareto front: how far they
+        fall short of joining the front, scaled by its extent, or if
+        negative, how far beyond it they reach."""
+        front = (
+            np.empty((0, 0)) if self.archive is None
+            else self.archive.losses())
+        if len(front) == 0:
+            return super(NevergradMultiOptimizer, self)._screening_scores(
+                values)
+        scale = np.ptp(front, axis=0)
+        scale[scale <= 0] = 1.0
+        shortfall = (values[:, np.newaxis, :] - front) / scale
+        return np.min(np.max(shortfall, axis=2), axis=1)
+
+    def progress_metrics(self):
+        metrics = super(NevergradMultiOptimizer, self).progress_metrics()
+        if self._volume_loss is not None:
+            metrics["hypervolume"] = self._volume_loss.scaled_volume()
+        if self.archive is not None:
+            metrics["pareto_size"] = len(self.archive)
+        return metrics
+
+    def _save_checkpoint(self, optimizer, ob_func, upper_bounds):
+        """Saves the nevergrad optimizer, the multi-objective archive and
+        the progress of the run to the checkpoint file.
+
+        Any candidates still being evaluated are not included in the
+        progress, and will be replaced by new candidates on resuming.
+        """
+        n_evaluations = self.statistics.n_evaluations
+        self.checkpoint.save(
+            {
+                'optimizer': optimizer,
+                'constraints': self._cheap_constraints,
+                'archive': archive_state(ob_func),
+                'pareto_archive': self.archive,
+                'upper_bounds': upper_bounds,
+                'n_evaluations': n_evaluations,
+                'total_cost': self.statistics.total_cost,
+            },
+            n_evaluations
+        )
+
+    def _set_archive(self, ob_func, upper_bounds, archive=None):
+        """Sets the Pareto archive of the run, new or restored from a
+        checkpoint, along with the hypervolume loss measuring the volume
+        of its front: the aggregate loss itself, if it is one, or else
+        one given each new member of the archive.
+        """
+        if archive is None:
+            archive = ParetoArchive(
+                upper_bounds=None if upper_bounds is None
+                else np.array(upper_bounds, dtype=float))
+        self.archive = archive
+
+        if isinstance(ob_func, HypervolumeLoss):
+            self._volume_loss = ob_func
+            return
+
+        # Dominated points add no volume, so the members of the archive
+        # are all the loss needs
+        volume_loss = HypervolumeLoss(None, upper_bounds=upper_bounds)
+        for losses in archive.losses():
+            volume_loss.compute_aggregate_loss(losses)
+        archive.on_trait_change(
+            lambda member: volume_loss.compute_aggregate_loss(member[1]),
+            "added"
+        )
+        self._volume_loss = volume_loss
+
+    def _update_stopping(self, is_pareto_optimal):
+        """Updates the stopping criteria with the outcome of the last
+        evaluation, and stops asking for new candidates once any is met.
+        """
+        if self.stopping is None or self._stop_asking:
+            return
+        if self.stopping.update(
+                self._volume_loss.scaled_volume(), is_pareto_optimal):
+            log.info("Stopping early after {} evaluations: {}".format(
+                self.statistics.n_evaluations, self.stopping.reason))
+            self._stop_asking = True
+
+
+async def _evaluate_async(function, x, executor=None):
+    """Evaluates the objective function at candidate x, awaiting the
+    result of either the coroutine function or the executor.
+
+    Returns
+    -------
+    x: nevergrad.Parameter
+        Parameter values determining input point calculated
+    value: float or ndarray
+        Output value calculated from objective function
+    """
+    if _is_coroutine_function(function):
+        value = await function(*x.args)
+    else:
+        loop = asyncio.get_event_loop()
+        value = await loop.run_in_executor(executor, function, *x.args)
+    return x, value
+
+
+def _evaluation_cost(cost_function, x, value, duration, plan=None):
+    """Returns the cost of evaluating candidate x: either the value of
+    the cost function, if there is one, or the duration of the
+    evaluation."""
+    if cost_function is None:
+        return duration
+    return cost_function(_to_mco(x.args, plan), value)
+
+
+def _to_mco(ng_values, plan=None):
+    """Translates nevergrad parameter values to MCO parameter values,
+    with the plan or flat encoding if one is provided"""
+    if plan is None:
+        return translate_ng_to_mco(list(ng_values))
+    return plan.to_mco(ng_values)
+
+
+def _surrogate_input(optimizer, x):
+    """Returns the inputs of candidate x to the surrogate model: its
+    standardized data in the optimizer parametrization"""
+    return x.get_standardized_data(reference=optimizer.parametrization)
+
+
+def _is_coroutine_function(function):
+    """Whether or not the function, which may be wrapped in any
+    number of functools.partial objects, is a coroutine function"""
+    while isinstance(function, partial):
+        function = function.func
+    return asyncio.iscoroutinefunction(function)
@@ -5,6 +5,16 @@ import numpy as np
 from types import MethodType
 from numbers import Number
 
+from traits.api import (
+    Any,
+    Callable,
+    HasStrictTraits,
+    Instance,
+    Int,
+    List,
+    Tuple
+)
+
 from force_bdss.api import (
     FixedMCOParameter,
     RangedMCOParameter,
@@ -15,6 +25,16 @@ from force_bdss.api import (
 
 import nevergrad as ng
 
+#: Kinds of parameter slots in a translation plan: values that are the
+#: same in both forms, nevergrad arrays that are MCO lists, and values
+#: that may be either
+VALUE_SLOT = "value"
+ARRAY_SLOT = "array"
+MIXED_SLOT = "mixed"
+
+#: Translation plans already built, by signature
+_PLANS = {}
+
 
 def get_attribute(ob, target_attributes):
     """ Get the value of an attribute matching a target.
@@ -114,7 +134,7 @@ def duck_type_param(param):
     return ng.p.Constant(value='null')
 
 
-def translate_mco_to_ng(params):
+def translate_mco_to_ng(params, constraints=None):
     r""" Translate from an MCO parameter specification
     to a Nevergrad parameter specification (Instrumentation).
 
@@ -122,6 +142,12 @@ def translate_mco_to_ng(params):
     ----------
     params: list of MCOParameter
         The MCO parameter specification.
+    constraints: list of callable, optional
+        Functions of a list of MCO parameter values, returning whether
+        or not they are feasible, registered as cheap constraints of
+        the Instrumentation, so that the optimizer only asks for
+        feasible candidates. Either plain functions or CheapConstraint
+        objects, which count the candidates they reject.
 
     Return
     ------
@@ -147,49 +173,127 @@ def translate_mco_to_ng(params):
     of the optimizer.
     """
 
-    instru = []
-    for p in params:
-
-        if isinstance(p, FixedMCOParameter):
-            ng_param = ng.p.Constant(
-                value=p.value,
-            )
-        elif isinstance(p, RangedVectorMCOParameter):
-            ng_param = ng.p.Array(
-                init=np.array(p.initial_value),
-                mutable_sigma=True
-            )
-            ng_param.set_bounds(
-                lower=np.array(p.lower_bound),
-                upper=np.array(p.upper_bound),
-                method="arctan"
-            )
-        elif isinstance(p, RangedMCOParameter):
-            ng_param = ng.p.Scalar(
-                init=p.initial_value,
-                lower=p.lower_bound,
-                upper=p.upper_bound,
-                mutable_sigma=False
-            )
-        elif isinstance(p, ListedMCOParameter):
-            ng_param = ng.p.TransitionChoice(
-                choices=p.levels,
-                transitions=[1.0, 1.0]
-            )
-        elif isinstance(p, CategoricalMCOParameter):
-            ng_param = ng.p.Choice(
-                choices=p.categories,
-                deterministic=False
-            )
-        else:
-            # duck-typing for non-standard.
-            ng_param = duck_type_param(p)
-
-        # add parameter to list
-        instru.append(ng_param)
+    instru = [_translate_param(p) for p in params]
 
     # create Instrumentation object with *vargs
-    return ng.p.Instrumentation(*instru)
+    instrumentation = ng.p.Instrumentation(*instru)
+    if constraints:
+        register_constraints(
+            instrumentation, constraints, translation_plan(params))
+    return instrumentation
+
+
+def register_constraints(parametrization, constraints, translation):
+    """ Registers constraints on MCO parameter values as cheap
+    constraints of a nevergrad parametrization.
+
+    Parameters
+    ----------
+    parametrization: Instrumentation
+        The nevergrad parametrization of the MCO parameters
+    constraints: list of callable
+        Functions of a list of MCO parameter values, returning whether
+        or not they are feasible, or CheapConstraint objects
+    translation: TranslationPlan or FlatEncoding
+        Translation of the values of the parametrization to MCO
+        parameter values, used by constraints that have none yet
+    """
+    for constraint in constraints:
+        if not isinstance(constraint, CheapConstraint):
+            constraint = CheapConstraint(function=constraint)
+        if constraint.translation is None:
+            constraint.translation = translation
+        parametrization.register_cheap_constraint(constraint)
+
+
+class CheapConstraint(HasStrictTraits):
+    """ A constraint on MCO parameter values, cheap enough to be
+    checked by the optimizer on each candidate it asks for, before
+    the candidate is evaluated.
+
+    Registered with a nevergrad parametrization, it is called with
+    the value of each candidate, which it translates to MCO parameter
+    values for the constraint function. Candidates that are rejected
+    are resampled by the optimizer.
+
+    Notes
+    -----
+    The constraint function must be picklable for the optimizer to be
+    checkpointed.
+    """
+
+    #: Function of a list of MCO parameter values, returning whether or
+    #: not they are feasible
+    function = Callable()
+
+    #: Translation of nevergrad values to MCO parameter values: a
+    #: TranslationPlan, FlatEncoding or any object with a to_mco method
+    translation = Any()
+
+    #: Number of candidates checked
+    n_checked = Int(0)
+
+    #: Number of candidates rejected as infeasible
+    n_rejected = Int(0)
+
+    def __call__(self, value):
+        """ Whether or not the value of a candidate is feasible.
+
+        Parameters
+        ----------
+        value: tuple
+            The value of an Instrumentation: its args and kwargs
+
+        Return
+        ------
+        bool
+            Whether or not the candidate satisfies the constraint
+        """
+        args, _ = value
+        self.n_checked += 1
+        feasible = bool(self.function(self.translation.to_mco(args)))
+        if not feasible:
+            self.n_rejected += 1
+        return feasible
+
+
+def _translate_param(p):
+    """ Translates a single MCO parameter to a nevergrad parameter"""
+    if isinstance(p, FixedMCOParameter):
+        ng_param = ng.p.Constant(
+            value=p.value,
+        )
+    elif isinstance(p, RangedVectorMCOParameter):
+        ng_param = ng.p.Array(
+            init=np.array(p.initial_value),
+            mutable_sigma=True
+        )
+        ng_param.set_bounds(
+            lower=np.array(p.lower_bound),
+            upper=np.array(p.upper_bound),
+            method="arctan"
+        )
+    elif isinstance(p, RangedMCOParameter):
+        ng_param = ng.p.Scalar(
+            init=p.initial_value,
+            lower=p.lower_bound,
+            upper=p.upper_bound,
+            mutable_sigma=False
+        )
+    elif isinstance(p, ListedMCOParameter):
+        ng_param = ng.p.TransitionChoice(
+            choices=p.levels,
+            transitions=[1.0, 1.0]
+        )
+    elif isinstance(p, CategoricalMCOParameter):
+        ng_param = ng.p.Choice(
+            choices=p.categories,
+            deterministic=False
+        )
+    else:
+        # duck-typing for non-standard.
+        ng_param = duck_type_param(p)
+    return ng_param
 
 
 def translate_ng_to_mco(ng_params):
@@ -213,13 +317,321 @@ def translate_ng_to_mco(ng_params):
     the value of the latter is a numpy array
     """
 
-    mco_values = []
-    for p in ng_params:
-        if isinstance(p, np.ndarray):
-            mco_values.append(p.tolist())
-        else:
-            mco_values.append(p)
-        # ...what about any non-standard MCOParameter types?
-        # (see translate_mco_to_ng(), above)
+    # ...what about any non-standard MCOParameter types?
+    # (see translate_mco_to_ng(), above)
+    return [_to_mco_value(p) for p in ng_params]
+
+
+class TranslationPlan(HasStrictTraits):
+    """ Translation of nevergrad parameter values to MCO parameter
+    values, specialised for a list of MCO parameters.
+
+    Notes
+    -----
+    The kind of each parameter slot is resolved once, when the plan is
+    built, so that translating values only applies a converter to the
+    slots that need one, without checking the type of each value.
+    Plans are shared between parameter lists with the same signature.
+    """
+
+    #: Kind of each parameter slot (VALUE_SLOT, ARRAY_SLOT or
+    #: MIXED_SLOT)
+    signature = Tuple()
+
+    #: Index of each slot that needs converting, with its converter
+    _converters = Tuple()
+
+    def __init__(self, signature, **traits):
+        super(TranslationPlan, self).__init__(signature=signature, **traits)
+        self._converters = tuple(
+            (index, _SLOT_CONVERTERS[kind])
+            for index, kind in enumerate(signature)
+            if kind != VALUE_SLOT
+        )
+
+    def to_mco(self, ng_values):
+        """ Translates a sequence of nevergrad parameter values to a
+        list of MCO parameter values.
+
+        Parameters
+        ----------
+        ng_values: sequence of Any
+            Parameter values in the nevergrad form
+
+        Return
+        ------
+        list of Any
+            Parameter values in the MCO form
+        """
+        mco_values = list(ng_values)
+        for index, converter in self._converters:
+            mco_values[index] = converter(mco_values[index])
+        return mco_values
+
+
+def translation_plan(params):
+    """ Returns the plan translating nevergrad parameter values to
+    values of a list of MCO parameters.
+
+    Parameters
+    ----------
+    params: list of MCOParameter
+        The MCO parameter specification.
+
+    Return
+    ------
+    TranslationPlan
+        The plan, shared with all other parameter lists of the same
+        signature
+    """
+    signature = tuple(parameter_slot(p) for p in params)
+    plan = _PLANS.get(signature)
+    if plan is None:
+        plan = _PLANS[signature] = TranslationPlan(signature)
+    return plan
+
 
-    return mco_values
+class FlatEncoding(HasStrictTraits):
+    """ Encoding of a list of MCO parameters in which all continuous
+    and ordinal dimensions are packed into a single bounded nevergrad
+    array, decoded to MCO parameter values with vectorized operations.
+
+    The array is the first argument of the parametrization. Each of
+    its dimensions spans the unit interval, which is mapped linearly
+    onto the range of a ranged parameter (or of an element of a ranged
+    vector parameter), or divided into equal bins, one per level, for
+    a listed parameter. Fixed, categorical and non-standard parameters
+    follow the array as separate nevergrad parameters.
+
+    Notes
+    -----
+    The unit array is mutated with a step of a sixth of its range, and
+    kept within its bounds by clipping, while its initial samples are
+    drawn over the full range. Optimizers then work on a single
+    contiguous vector, which makes ask, tell and mutation much cheaper
+    for large parameter spaces.
+    """
+
+    #: The encoded MCO parameters
+    params = List()
+
+    #: Lower bound and span of each dimension of the array
+    _lower = Any()
+    _span = Any()
+
+    #: Initial value of the array, in the unit cube
+    _init = Any()
+
+    #: Indices of the ranged parameters, and of their dimensions
+    _ranged_params = Any()
+    _ranged_dims = Any()
+
+    #: Index of each ranged vector parameter, with its slice of
+    #: dimensions
+    _vector_slices = Tuple()
+
+    #: Indices of the listed parameters, their dimensions and numbers
+    #: of levels, along with their levels
+    _listed_params = Any()
+    _listed_dims = Any()
+    _n_levels = Any()
+    _levels = Tuple()
+
+    #: Indices of the parameters following the array, and the plan
+    #: translating their values
+    _other_params = Tuple()
+    _other_plan = Instance(TranslationPlan)
+
+    def __init__(self, params, **traits):
+        super(FlatEncoding, self).__init__(params=list(params), **traits)
+        lower, span, init = [], [], []
+        ranged_params, ranged_dims = [], []
+        vector_slices = []
+        listed_params, listed_dims, n_levels, levels = [], [], [], []
+        other_params = []
+
+        for index, param in enumerate(self.params):
+            dim = len(lower)
+            if isinstance(param, FixedMCOParameter):
+                other_params.append(index)
+            elif isinstance(param, RangedVectorMCOParameter):
+                param_lower = np.array(param.lower_bound, dtype=float)
+                param_span = np.array(param.upper_bound, dtype=float) \
+                    - param_lower
+                lower.extend(param_lower)
+                span.extend(param_span)
+                init.extend(_unit_value(
+                    np.array(param.initial_value, dtype=float),
+                    param_lower, param_span))
+                vector_slices.append((index, dim, len(lower)))
+            elif isinstance(param, RangedMCOParameter):
+                param_span = param.upper_bound - param.lower_bound
+                lower.append(param.lower_bound)
+                span.append(param_span)
+                init.append(_unit_value(
+                    param.initial_value, param.lower_bound, param_span))
+                ranged_params.append(index)
+                ranged_dims.append(dim)
+            elif isinstance(param, ListedMCOParameter):
+                # Start at the middle level, like a TransitionChoice
+                n = len(param.levels)
+                lower.append(0.0)
+                span.append(1.0)
+                init.append((n // 2 + 0.5) / n)
+                listed_params.append(index)
+                listed_dims.append(dim)
+                n_levels.append(n)
+                levels.append(list(param.levels))
+            else:
+                other_params.append(index)
+
+        self._lower = np.array(lower, dtype=float)
+        self._span = np.array(span, dtype=float)
+        self._init = np.array(init, dtype=float)
+        self._ranged_params = ranged_params
+        self._ranged_dims = np.array(ranged_dims, dtype=int)
+        self._vector_slices = tuple(vector_slices)
+        self._listed_params = listed_params
+        self._listed_dims = np.array(listed_dims, dtype=int)
+        self._n_levels = np.array(n_levels, dtype=int)
+        self._levels = tuple(levels)
+        self._other_params = tuple(other_params)
+        self._other_plan = translation_plan(
+            [self.params[index] for index in other_params])
+
+    @property
+    def dimension(self):
+        """ Number of dimensions of the packed array"""
+        return len(self._init)
+
+    def parametrization(self, constraints=None):
+        """ Returns the nevergrad parametrization of the encoding: the
+        packed unit array, followed by the parameters not packed into
+        it.
+
+        Parameters
+        ----------
+        constraints: list of callable, optional
+            Constraints on the MCO parameter values, registered as
+            cheap constraints of the parametrization (see
+            translate_mco_to_ng)
+
+        Return
+        ------
+        Instrumentation
+            Nevergrad instrumentation object.
+        """
+        array = ng.p.Array(init=self._init.copy())
+        array.set_mutation(sigma=1.0 / 6)
+        array.set_bounds(lower=0.0, upper=1.0, method="clipping",
+                         full_range_sampling=True)
+        others = [
+            _translate_param(self.params[index])
+            for index in self._other_params
+        ]
+        instrumentation = ng.p.Instrumentation(array, *others)
+        if constraints:
+            register_constraints(instrumentation, constraints, self)
+        return instrumentation
+
+    def to_mco(self, ng_values):
+        """ Decodes a sequence of nevergrad parameter values of the
+        parametrization to a list of MCO parameter values.
+
+        Parameters
+        ----------
+        ng_values: sequence of Any
+            Parameter values in the nevergrad form: the packed array,
+            followed by the values of the other parameters
+
+        Return
+        ------
+        list of Any
+            Parameter values in the MCO form
+        """
+        unit = np.asarray(ng_values[0], dtype=float)
+        values = self._lower + unit * self._span
+
+        mco_values = [None] * len(self.params)
+        ranged_values = values[self._ranged_dims].tolist()
+        for index, value in zip(self._ranged_params, ranged_values):
+            mco_values[index] = value
+        for index, start, stop in self._vector_slices:
+            mco_values[index] = values[start:stop].tolist()
+
+        level_indices = np.minimum(
+            (unit[self._listed_dims] * self._n_levels).astype(int),
+            self._n_levels - 1
+        ).tolist()
+        for index, levels, level in zip(
+                self._listed_params, self._levels, level_indices):
+            mco_values[index] = levels[level]
+
+        other_values = self._other_plan.to_mco(ng_values[1:])
+        for index, value in zip(self._other_params, other_values):
+            mco_values[index] = value
+        return mco_values
+
+
+def parameter_slot(param):
+    """ Returns the kind of slot an MCO parameter takes in a
+    translation plan: VALUE_SLOT if its values are the same in the
+    nevergrad and MCO forms, ARRAY_SLOT if they are nevergrad arrays,
+    or MIXED_SLOT if they may be either."""
+    if isinstance(param, FixedMCOParameter):
+        return _value_slot(param.value)
+    if isinstance(param, RangedVectorMCOParameter):
+        return ARRAY_SLOT
+    if isinstance(param, RangedMCOParameter):
+        return VALUE_SLOT
+    if isinstance(param, ListedMCOParameter):
+        return _choice_slot(param.levels)
+    if isinstance(param, CategoricalMCOParameter):
+        return _choice_slot(param.categories)
+
+    # Otherwise, find out from the duck-typed nevergrad parameter
+    ng_param = duck_type_param(param)
+    if isinstance(ng_param, ng.p.Scalar):
+        return VALUE_SLOT
+    if isinstance(ng_param, ng.p.Array):
+        return ARRAY_SLOT
+    if isinstance(ng_param, (ng.p.Choice, ng.p.TransitionChoice)):
+        return _choice_slot(ng_param.choices.value)
+    if isinstance(ng_param, ng.p.Constant):
+        return _value_slot(ng_param.value)
+    return MIXED_SLOT
+
+
+def _value_slot(value):
+    return ARRAY_SLOT if isinstance(value, np.ndarray) else VALUE_SLOT
+
+
+def _choice_slot(choices):
+    if any(isinstance(choice, np.ndarray) for choice in choices):
+        return MIXED_SLOT
+    return VALUE_SLOT
+
+
+def _unit_value(value, lower, span):
+    """ Maps a value in a range onto the unit interval, at the middle
+    of the interval if the range is empty"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit = np.where(span > 0, (value - lower) / span, 0.5)
+    return np.clip(unit, 0.0, 1.0)
+
+
+def _array_to_list(value):
+    return np.asarray(value).tolist()
+
+
+def _to_mco_value(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+#: Converter of the values of each kind of slot that needs one
+_SLOT_CONVERTERS = {
+    ARRAY_SLOT: _array_to_list,
+    MIXED_SLOT: _to_mco_value
+}
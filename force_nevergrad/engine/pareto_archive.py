@@ -0,0 +1,236 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from traits.api import (
+    Any,
+    Event,
+    HasStrictTraits,
+    Instance,
+    Int
+)
+
+
+class ParetoArchive(HasStrictTraits):
+    """ Incrementally maintained archive of the non-dominated points
+    found during a multi-objective minimization.
+
+    Each new point is compared only against the current members of the
+    Pareto front, rather than against every point evaluated so far.
+
+    Notes
+    -----
+    For two objectives, the front is kept sorted by the first objective
+    (and therefore in reverse order of the second), so that a new point
+    is placed by bisection and the members it dominates form a single
+    contiguous slice. For other numbers of objectives, the losses of the
+    members are held in a single array and compared with the new point
+    in one vectorized operation.
+    """
+
+    #: Upper bounds of the losses. Points with any loss above its
+    #: bound are not archived.
+    upper_bounds = Any()
+
+    #: Fired with the (parameters, losses) of each new member of the
+    #: Pareto front
+    added = Event()
+
+    #: Fired with the (parameters, losses) of each member removed from
+    #: the Pareto front, as it is dominated by a new point
+    removed = Event()
+
+    #: Number of points offered to the archive
+    n_points = Int(0)
+
+    #: Parameters of the members of the Pareto front
+    _parameters = Instance(list, ())
+
+    #: Losses of the members, for other than two objectives. Rows
+    #: beyond _size are spare capacity.
+    _losses = Any()
+
+    #: Number of members, for other than two objectives
+    _size = Int(0)
+
+    #: Sorted losses of the members, for two objectives
+    _first = Instance(list, ())
+    _second = Instance(list, ())
+
+    #: Number of objectives
+    _n_objectives = Int(0)
+
+    def __len__(self):
+        return len(self._parameters)
+
+    def __getstate__(self):
+        """ Returns the state of the archive to pickle, holding the
+        members of the Pareto front rather than the internal sorted
+        lists or array of their losses"""
+        state = super(ParetoArchive, self).__getstate__()
+        for name in ["_parameters", "_losses", "_size", "_first",
+                     "_second"]:
+            state.pop(name, None)
+        state["members"] = self.members()
+        return state
+
+    def __setstate__(self, state):
+        """ Restores a pickled state, rebuilding the internal
+        representation of the members of the Pareto front"""
+        state = dict(state)
+        members = state.pop("members", [])
+        super(ParetoArchive, self).__setstate__(state)
+
+        # The members are mutually non-dominated, and in the order the
+        # internal representation keeps them
+        self._parameters = [parameters for parameters, _ in members]
+        losses = np.array(
+            [losses for _, losses in members], dtype=float
+        ).reshape(len(members), self._n_objectives)
+        if self._n_objectives == 2:
+            self._first = losses[:, 0].tolist()
+            self._second = losses[:, 1].tolist()
+        elif members:
+            self._losses = losses
+            self._size = len(members)
+
+    def add(self, parameters, losses):
+        """ Offers a new point to the archive.
+
+        Parameters
+        ----------
+        parameters: Any
+            The parameters of the point (usually the args of a
+            nevergrad candidate)
+        losses: array_like of float
+            The objective values of the point, to be minimized
+
+        Return
+        ------
+        bool
+            Whether or not the point joined the Pareto front
+        """
+        losses = np.array(losses, dtype=float, ndmin=1)
+        self.n_points += 1
+
+        if self.upper_bounds is not None \
+                and np.any(losses > self.upper_bounds):
+            return False
+
+        if self._n_objectives == 0:
+            self._n_objectives = losses.size
+        elif losses.size != self._n_objectives:
+            raise ValueError(
+                "Expected {} objectives but got {}".format(
+                    self._n_objectives, losses.size))
+
+        if self._n_objectives == 2:
+            removed = self._add_2d(parameters, losses)
+        else:
+            removed = self._add_nd(parameters, losses)
+
+        if removed is None:
+            return False
+
+        for member in removed:
+            self.removed = member
+        self.added = (parameters, losses)
+        return True
+
+    def members(self):
+        """ Returns the members of the Pareto front
+
+        Return
+        ------
+        list of tuple
+            The (parameters, losses) of each member
+        """
+        return list(zip(self._parameters, self.losses()))
+
+    def losses(self):
+        """ Returns the losses of the members of the Pareto front
+
+        Return
+        ------
+        ndarray
+            Array with a row of losses for each member
+        """
+        if self._n_objectives == 2:
+            return np.column_stack(
+                [self._first, self._second]).reshape(-1, 2)
+        if self._losses is None:
+            return np.empty((0, self._n_objectives))
+        return self._losses[:self._size].copy()
+
+    def pareto_front(self):
+        """ Returns the parameters of the members of the Pareto front"""
+        return list(self._parameters)
+
+    def _add_2d(self, parameters, losses):
+        """ Adds a point with two objectives, returning the members it
+        dominates, or None if it is itself dominated."""
+        first, second = losses
+
+        # The member with the highest first loss not above that of the
+        # new point has the lowest second loss amongst such members
+        index = bisect_right(self._first, first)
+        if index > 0 and self._second[index - 1] <= second:
+            return None
+
+        # The members dominated by the new point have first losses not
+        # below its own, and the second losses of these members only
+        # decrease with increasing first loss
+        start = bisect_left(self._first, first)
+        stop = start
+        while stop < len(self._second) and self._second[stop] >= second:
+            stop += 1
+
+        removed = [
+            (self._parameters[i], np.array([self._first[i],
+                                            self._second[i]]))
+            for i in range(start, stop)
+        ]
+        self._first[start:stop] = [first]
+        self._second[start:stop] = [second]
+        self._parameters[start:stop] = [parameters]
+        return removed
+
+    def _add_nd(self, parameters, losses):
+        """ Adds a point with any number of objectives, returning the
+        members it dominates, or None if it is itself dominated."""
+        front = self._losses[:self._size] if self._size else None
+
+        if front is not None:
+            if np.any(np.all(front <= losses, axis=1)):
+                return None
+            dominated = np.all(losses <= front, axis=1)
+        else:
+            dominated = np.zeros(0, dtype=bool)
+
+        removed = [
+            (self._parameters[i], front[i].copy())
+            for i in np.flatnonzero(dominated)
+        ]
+
+        # Compact the remaining members, if any were dominated
+        if removed:
+            keep = ~dominated
+            self._size = int(np.count_nonzero(keep))
+            self._losses[:self._size] = front[keep]
+            self._parameters = [
+                member for member, k in zip(self._parameters, keep) if k
+            ]
+
+        # And append the new point, growing the array if needed
+        if self._losses is None:
+            self._losses = np.empty((16, self._n_objectives))
+        elif self._size == len(self._losses):
+            self._losses = np.concatenate(
+                [self._losses, np.empty_like(self._losses)])
+        self._losses[self._size] = losses
+        self._size += 1
+        self._parameters.append(parameters)
+        return removed
@@ -0,0 +1,260 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import math
+import threading
+import time
+
+import numpy as np
+
+from traits.api import (
+    Any,
+    Bool,
+    Dict,
+    Float,
+    HasStrictTraits,
+    Instance,
+    Int,
+    Str
+)
+
+#: Base 2 exponents of the upper edges of the first and last bins of
+#: the phase duration histograms, in seconds (about 1 us to 17 min)
+MIN_EXPONENT = -20
+MAX_EXPONENT = 10
+
+
+class PhaseHistogram(HasStrictTraits):
+    """ Counts and durations of one phase of the optimization loop.
+
+    Durations are binned in a histogram whose bins double in width, so
+    that quantiles can be estimated to within a factor of two over a
+    wide range of durations, at a fixed cost per sample.
+    """
+
+    #: Name of the phase
+    name = Str()
+
+    #: Number of times the phase was timed
+    count = Int(0)
+
+    #: Total duration of the phase, in seconds
+    total = Float(0.0)
+
+    #: Shortest and longest durations of the phase, in seconds
+    minimum = Float(math.inf)
+    maximum = Float(0.0)
+
+    #: Counts of durations in each bin. The upper edge of bin i is
+    #: 2 ** (MIN_EXPONENT + i) seconds.
+    bins = Any()
+
+    def _bins_default(self):
+        return np.zeros(MAX_EXPONENT - MIN_EXPONENT + 1, dtype=int)
+
+    def add(self, duration):
+        """ Adds the duration of the phase, in seconds"""
+        self.count += 1
+        self.total += duration
+        if duration < self.minimum:
+            self.minimum = duration
+        if duration > self.maximum:
+            self.maximum = duration
+
+        # The duration is below 2 ** exponent
+        _, exponent = math.frexp(duration)
+        if duration <= 0:
+            index = 0
+        else:
+            index = min(max(exponent - MIN_EXPONENT, 0), len(self.bins) - 1)
+        self.bins[index] += 1
+
+    def quantile(self, q):
+        """ Estimates a quantile of the durations, as the upper edge of
+        the bin it falls in, in seconds.
+
+        Parameters
+        ----------
+        q: float
+            The quantile, between 0 and 1
+
+        Return
+        ------
+        float
+            The estimated quantile, or 0 if the phase was never timed
+        """
+        if self.count == 0:
+            return 0.0
+        cumulative = np.cumsum(self.bins)
+        index = int(np.searchsorted(cumulative, q * self.count))
+        index = min(index, len(self.bins) - 1)
+        return min(2.0 ** (MIN_EXPONENT + index), self.maximum)
+
+    def summary(self):
+        """ Returns the statistics of the phase durations, in seconds
+
+        Return
+        ------
+        dict
+            The count, total, mean, min, max and the estimated median,
+            90th and 99th percentiles of the durations
+        """
+        count = self.count
+        return {
+            "count": count,
+            "total": self.total,
+            "mean": self.total / count if count else 0.0,
+            "min": self.minimum if count else 0.0,
+            "max": self.maximum,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class _Phase:
+    """ Context manager timing a phase into a PhaseTimer"""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+
+
+class _NullPhase:
+    """ Context manager doing nothing, used while timing is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class PhaseTimer(HasStrictTraits):
+    """ Low-overhead timing of the phases of the optimization loop,
+    collecting a histogram of durations for each phase and a set of
+    event counters.
+
+    Timing is switched on and off at runtime with the enabled trait.
+    While disabled, timing a phase only costs a method call and
+    returns a shared context manager that does nothing, and events
+    are not counted.
+
+    Notes
+    -----
+    Phases timed in the worker processes of a process pool executor
+    are recorded in those processes, and so are not collected.
+    """
+
+    #: Whether or not phases are timed and events counted
+    enabled = Bool(False)
+
+    #: Histogram of the durations of each phase, by name
+    histograms = Dict(Str, Instance(PhaseHistogram))
+
+    #: Number of occurrences of each event, by name
+    counters = Dict(Str, Int)
+
+    #: Guards updates made from executor threads
+    _lock = Any()
+
+    def __init__(self, **traits):
+        super(PhaseTimer, self).__init__(**traits)
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        """ Returns a context manager timing the phase with the given
+        name, if timing is enabled.
+
+        Example
+        -------
+        >>> with phase_timer.phase("ask"):
+        ...     x = optimizer.ask()
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def record(self, name, duration):
+        """ Records a duration of the phase with the given name, in
+        seconds, if timing is enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = PhaseHistogram(name=name)
+                self.histograms[name] = histogram
+            histogram.add(duration)
+
+    def count(self, name, n=1):
+        """ Counts n occurrences of the event with the given name, if
+        timing is enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        """ Discards all phase durations and event counts"""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def summary(self):
+        """ Returns the statistics of each phase and the event counts
+
+        Return
+        ------
+        dict
+            The summary of each phase histogram under "phases", and
+            the event counts under "counters"
+        """
+        with self._lock:
+            return {
+                "phases": {
+                    name: histogram.summary()
+                    for name, histogram in self.histograms.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def format_summary(self):
+        """ Returns the summary as a table, with durations in
+        milliseconds and phases in decreasing order of total duration.
+        """
+        summary = self.summary()
+        lines = ["{:<24}{:>10}{:>12}{:>12}{:>12}{:>12}{:>12}".format(
+            "phase", "count", "total (s)", "mean (ms)", "p50 (ms)",
+            "p90 (ms)", "p99 (ms)")]
+        phases = sorted(summary["phases"].items(),
+                        key=lambda item: item[1]["total"], reverse=True)
+        for name, stats in phases:
+            lines.append(
+                "{:<24}{:>10d}{:>12.3f}{:>12.3f}{:>12.3f}{:>12.3f}"
+                "{:>12.3f}".format(
+                    name, stats["count"], stats["total"],
+                    1e3 * stats["mean"], 1e3 * stats["p50"],
+                    1e3 * stats["p90"], 1e3 * stats["p99"]))
+        for name, count in sorted(summary["counters"].items()):
+            lines.append("{:<24}{:>10d}".format(name, count))
+        return "\n".join(lines)
+
+
+#: Timer of the phases of the optimization loop, shared by all
+#: optimizers. Disabled unless switched on.
+phase_timer = PhaseTimer()
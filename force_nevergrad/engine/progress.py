@@ -0,0 +1,100 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import logging
+import sys
+import time
+
+from traits.api import (
+    Float,
+    HasStrictTraits,
+    Int
+)
+
+log = logging.getLogger(__name__)
+
+#: Name of the logger under which all the plugin modules log
+PLUGIN_LOGGER = "force_nevergrad"
+
+
+def install_screen_handler():
+    """ Installs a handler printing the messages of the plugin loggers
+    to stdout, unless one has already been installed, so that repeated
+    runs in the same process do not print every message more than once.
+
+    Return
+    ------
+    logging.Handler
+        The installed handler
+    """
+    logger = logging.getLogger(PLUGIN_LOGGER)
+    for handler in logger.handlers:
+        if getattr(handler, "is_screen_handler", False):
+            return handler
+
+    formatter = logging.Formatter(
+        fmt='%(asctime)s %(levelname)-8s %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S')
+    handler = logging.StreamHandler(stream=sys.stdout)
+    handler.setFormatter(formatter)
+    handler.is_screen_handler = True
+    logger.addHandler(handler)
+    return handler
+
+
+class ProgressReporter(HasStrictTraits):
+    """ Logs the progress of an optimization run, no more often than
+    every `every_evaluations` evaluations and every `every_seconds`
+    seconds, so that logging stays cheap however fast the objective.
+
+    The last evaluation of the budget is always reported.
+    """
+
+    #: Least number of evaluations between reports
+    every_evaluations = Int(1)
+
+    #: Least number of seconds between reports
+    every_seconds = Float(5.0)
+
+    #: Number of evaluations at the last report
+    _last_evaluations = Int(0)
+
+    #: Time of the last report
+    _last_time = Float(0.0)
+
+    def reset(self):
+        """ Resets the reporter before a new optimization run"""
+        self._last_evaluations = 0
+        self._last_time = 0.0
+
+    def update(self, statistics, budget):
+        """ Reports the progress of the run, if a report is due.
+
+        Parameters
+        ----------
+        statistics: RunStatistics
+            The progress of the run
+        budget: int
+            The number of evaluations in the budget of the run
+
+        Return
+        ------
+        bool
+            Whether or not the progress was reported
+        """
+        n_evaluations = statistics.n_evaluations
+        if n_evaluations < budget:
+            if n_evaluations - self._last_evaluations \
+                    < self.every_evaluations:
+                return False
+            now = time.time()
+            if now - self._last_time < self.every_seconds:
+                return False
+        else:
+            now = time.time()
+
+        self._last_evaluations = n_evaluations
+        self._last_time = now
+        log.info("Evaluated {} / {} points ({:.1f} per second)".format(
+            n_evaluations, budget, statistics.evaluations_per_second))
+        return True
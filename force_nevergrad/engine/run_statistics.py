@@ -0,0 +1,73 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import time
+
+from traits.api import (
+    Float,
+    HasStrictTraits,
+    Int,
+    Property
+)
+
+
+class RunStatistics(HasStrictTraits):
+    """ Counters describing the progress of an optimization run"""
+
+    #: Number of evaluations counted towards the budget
+    n_evaluations = Int(0)
+
+    #: Number of candidates told to the optimizer, including any
+    #: that were not evaluated
+    n_told = Int(0)
+
+    #: Number of evaluations currently in flight
+    n_in_flight = Int(0)
+
+    #: Accumulated cost of the evaluations counted towards the budget
+    total_cost = Float(0.0)
+
+    #: Time at which the run started, in seconds since the epoch
+    start_time = Float()
+
+    #: Seconds elapsed since the start of the run
+    elapsed_time = Property(Float)
+
+    #: Average number of evaluations per second
+    evaluations_per_second = Property(Float)
+
+    def __init__(self, **traits):
+        # Start the clock on creation, rather than on first access
+        traits.setdefault("start_time", time.time())
+        super(RunStatistics, self).__init__(**traits)
+
+    def _get_elapsed_time(self):
+        return time.time() - self.start_time
+
+    def _get_evaluations_per_second(self):
+        elapsed_time = self.elapsed_time
+        if elapsed_time <= 0:
+            return 0.0
+        return self.n_evaluations / elapsed_time
+
+    def exhausted_budget(self, time_budget=0.0, cost_budget=0.0):
+        """ Checks the progress of the run against time and cost budgets.
+
+        Parameters
+        ----------
+        time_budget: float, optional
+            Seconds the run may last (0 disables)
+        cost_budget: float, optional
+            Accumulated evaluation cost the run may incur (0 disables)
+
+        Return
+        ------
+        str
+            A description of the budget that has been used up, or an
+            empty string if neither has.
+        """
+        if 0 < time_budget <= self.elapsed_time:
+            return "time budget of {} s used up".format(time_budget)
+        if 0 < cost_budget <= self.total_cost:
+            return "cost budget of {} used up".format(cost_budget)
+        return ""
@@ -0,0 +1,96 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from traits.api import (
+    Float,
+    HasStrictTraits,
+    Int,
+    Str
+)
+
+
+class StoppingCriteria(HasStrictTraits):
+    """ Convergence criteria that end a multi-objective optimization
+    before its budget is used up.
+
+    The criteria are updated after each evaluation is told to the
+    optimizer, with the hypervolume of the Pareto front and whether or
+    not the evaluated point joined it. The optimization stops when any
+    enabled criterion is met.
+    """
+
+    #: Number of evaluations without a significant increase in the
+    #: hypervolume after which to stop (0 disables)
+    hypervolume_window = Int(0)
+
+    #: Relative increase in the hypervolume that is considered
+    #: significant
+    hypervolume_tolerance = Float(0.0)
+
+    #: Number of evaluations without a new member of the Pareto front
+    #: after which to stop (0 disables)
+    pareto_window = Int(0)
+
+    #: Hypervolume at which to stop (0 disables)
+    target_hypervolume = Float(0.0)
+
+    #: Why the optimization was stopped, if it was
+    reason = Str()
+
+    #: Number of evaluations seen so far
+    _n_evaluations = Int(0)
+
+    #: Highest significant hypervolume, and the evaluation it was
+    #: reached at
+    _best_volume = Float(0.0)
+    _best_evaluation = Int(0)
+
+    #: Evaluation at which the last member joined the Pareto front
+    _pareto_evaluation = Int(0)
+
+    def reset(self):
+        """ Resets the criteria before a new optimization run"""
+        self.reason = ""
+        self._n_evaluations = 0
+        self._best_volume = 0.0
+        self._best_evaluation = 0
+        self._pareto_evaluation = 0
+
+    def update(self, volume, is_pareto_optimal):
+        """ Updates the criteria with the outcome of an evaluation.
+
+        Parameters
+        ----------
+        volume: float
+            Hypervolume of the Pareto front, after the evaluation
+        is_pareto_optimal: bool
+            Whether or not the evaluated point joined the Pareto front
+
+        Return
+        ------
+        bool
+            Whether or not the optimization should stop
+        """
+        self._n_evaluations += 1
+        n_evaluations = self._n_evaluations
+
+        if volume > self._best_volume * (1.0 + self.hypervolume_tolerance):
+            self._best_volume = volume
+            self._best_evaluation = n_evaluations
+
+        if is_pareto_optimal:
+            self._pareto_evaluation = n_evaluations
+
+        if 0 < self.target_hypervolume <= volume:
+            self.reason = "target hypervolume {} reached".format(
+                self.target_hypervolume)
+        elif 0 < self.hypervolume_window <= (
+                n_evaluations - self._best_evaluation):
+            self.reason = "no hypervolume increase in {} evaluations".format(
+                self.hypervolume_window)
+        elif 0 < self.pareto_window <= (
+                n_evaluations - self._pareto_evaluation):
+            self.reason = "no new Pareto front member in {} " \
+                          "evaluations".format(self.pareto_window)
+
+        return bool(self.reason)
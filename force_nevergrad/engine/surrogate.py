@@ -0,0 +1,308 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import time
+from abc import abstractmethod
+
+import numpy as np
+
+from traits.api import (
+    ABCHasStrictTraits,
+    Any,
+    Float,
+    Int,
+    List
+)
+
+from .phase_timer import phase_timer
+
+
+class BaseSurrogate(ABCHasStrictTraits):
+    """ Base class of the surrogate models used to pre-screen candidates
+    before they are evaluated, fitted on the evaluations of the run.
+
+    Points are added to the model as they are evaluated, and only
+    fitted when the next prediction is made, so that the model is
+    updated once for all the points evaluated since. The model is
+    refitted from scratch whenever its number of points doubles, so
+    that rounding errors do not build up over the updates. Subclasses
+    implement the fit of the model to all its points, its incremental
+    update with new points, and its predictions.
+
+    The time spent fitting the model and making predictions is
+    accumulated, so that it can be weighed against the time saved on
+    evaluations.
+    """
+
+    #: Number of points the model needs before it makes predictions
+    min_points = Int(10)
+
+    #: Largest number of points the model is fitted on. Beyond this,
+    #: it is refitted on the most recent half of them.
+    max_points = Int(1000)
+
+    #: Number of times the model was fitted or updated
+    n_fits = Int(0)
+
+    #: Total time spent fitting or updating the model, in seconds
+    fit_time = Float(0.0)
+
+    #: Number of points predicted by the model
+    n_predictions = Int(0)
+
+    #: Total time spent making predictions, in seconds
+    predict_time = Float(0.0)
+
+    #: Inputs and outputs of the points the model is fitted on
+    _x = Any()
+    _y = Any()
+
+    #: Inputs and outputs of the points added since the last fit
+    _pending = List()
+
+    #: Number of points the model was last fitted from scratch on
+    _n_refitted = Int(0)
+
+    def reset(self):
+        """ Discards all points and statistics, before a new run"""
+        self.n_fits = 0
+        self.fit_time = 0.0
+        self.n_predictions = 0
+        self.predict_time = 0.0
+        self._x = None
+        self._y = None
+        self._pending = []
+        self._n_refitted = 0
+
+    @property
+    def n_points(self):
+        """ Number of points added to the model"""
+        n_fitted = 0 if self._x is None else len(self._x)
+        return n_fitted + len(self._pending)
+
+    def is_ready(self):
+        """ Whether or not the model has enough points to predict"""
+        return self.n_points >= self.min_points
+
+    def add(self, x, y):
+        """ Adds an evaluated point to the model.
+
+        Parameters
+        ----------
+        x: array_like
+            The numerical inputs of the point, of shape (d,)
+        y: float or array_like
+            The objective values of the point, of shape (k,)
+        """
+        self._pending.append((
+            np.asarray(x, dtype=float).ravel(),
+            np.atleast_1d(np.asarray(y, dtype=float)).ravel()
+        ))
+
+    def predict(self, x):
+        """ Predicts the objective values of a set of points, after
+        fitting the model to any points added since the last fit.
+
+        Parameters
+        ----------
+        x: array_like
+            The numerical inputs of the points, of shape (n, d)
+
+        Return
+        ------
+        mean: ndarray
+            The predicted objective values, of shape (n, k)
+        std: ndarray
+            The uncertainty of the predictions, as standard deviations
+            of shape (n, k)
+        """
+        if self._pending:
+            self._fit_pending()
+
+        start_time = time.perf_counter()
+        with phase_timer.phase("surrogate_predict"):
+            mean, std = self._predict(np.atleast_2d(
+                np.asarray(x, dtype=float)))
+        self.predict_time += time.perf_counter() - start_time
+        self.n_predictions += len(mean)
+        return mean, std
+
+    def statistics(self):
+        """ Returns the cost of the model
+
+        Return
+        ------
+        dict
+            The number of points, fits and predictions of the model,
+            and the time spent fitting it and making predictions
+        """
+        return {
+            "points": self.n_points,
+            "fits": self.n_fits,
+            "fit_time": self.fit_time,
+            "predictions": self.n_predictions,
+            "predict_time": self.predict_time,
+        }
+
+    def _fit_pending(self):
+        new_x = np.array([x for x, _ in self._pending])
+        new_y = np.array([y for _, y in self._pending])
+        self._pending = []
+
+        if self._x is None:
+            x, y = new_x, new_y
+        else:
+            x = np.vstack([self._x, new_x])
+            y = np.vstack([self._y, new_y])
+
+        start_time = time.perf_counter()
+        with phase_timer.phase("surrogate_fit"):
+            if self._x is None or len(x) > self.max_points \
+                    or len(x) >= 2 * self._n_refitted:
+                # Refit from scratch, on the most recent points only
+                # if there are too many
+                if len(x) > self.max_points:
+                    x = x[-(self.max_points // 2):]
+                    y = y[-(self.max_points // 2):]
+                self._fit(x, y)
+                self._n_refitted = len(x)
+            else:
+                self._update(new_x, new_y)
+            self._x = x
+            self._y = y
+        self.fit_time += time.perf_counter() - start_time
+        self.n_fits += 1
+
+    @abstractmethod
+    def _fit(self, x, y):
+        """ Fits the model to all its points"""
+
+    def _update(self, x, y):
+        """ Updates the model with new points, added to those it was
+        last fitted on. By default, the model is refitted."""
+        self._fit(np.vstack([self._x, x]), np.vstack([self._y, y]))
+
+    @abstractmethod
+    def _predict(self, x):
+        """ Returns the predicted mean and standard deviation of the
+        objective values of the points"""
+
+
+class RBFSurrogate(BaseSurrogate):
+    """ Interpolation of the objective values by Gaussian radial basis
+    functions centred on the evaluated points.
+
+    Inputs are standardized with the mean and standard deviation of
+    the points the model was last fitted from scratch on. The inverse
+    of the kernel matrix is then bordered with each new point in turn,
+    at a cost quadratic rather than cubic in the number of points.
+
+    The uncertainty of a prediction grows with the distance from the
+    point to the nearest evaluated point, up to the standard deviation
+    of the objective values.
+    """
+
+    #: Length scale of the basis functions, in units of the standard
+    #: deviation of each input, times the square root of the number of
+    #: inputs
+    length_scale = Float(1.0)
+
+    #: Regularization added to the diagonal of the kernel matrix, in
+    #: units of the variance of the objective values
+    noise = Float(1e-4)
+
+    #: Mean and standard deviation of the inputs and outputs
+    _x_mean = Any()
+    _x_std = Any()
+    _y_mean = Any()
+    _y_std = Any()
+
+    #: Standardized inputs, inverse of the kernel matrix and weights
+    #: of the basis functions
+    _z = Any()
+    _inverse = Any()
+    _weights = Any()
+
+    def _fit(self, x, y):
+        self._x_mean = x.mean(axis=0)
+        x_std = x.std(axis=0)
+        self._x_std = np.where(x_std > 0, x_std, 1.0) \
+            * self.length_scale * np.sqrt(x.shape[1])
+        self._y_mean = y.mean(axis=0)
+        y_std = y.std(axis=0)
+        self._y_std = np.where(y_std > 0, y_std, 1.0)
+
+        self._z = self._standardize(x)
+        kernel = self._kernel(self._z, self._z)
+        kernel[np.diag_indices_from(kernel)] += self.noise
+        self._inverse = np.linalg.inv(kernel)
+        self._weights = self._inverse @ self._targets(y)
+
+    def _update(self, x, y):
+        inverse = self._inverse
+        points = self._z
+        for z in self._standardize(x):
+            cross = self._kernel(points, z[np.newaxis, :])[:, 0]
+            product = inverse @ cross
+            # Schur complement of the kernel of the previous points
+            schur = 1.0 + self.noise - cross @ product
+            inverse = np.block([
+                [inverse + np.outer(product, product) / schur,
+                 -product[:, np.newaxis] / schur],
+                [-product[np.newaxis, :] / schur, 1.0 / schur]
+            ])
+            points = np.vstack([points, z])
+        self._inverse = inverse
+        self._z = points
+        self._weights = self._inverse @ self._targets(
+            np.vstack([self._y, y]))
+
+    def _predict(self, x):
+        kernel = self._kernel(self._standardize(x), self._z)
+        mean = kernel @ self._weights * self._y_std + self._y_mean
+        variance = self._variance(kernel)
+        std = np.sqrt(np.clip(variance, 0.0, None))[:, np.newaxis] \
+            * self._y_std
+        return mean, std
+
+    def _variance(self, kernel):
+        """ Relative variance of the predictions, from the kernel
+        between the predicted and evaluated points"""
+        return 1.0 - np.max(kernel, axis=1) ** 2
+
+    def _standardize(self, x):
+        return (x - self._x_mean) / self._x_std
+
+    def _targets(self, y):
+        return (y - self._y_mean) / self._y_std
+
+    def _kernel(self, a, b):
+        squared_distances = (
+            np.sum(a ** 2, axis=1)[:, np.newaxis]
+            + np.sum(b ** 2, axis=1)[np.newaxis, :]
+            - 2.0 * a @ b.T
+        )
+        return np.exp(-0.5 * np.clip(squared_distances, 0.0, None))
+
+
+class GaussianProcessSurrogate(RBFSurrogate):
+    """ Gaussian process regression of the objective values, with a
+    squared exponential kernel.
+
+    The predicted mean is the same as the RBF interpolation, but the
+    uncertainty is the posterior standard deviation of the process,
+    which accounts for all the evaluated points rather than only the
+    nearest one, at the cost of a product with the inverse kernel
+    matrix for each prediction.
+    """
+
+    def _variance(self, kernel):
+        return 1.0 + self.noise - np.sum(
+            (kernel @ self._inverse) * kernel, axis=1)
+
+
+#: Surrogate models available to pre-screen candidates
+SURROGATES = {
+    "rbf": RBFSurrogate,
+    "gp": GaussianProcessSurrogate
+}
@@ -0,0 +1,212 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import socket
+import threading
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from force_nevergrad.engine.broker import (
+    decode_message,
+    encode_message,
+    parse_address,
+    run_worker,
+    serializable,
+    TaskBroker
+)
+
+
+def evaluate(parameter_values):
+    """KPIs of a point, evaluated in a worker process"""
+    x, y = parameter_values
+    if x < 0:
+        raise ValueError("negative x")
+    return [x + y, os.getpid()]
+
+
+class TestBroker(TestCase):
+
+    def setUp(self):
+        self.broker = TaskBroker(
+            local_workers=2,
+            local_function=evaluate,
+            heartbeat_timeout=2.0,
+            heartbeat_interval=0.2
+        )
+        self.broker.start()
+        self.addCleanup(self.broker.close)
+
+    def connect(self, name, heartbeats=False):
+        """Connects a worker by hand, returning its socket and its
+        incoming lines"""
+        host, port = parse_address(self.broker.bound_address)
+        connection = socket.create_connection((host, port))
+        self.addCleanup(connection.close)
+        connection.sendall(encode_message(
+            {"type": "hello", "worker": name}))
+
+        def send_heartbeats():
+            try:
+                while True:
+                    time.sleep(0.1)
+                    connection.sendall(encode_message({"type": "heartbeat"}))
+            except OSError:
+                return
+
+        if heartbeats:
+            threading.Thread(target=send_heartbeats, daemon=True).start()
+        return connection, connection.makefile('rb')
+
+    def test_messages(self):
+        message = {"type": "task", "id": 1, "parameters": [0.5, "a"]}
+        line = encode_message(message)
+        self.assertTrue(line.endswith(b"\n"))
+        self.assertEqual(message, decode_message(line))
+        with self.assertRaises(ValueError):
+            decode_message(b"[1, 2]\n")
+
+        self.assertEqual(("node-1", 5555), parse_address("node-1:5555"))
+        for address in ["node-1", ":5555", "node-1:port"]:
+            with self.assertRaises(ValueError):
+                parse_address(address)
+
+        self.assertEqual(
+            [1.0, [2, 3], "a", True],
+            serializable([np.float64(1.0), np.array([2, 3]), "a",
+                          np.bool_(True)]))
+
+    def test_evaluate(self):
+        kpis = self.broker.evaluate([1.0, 2.0])
+        self.assertIsInstance(kpis, np.ndarray)
+        self.assertEqual(3.0, kpis[0])
+
+        # Evaluations are shared by the workers
+        async def evaluate_all():
+            return await asyncio.gather(*[
+                self.broker.evaluate_async([float(i), 1.0])
+                for i in range(20)])
+
+        loop = asyncio.new_event_loop()
+        results = loop.run_until_complete(evaluate_all())
+        loop.close()
+        self.assertListEqual(
+            [i + 1.0 for i in range(20)], [kpis[0] for kpis in results])
+        self.assertEqual(2, len({kpis[1] for kpis in results}))
+        self.assertNotIn(os.getpid(), {kpis[1] for kpis in results})
+        self.assertEqual(21, self.broker.n_completed)
+        self.assertEqual(2, self.broker.statistics()["n_workers"])
+
+    def test_failed_evaluation(self):
+        with self.assertRaises(RuntimeError):
+            self.broker.evaluate([-1.0, 0.0])
+
+        # The worker carries on
+        self.assertEqual(1.0, self.broker.evaluate([1.0, 0.0])[0])
+
+    def restart_broker(self, **traits):
+        """Replaces the broker by one without local workers"""
+        self.broker.close()
+        self.broker = TaskBroker(**traits)
+        self.broker.start()
+        self.addCleanup(self.broker.close)
+
+    def test_lost_worker(self):
+
+        # A worker that closes its connection while evaluating a task,
+        # and one that stops sending heartbeats
+        for name in ["closed", "silent"]:
+            self.restart_broker(heartbeat_timeout=0.5)
+            connection, lines = self.connect(name)
+            future = self.broker.submit([1.0, 2.0])
+            message = decode_message(lines.readline())
+            self.assertEqual("task", message["type"])
+            self.assertEqual([1.0, 2.0], message["parameters"])
+            if name == "closed":
+                connection.close()
+
+            # The task is re-queued, and evaluated by another worker
+            other, lines = self.connect("other", heartbeats=True)
+            message = decode_message(lines.readline())
+            self.assertEqual([1.0, 2.0], message["parameters"])
+            other.sendall(encode_message(
+                {"type": "result", "id": message["id"], "kpis": [3.0]}))
+            self.assertListEqual([3.0], future.result(timeout=5.0))
+            self.assertEqual(1, self.broker.n_requeued)
+
+    def test_lost_idle_worker(self):
+        self.restart_broker(heartbeat_timeout=0.5)
+
+        # A worker that stops sending heartbeats while idle is lost,
+        # and never sent a task
+        self.connect("silent")
+        other, lines = self.connect("other", heartbeats=True)
+        self.wait_for(lambda: self.broker.workers == ["other"])
+        future = self.broker.submit([1.0, 2.0])
+        message = decode_message(lines.readline())
+        other.sendall(encode_message(
+            {"type": "result", "id": message["id"], "kpis": [3.0]}))
+        self.assertListEqual([3.0], future.result(timeout=5.0))
+        self.assertEqual(0, self.broker.n_requeued)
+
+    def test_worker_timeout(self):
+        self.restart_broker(worker_timeout=0.2)
+
+        # Queued tasks fail while no worker connects
+        future = self.broker.submit([1.0, 2.0])
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=5.0)
+
+        # They are kept while a worker is connected
+        connection, lines = self.connect("worker", heartbeats=True)
+        self.wait_for(lambda: self.broker.workers == ["worker"])
+        self.broker.submit([1.0, 2.0])
+        queued = self.broker.submit([1.0, 2.0])
+        time.sleep(0.5)
+        self.assertFalse(queued.done())
+
+    def wait_for(self, condition, timeout=5.0):
+        """Waits until the condition holds"""
+        deadline = time.time() + timeout
+        while not condition():
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.05)
+
+    def test_max_attempts(self):
+        self.restart_broker(heartbeat_timeout=0.5, max_attempts=1)
+        connection, lines = self.connect("closed")
+        future = self.broker.submit([1.0, 2.0])
+        lines.readline()
+        connection.close()
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=5.0)
+
+    def test_run_worker(self):
+        self.restart_broker()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            worker = executor.submit(
+                run_worker, self.broker.bound_address, evaluate,
+                heartbeat_interval=0.1, name="thread")
+            for i in range(3):
+                kpis = self.broker.evaluate([float(i), 0.0])
+                self.assertListEqual([float(i), os.getpid()], list(kpis))
+            self.assertListEqual(["thread"], self.broker.workers)
+
+            # The worker exits once the broker closes
+            self.broker.close()
+            self.assertEqual(3, worker.result(timeout=5.0))
+
+    def test_close(self):
+        future = self.broker.submit([1.0, 2.0])
+        future.result(timeout=5.0)
+        self.broker.close()
+
+        # The local workers exit
+        for process in self.broker._processes:
+            self.assertFalse(process.is_alive())
+        with self.assertRaises(RuntimeError):
+            self.broker.submit([1.0, 2.0])
@@ -0,0 +1,96 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import os
+import pickle
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from force_nevergrad.engine.checkpoint import (
+    archive_state,
+    Checkpointer,
+    restore_archive_state
+)
+from force_nevergrad.engine.hypervolume import HypervolumeLoss
+from force_nevergrad.tests.mock_classes.mock_optimizer import (
+    MockMultiObjectiveFunction
+)
+
+TIME_PATH = 'force_nevergrad.engine.checkpoint.time.time'
+
+
+class TestCheckpointer(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'run.checkpoint')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_load(self):
+
+        checkpointer = Checkpointer(path=self.path)
+        self.assertFalse(checkpointer.exists())
+        self.assertIsNone(checkpointer.load())
+
+        checkpointer.save({'n_evaluations': 5, 'data': [1, 2]}, 5)
+        self.assertTrue(checkpointer.exists())
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+        state = Checkpointer(path=self.path).load()
+        self.assertDictEqual({'n_evaluations': 5, 'data': [1, 2]}, state)
+
+    def test_is_due_evaluations(self):
+
+        checkpointer = Checkpointer(path=self.path, every_evaluations=10)
+        self.assertFalse(checkpointer.is_due(9))
+        self.assertTrue(checkpointer.is_due(10))
+
+        checkpointer.save({'n_evaluations': 10}, 10)
+        self.assertFalse(checkpointer.is_due(19))
+        self.assertTrue(checkpointer.is_due(20))
+
+        # Loading a checkpoint restarts the count from its evaluations
+        checkpointer = Checkpointer(path=self.path, every_evaluations=10)
+        checkpointer.load()
+        self.assertFalse(checkpointer.is_due(19))
+
+    def test_is_due_seconds(self):
+
+        with patch(TIME_PATH, return_value=100.0):
+            checkpointer = Checkpointer(path=self.path, every_seconds=60)
+        with patch(TIME_PATH, return_value=159.0):
+            self.assertFalse(checkpointer.is_due(1))
+        with patch(TIME_PATH, return_value=160.0):
+            self.assertTrue(checkpointer.is_due(1))
+
+        # Disabled by default
+        checkpointer = Checkpointer(path=self.path)
+        self.assertFalse(checkpointer.is_due(1000))
+
+    def test_archive_state(self):
+
+        ob_func = MockMultiObjectiveFunction(params=[])
+        ob_func.pareto_size = 3
+        state = archive_state(ob_func)
+        self.assertNotIn('multiobjective_function', state)
+        self.assertEqual(3, state['pareto_size'])
+
+        ob_func = MockMultiObjectiveFunction(params=[])
+        restore_archive_state(ob_func, state)
+        self.assertEqual(3, ob_func.pareto_size)
+
+    def test_hypervolume_archive_state(self):
+
+        ob_func = HypervolumeLoss(lambda x: [x, 1.0 - x], [1.0, 1.0])
+        ob_func(0.5)
+        state = pickle.loads(pickle.dumps(archive_state(ob_func)))
+        self.assertNotIn('multiobjective_function', state)
+
+        ob_func = HypervolumeLoss(lambda x: [x, 1.0 - x], [1.0, 1.0])
+        restore_archive_state(ob_func, state)
+        self.assertEqual(0.25, ob_func.volume)
+        self.assertEqual([((0.5,), {})], ob_func.pareto_front())
+        self.assertIsNotNone(ob_func.multiobjective_function)
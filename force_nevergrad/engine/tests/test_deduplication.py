@@ -0,0 +1,69 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from unittest import TestCase
+
+from force_nevergrad.engine.deduplication import CandidateDeduplicator
+
+
+class TestCandidateDeduplicator(TestCase):
+
+    def setUp(self):
+        self.deduplicator = CandidateDeduplicator(recent_size=2)
+
+    def test_key(self):
+        key = self.deduplicator.key([0.1, [1, 2], "a"])
+        self.assertEqual(key, self.deduplicator.key([0.1, [1.0, 2.0], "a"]))
+        self.assertNotEqual(
+            key, self.deduplicator.key([0.1 + 1e-12, [1, 2], "a"]))
+
+    def test_wait(self):
+        self.assertFalse(self.deduplicator.is_in_flight("a"))
+        self.deduplicator.start("a")
+        self.assertTrue(self.deduplicator.is_in_flight("a"))
+
+        # Duplicates wait for the evaluation in flight
+        self.deduplicator.suppress("a", 1)
+        self.deduplicator.suppress("a", 2)
+        self.assertListEqual([1, 2], self.deduplicator.finish("a", 0.5))
+        self.assertFalse(self.deduplicator.is_in_flight("a"))
+        self.assertEqual(2, self.deduplicator.n_waited)
+
+        # And later ones are told its value
+        self.assertEqual(0.5, self.deduplicator.lookup("a"))
+        self.assertIsNone(self.deduplicator.lookup("b"))
+        self.assertEqual(1, self.deduplicator.n_recent)
+        self.assertEqual(3, self.deduplicator.n_suppressed)
+
+    def test_reask(self):
+        self.deduplicator.policy = "reask"
+        self.deduplicator.start("a")
+        self.deduplicator.suppress("a", 1)
+        # The duplicate is still told the value of the evaluation
+        self.assertListEqual([1], self.deduplicator.finish("a", 0.5))
+        self.assertEqual(
+            {'recent': 0, 'waited': 0, 'reasked': 1, 'suppressed': 1},
+            self.deduplicator.statistics())
+
+    def test_recent_size(self):
+        for key in "abc":
+            self.deduplicator.finish(key, 1.0)
+
+        # Only the most recent evaluations are remembered
+        self.assertIsNone(self.deduplicator.lookup("a"))
+        self.assertEqual(1.0, self.deduplicator.lookup("c"))
+
+        deduplicator = CandidateDeduplicator(recent_size=0)
+        deduplicator.finish("a", 1.0)
+        self.assertIsNone(deduplicator.lookup("a"))
+
+    def test_reset(self):
+        self.deduplicator.start("a")
+        self.deduplicator.suppress("a", 1)
+        self.deduplicator.finish("b", 1.0)
+        self.deduplicator.lookup("b")
+
+        self.deduplicator.reset()
+        self.assertFalse(self.deduplicator.is_in_flight("a"))
+        self.assertIsNone(self.deduplicator.lookup("b"))
+        self.assertEqual(0, self.deduplicator.n_suppressed)
@@ -0,0 +1,96 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from unittest import TestCase
+
+import numpy as np
+
+from force_nevergrad.engine.evaluation_cache import (
+    canonical_form,
+    canonical_key,
+    EvaluationCache
+)
+
+
+class TestEvaluationCache(TestCase):
+
+    def setUp(self):
+        self.cache = EvaluationCache(maxsize=2)
+
+    def test_canonical_form(self):
+
+        self.assertListEqual(
+            [1.0, [2.0, 3.0], 'a', True],
+            canonical_form([1, np.array([2.0, 3.0]), 'a', True])
+        )
+
+        # numerical values are rounded to the nearest multiple
+        # of the tolerance
+        self.assertListEqual(
+            [10, [20, 30]],
+            canonical_form([1.0001, [2.0, 2.9999]], tolerance=0.1)
+        )
+
+    def test_canonical_key(self):
+
+        # numpy arrays and lists share keys
+        self.assertEqual(
+            canonical_key([0.1, np.array([1.0, 2.0])]),
+            canonical_key([0.1, [1.0, 2.0]])
+        )
+
+        # close values only share keys within the tolerance
+        self.assertNotEqual(
+            canonical_key([0.1 + 0.2]),
+            canonical_key([0.3])
+        )
+        self.assertEqual(
+            canonical_key([0.1 + 0.2], tolerance=1e-6),
+            canonical_key([0.3], tolerance=1e-6)
+        )
+
+    def test_lookup_store(self):
+
+        key = self.cache.key([0.0, 'a'])
+        self.assertIsNone(self.cache.lookup(key))
+        self.assertEqual(1, self.cache.misses)
+
+        self.cache.store(key, np.array([1.0, 2.0]))
+        np.testing.assert_array_equal(
+            [1.0, 2.0], self.cache.lookup(key))
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(0.5, self.cache.hit_rate)
+
+    def test_least_recently_used(self):
+
+        self.cache.store('a', 1)
+        self.cache.store('b', 2)
+
+        # 'a' is now the most recently used
+        self.assertEqual(1, self.cache.lookup('a'))
+
+        # so 'b' is discarded to make space for 'c'
+        self.cache.store('c', 3)
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.lookup('b'))
+        self.assertEqual(1, self.cache.lookup('a'))
+        self.assertEqual(3, self.cache.lookup('c'))
+
+    def test_statistics(self):
+
+        self.assertDictEqual(
+            {'size': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0},
+            self.cache.statistics()
+        )
+
+        self.cache.store('a', 1)
+        self.cache.lookup('a')
+        self.cache.lookup('b')
+        self.assertDictEqual(
+            {'size': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5},
+            self.cache.statistics()
+        )
+
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.hits)
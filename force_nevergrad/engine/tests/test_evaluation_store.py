@@ -0,0 +1,95 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from force_nevergrad.engine.evaluation_store import EvaluationStore
+
+
+def store_points(path, start):
+    """Stores a range of points from another process"""
+    store = EvaluationStore(path)
+    for i in range(start, start + 20):
+        store.store([float(i), 'a'], [i, -i])
+
+
+class TestEvaluationStore(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'evaluations.db')
+        self.store = EvaluationStore(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lookup_store(self):
+
+        self.assertIsNone(self.store.lookup([0.0, [1.0, 2.0], 'a']))
+        self.assertEqual(1, self.store.misses)
+
+        self.store.store([0.0, [1.0, 2.0], 'a'], np.array([1.0, 2.0]))
+        self.assertEqual(1, len(self.store))
+
+        kpis = self.store.lookup([0.0, np.array([1.0, 2.0]), 'a'])
+        np.testing.assert_array_equal([1.0, 2.0], kpis)
+        self.assertEqual(1, self.store.hits)
+
+        # The first KPIs stored are kept
+        self.store.store([0.0, [1.0, 2.0], 'a'], np.array([3.0, 4.0]))
+        np.testing.assert_array_equal(
+            [1.0, 2.0], self.store.lookup([0.0, [1.0, 2.0], 'a']))
+
+    def test_persistence(self):
+
+        self.store.store([0.5], [1.0])
+
+        # Evaluations are available to other runs ...
+        store = EvaluationStore(self.path)
+        np.testing.assert_array_equal([1.0], store.lookup([0.5]))
+
+        # ... unless they belong to another study
+        store = EvaluationStore(self.path, namespace='other')
+        self.assertIsNone(store.lookup([0.5]))
+        self.assertEqual(0, len(store))
+
+    def test_kpi_count(self):
+
+        self.store.store([0.5], [1.0, 2.0])
+
+        # KPIs are only returned if there are as many as expected
+        store = EvaluationStore(self.path, n_kpis=2)
+        np.testing.assert_array_equal([1.0, 2.0], store.lookup([0.5]))
+        store = EvaluationStore(self.path, n_kpis=3)
+        self.assertIsNone(store.lookup([0.5]))
+        self.assertEqual(1, store.misses)
+
+    def test_tolerance(self):
+
+        store = EvaluationStore(self.path, tolerance=0.01)
+        store.store([0.5], [1.0])
+        np.testing.assert_array_equal([1.0], store.lookup([0.501]))
+        self.assertIsNone(store.lookup([0.52]))
+
+    def test_concurrent_access(self):
+
+        # Threads sharing the same store
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for start in range(0, 80, 20):
+                executor.submit(
+                    lambda i: [self.store.store([float(j), 'b'], [j])
+                               for j in range(i, i + 20)],
+                    start)
+        self.assertEqual(80, len(self.store))
+
+        # Processes sharing the same file
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(store_points, [self.path] * 4, [0, 10, 20, 30]))
+        self.assertEqual(130, len(self.store))
+        np.testing.assert_array_equal(
+            [35, -35], self.store.lookup([35.0, 'a']))
@@ -0,0 +1,234 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import pickle
+from unittest import TestCase
+
+import numpy as np
+
+from nevergrad.functions import MultiobjectiveFunction
+from nevergrad.functions.multiobjective.hypervolume import (
+    HypervolumeIndicator
+)
+
+from force_nevergrad.engine.hypervolume import (
+    hypervolume,
+    hypervolume_contribution,
+    HypervolumeLoss,
+    OnlineHypervolumeLoss
+)
+
+
+def nevergrad_hypervolume(points, reference):
+    """Reference hypervolume calculation"""
+    points = [point for point in points if np.all(point <= reference)]
+    return HypervolumeIndicator(reference).compute(points)
+
+
+class TestHypervolume(TestCase):
+
+    def setUp(self):
+        self.random_state = np.random.RandomState(0)
+
+    def test_hypervolume_1d(self):
+        self.assertEqual(
+            3.0, hypervolume([[2.0], [1.0], [5.0]], [4.0]))
+
+    def test_hypervolume_2d(self):
+        points = [[1.0, 3.0], [2.0, 2.0], [3.0, 1.0], [2.5, 2.5]]
+        self.assertEqual(6.0, hypervolume(points, [4.0, 4.0]))
+
+        # Points beyond the reference dominate no volume
+        self.assertEqual(0.0, hypervolume([[5.0, 1.0]], [4.0, 4.0]))
+        self.assertEqual(0.0, hypervolume(np.empty((0, 2)), [4.0, 4.0]))
+
+    def test_hypervolume_exact(self):
+        for n_objectives in [2, 3]:
+            reference = np.full(n_objectives, 0.9)
+            for _ in range(10):
+                points = self.random_state.rand(30, n_objectives)
+                self.assertAlmostEqual(
+                    nevergrad_hypervolume(points, reference),
+                    hypervolume(points, reference)
+                )
+
+    def test_hypervolume_monte_carlo(self):
+        reference = np.ones(4)
+        points = self.random_state.rand(20, 4)
+        self.assertAlmostEqual(
+            nevergrad_hypervolume(points, reference),
+            hypervolume(points, reference, n_samples=100000,
+                        random_state=self.random_state),
+            places=2
+        )
+
+    def test_hypervolume_contribution(self):
+        for n_objectives in [2, 3]:
+            reference = np.ones(n_objectives)
+            points = self.random_state.rand(20, n_objectives)
+            volume = nevergrad_hypervolume(points, reference)
+            for point in self.random_state.rand(10, n_objectives):
+                self.assertAlmostEqual(
+                    nevergrad_hypervolume(
+                        np.vstack([points, point]), reference) - volume,
+                    hypervolume_contribution(point, points, reference)
+                )
+
+        # Dominated points and those beyond the reference contribute
+        # nothing
+        self.assertEqual(0.0, hypervolume_contribution(
+            [2.0, 2.0], [[1.0, 1.0]], [3.0, 3.0]))
+        self.assertEqual(0.0, hypervolume_contribution(
+            [4.0, 0.0], [[1.0, 1.0]], [3.0, 3.0]))
+        self.assertEqual(4.0, hypervolume_contribution(
+            [1.0, 1.0], np.empty((0, 2)), [3.0, 3.0]))
+
+
+class TestHypervolumeLoss(TestCase):
+
+    def test_compute_aggregate_loss(self):
+
+        upper_bounds = np.array([4.0, 4.0])
+        loss = HypervolumeLoss(sum, upper_bounds)
+
+        random_state = np.random.RandomState(0)
+        losses = np.vstack([
+            random_state.rand(50, 2) * 5.0,
+            [[1.0, 1.0], [2.0, 2.0], [1.0, 4.0]]
+        ])
+
+        front = np.empty((0, 2))
+        volume = 0.0
+        for index, value in enumerate(losses):
+            aggregate_loss = loss.compute_aggregate_loss(value, index)
+
+            if np.any(value > upper_bounds):
+                # Distance to the upper bounds
+                expected = np.max(value - upper_bounds)
+            elif not np.any(np.all(front <= value, axis=1)):
+                # Hypervolume of the new Pareto front
+                front = np.vstack([
+                    front[~np.all(value <= front, axis=1)], value])
+                volume = nevergrad_hypervolume(front, upper_bounds)
+                expected = -volume
+            else:
+                # Distance to the Pareto front
+                dominating = front[np.all(front <= value, axis=1)]
+                expected = -volume + np.min(value - dominating)
+
+            self.assertAlmostEqual(expected, aggregate_loss)
+
+        self.assertAlmostEqual(volume, loss.volume)
+
+        # Same Pareto front as nevergrad
+        ng_loss = MultiobjectiveFunction(sum, upper_bounds)
+        for index, value in enumerate(losses):
+            ng_loss.compute_aggregate_loss(value, index)
+        self.assertCountEqual(
+            ng_loss.pareto_front(), loss.pareto_front())
+
+    def test_call(self):
+        loss = HypervolumeLoss(
+            lambda x, y: np.array([x, y]), [1.0, 1.0])
+
+        self.assertEqual(-0.25, loss(0.5, 0.5))
+        self.assertListEqual([((0.5, 0.5), {})], loss.pareto_front())
+
+        with self.assertRaises(ValueError):
+            HypervolumeLoss(sum)
+
+    def test_pickle(self):
+        loss = HypervolumeLoss(
+            lambda x, y: np.array([x, y]), [1.0, 1.0])
+        loss(0.5, 0.5)
+
+        # The function is not pickled, so lambdas are supported
+        restored = pickle.loads(pickle.dumps(loss))
+        self.assertIsNone(restored.multiobjective_function)
+        self.assertEqual(0.25, restored.volume)
+        self.assertListEqual([((0.5, 0.5), {})], restored.pareto_front())
+
+        # Restoring the state of an existing loss keeps its function
+        other = HypervolumeLoss(
+            lambda x, y: np.array([x, y]), [1.0, 1.0])
+        other.__setstate__(loss.__getstate__())
+        self.assertEqual(0.25, other.volume)
+        self.assertAlmostEqual(-0.5, other(0.0, 0.5))
+
+    def test_many_objectives(self):
+        upper_bounds = np.ones(4)
+        loss = HypervolumeLoss(sum, upper_bounds, n_samples=2000)
+        losses = np.random.RandomState(0).rand(30, 4)
+        for index, value in enumerate(losses):
+            loss.compute_aggregate_loss(value, index)
+
+        # The volume is estimated over the whole front, rather than
+        # summed from the noisy estimates of each contribution
+        front = loss.archive.losses()
+        self.assertEqual(
+            hypervolume(front, upper_bounds, n_samples=2000,
+                        random_state=np.random.RandomState(0)),
+            loss.volume)
+        self.assertAlmostEqual(
+            nevergrad_hypervolume(front, upper_bounds), loss.volume,
+            delta=0.05)
+
+        # From the same samples, so dominated points leave it unchanged
+        volume = loss.volume
+        self.assertGreater(
+            loss.compute_aggregate_loss(front[0] + 0.01, 30), -volume)
+        self.assertEqual(volume, loss.volume)
+
+    def test_first_point_on_bounds(self):
+        loss = HypervolumeLoss(sum, [1.0, 1.0])
+
+        # A first point with no volume is not added to the front
+        self.assertEqual(0.0, loss.compute_aggregate_loss([1.0, 0.5], 0))
+        self.assertListEqual([], loss.pareto_front())
+
+
+class TestOnlineHypervolumeLoss(TestCase):
+
+    def test_compute_aggregate_loss(self):
+
+        loss = OnlineHypervolumeLoss(sum)
+        random_state = np.random.RandomState(0)
+
+        # KPIs of very different scales
+        losses = random_state.rand(100, 2) * [1.0, 1000.0]
+        for index, value in enumerate(losses):
+            aggregate_loss = loss.compute_aggregate_loss(value, index)
+
+            # Running bounds, with a reference point beyond the maxima
+            seen = losses[:index + 1]
+            np.testing.assert_allclose(seen.min(axis=0), loss.lower_bounds)
+            self.assertTrue(np.all(loss.upper_bounds > seen.max(axis=0)))
+
+            # Hypervolume of the front against the current reference
+            self.assertAlmostEqual(
+                hypervolume(loss.archive.losses(), loss.upper_bounds),
+                loss.volume,
+                places=6
+            )
+
+            # Normalized hypervolume, at most that of the unit box
+            normalized = loss.volume / np.prod(
+                loss.upper_bounds - loss.lower_bounds)
+            self.assertLessEqual(normalized, 1.0)
+            self.assertGreaterEqual(aggregate_loss, -normalized)
+
+        # The archive holds the Pareto front of all losses
+        front = [
+            index for index, value in enumerate(losses)
+            if not np.any(np.all(losses <= value, axis=1)
+                          & np.any(losses < value, axis=1))
+        ]
+        self.assertCountEqual(
+            front, [args[0] for args, _ in loss.pareto_front()])
+
+    def test_first_point(self):
+        loss = OnlineHypervolumeLoss(sum, [1.0, 1.0])
+
+        # Upper bounds provided are ignored
+        self.assertEqual(-1.0, loss.compute_aggregate_loss([2.0, 2.0]))
+        np.testing.assert_allclose([2.1, 2.1], loss.upper_bounds)
@@ -0,0 +1,56 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from force_nevergrad.engine.metrics import MetricsExporter
+
+
+class TestMetricsExporter(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_jsonl(self):
+        path = os.path.join(self.tmp_dir.name, 'metrics.jsonl')
+        exporter = MetricsExporter(path=path)
+        exporter.export({"evaluations": 1, "hypervolume": None})
+        exporter.export({"evaluations": 2, "hypervolume": 0.5})
+
+        with open(path) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(2, len(records))
+        self.assertEqual(1, records[0]["evaluations"])
+        self.assertIsNone(records[0]["hypervolume"])
+        self.assertEqual(0.5, records[1]["hypervolume"])
+        self.assertIn("timestamp", records[1])
+
+    def test_prometheus(self):
+        path = os.path.join(self.tmp_dir.name, 'metrics.prom')
+        exporter = MetricsExporter(path=path, format="prometheus")
+        exporter.export({"evaluations": 1, "hypervolume": 0.5})
+        exporter.export({"evaluations": 2, "hypervolume": None})
+
+        # Each export replaces the last, leaving out missing values
+        with open(path) as file:
+            lines = file.read().splitlines()
+        self.assertEqual([
+            "# HELP force_nevergrad_evaluations Number of evaluations "
+            "counted towards the budget",
+            "# TYPE force_nevergrad_evaluations gauge",
+            "force_nevergrad_evaluations 2.0"
+        ], lines)
+        self.assertFalse(os.path.exists(path + '.tmp'))
+
+    def test_is_due(self):
+        path = os.path.join(self.tmp_dir.name, 'metrics.jsonl')
+        exporter = MetricsExporter(path=path, every_seconds=60.0)
+        self.assertTrue(exporter.is_due())
+        exporter.export({})
+        self.assertFalse(exporter.is_due())
+        exporter.every_seconds = 0.0
+        self.assertTrue(exporter.is_due())
@@ -0,0 +1,206 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from unittest import TestCase
+
+import numpy as np
+
+from force_bdss.api import (
+    FixedMCOParameter,
+    ListedMCOParameter,
+    RangedMCOParameter,
+    RangedVectorMCOParameter
+)
+
+from force_nevergrad.engine.checkpoint import Checkpointer
+from force_nevergrad.engine.evaluation_cache import EvaluationCache
+from force_nevergrad.engine.multi_fidelity import (
+    fidelity_levels,
+    FidelityTranslation,
+    NevergradMultiFidelityOptimizer,
+    promotion_order
+)
+from force_nevergrad.engine.parameter_translation import translation_plan
+from force_nevergrad.tests.probe_classes.optimizer import (
+    TwoMinimaObjective
+)
+
+
+class TestMultiFidelity(TestCase):
+
+    def setUp(self):
+        self.probe = TwoMinimaObjective()
+        self.params = [
+            ListedMCOParameter(name="resolution", levels=[1, 3, 9]),
+        ] + self.probe.get_params()
+        self.fidelities = []
+
+    def objective(self, p):
+        """ The TwoMinima objective, with noise decreasing with the
+        fidelity, given as the first parameter"""
+        self.fidelities.append(p[0])
+        return (
+            self.probe.objective(p[1:]) * np.array([-1.0, 1.0])
+            + np.random.normal(scale=0.1 / p[0], size=2)
+        )
+
+    def test_fidelity_levels(self):
+        self.assertEqual(
+            [0.1, 0.3, 1.0],
+            fidelity_levels(ListedMCOParameter(
+                levels=[i / 10 for i in range(11)])))
+        self.assertEqual(
+            [1.0, 2.0, 4.0, 8.0],
+            fidelity_levels(
+                RangedMCOParameter(lower_bound=0.5, upper_bound=8.0),
+                eta=2, n_rungs=4))
+        self.assertEqual(
+            [5.0, 10.0],
+            fidelity_levels(
+                RangedMCOParameter(lower_bound=5.0, upper_bound=10.0)))
+        self.assertEqual(
+            [4], fidelity_levels(FixedMCOParameter(value=4)))
+        with self.assertRaises(ValueError):
+            fidelity_levels(RangedVectorMCOParameter())
+
+    def test_promotion_order(self):
+        values = np.array([
+            [3.0, 3.0],
+            [0.0, 2.0],
+            [2.0, 0.0],
+            [1.0, 0.5],
+            [2.0, 2.0]
+        ])
+        # The non-dominated candidates come first, the best balanced
+        # of them first
+        order = promotion_order(values)
+        self.assertEqual({1, 2, 3}, set(order[:3]))
+        self.assertListEqual([4, 0], list(order[3:]))
+        self.assertEqual(3, order[0])
+
+    def test_fidelity_translation(self):
+        translation = FidelityTranslation(
+            translation=translation_plan(self.probe.get_params()),
+            index=0,
+            fidelity=9
+        )
+        self.assertListEqual(
+            [9, [0.5, 0.5]],
+            translation.to_mco([np.array([0.5, 0.5])]))
+
+    def test_brackets(self):
+        optimizer = NevergradMultiFidelityOptimizer(num_workers=2)
+        brackets = optimizer.brackets(3)
+        self.assertEqual([(0, 18), (0, 18)], [next(brackets) for _ in "ab"])
+
+        optimizer.schedule = "hyperband"
+        optimizer.bracket_size = 27
+        brackets = optimizer.brackets(3)
+        self.assertEqual(
+            [(0, 27), (1, 9), (2, 3), (0, 27)],
+            [next(brackets) for _ in range(4)])
+
+    def test_nevergrad_budget(self):
+        optimizer = NevergradMultiFidelityOptimizer()
+        # Brackets of 9 candidates, one of which reaches full fidelity
+        self.assertEqual(135, optimizer.nevergrad_budget(3, 15))
+        self.assertEqual(0, optimizer.nevergrad_budget(3, 0))
+
+        # Brackets of 27, 9 and 3 candidates, starting at each
+        # fidelity, of which 3 reach full fidelity, but only as many
+        # as the budget allows are asked for at full fidelity
+        optimizer.schedule = "hyperband"
+        optimizer.bracket_size = 27
+        self.assertEqual(27 + 9 + 3, optimizer.nevergrad_budget(3, 9))
+        self.assertEqual(27 + 9 + 2, optimizer.nevergrad_budget(3, 8))
+
+    def test_successive_halving(self):
+
+        np.random.seed(0)
+        optimizer = NevergradMultiFidelityOptimizer(
+            budget=20,
+            bound_sample=5,
+            upper_bounds=[None, None]
+        )
+        results = list(optimizer.optimize_function(
+            self.objective, self.params, verbose_run=True))
+
+        # Only evaluations at full fidelity are reported and counted
+        self.assertEqual(20, len(results))
+        for point in results:
+            self.assertEqual(9.0, point[0])
+        self.assertEqual(20, optimizer.statistics.n_evaluations)
+
+        # Brackets of 9 candidates at the lowest fidelity, after the
+        # calibration sample at full fidelity
+        self.assertEqual(
+            [(1.0, 135, 45), (3.0, 45, 15), (9.0, 20, 0)],
+            [(rung.fidelity, rung.n_evaluated, rung.n_promoted)
+             for rung in optimizer.rungs])
+        self.assertEqual(
+            {1.0: 135, 3.0: 45, 9.0: 20},
+            {fidelity: self.fidelities.count(fidelity)
+             for fidelity in set(self.fidelities)})
+
+        # Every candidate asked for is told to the optimizer, as are
+        # those of the calibration sample
+        self.assertEqual(140, optimizer.statistics.n_told)
+
+        metrics = optimizer.progress_metrics()
+        self.assertEqual(180, metrics["low_fidelity_evaluations"])
+        self.assertAlmostEqual(60 / 180, metrics["promotion_rate"])
+
+        # The Pareto front is reported at full fidelity
+        optimizer.budget = 10
+        results = list(optimizer.optimize_function(
+            self.objective, self.params))
+        self.assertGreater(len(results), 0)
+        for point in results:
+            self.assertEqual(9.0, point[0])
+
+    def test_truncated_promotion(self):
+
+        optimizer = NevergradMultiFidelityOptimizer(
+            budget=5,
+            num_workers=2,
+            upper_bounds=[0.0, 1.0],
+            fidelities=[1, 3, 9]
+        )
+        list(optimizer.optimize_function(self.objective, self.params))
+
+        # Brackets of 18 candidates, of which 2 reach full fidelity,
+        # except in the last, where the budget only allows 1
+        self.assertEqual(
+            [(1.0, 54, 18), (3.0, 18, 5), (9.0, 5, 0)],
+            [(rung.fidelity, rung.n_evaluated, rung.n_promoted)
+             for rung in optimizer.rungs])
+        self.assertAlmostEqual(
+            23 / 72, optimizer.progress_metrics()["promotion_rate"])
+
+    def test_cached_successive_halving(self):
+
+        # The cache tells fidelities apart
+        optimizer = NevergradMultiFidelityOptimizer(
+            budget=10,
+            upper_bounds=[0.0, 1.0],
+            fidelities=[1, 3, 9],
+            cache=EvaluationCache()
+        )
+        list(optimizer.optimize_function(self.objective, self.params))
+        self.assertEqual(
+            len(self.fidelities),
+            sum(rung.n_evaluated for rung in optimizer.rungs))
+        self.assertEqual(0, optimizer.cache.statistics()["hits"])
+
+    def test_batch_functions_unsupported(self):
+
+        optimizer = NevergradMultiFidelityOptimizer(batch_size=10)
+        with self.assertRaises(ValueError):
+            list(optimizer.optimize_function(self.objective, self.params))
+
+    def test_checkpoints_unsupported(self):
+
+        optimizer = NevergradMultiFidelityOptimizer(
+            checkpoint=Checkpointer(path="run.checkpoint"))
+        with self.assertRaisesRegex(ValueError, "Checkpoints"):
+            list(optimizer.optimize_function(self.objective, self.params))
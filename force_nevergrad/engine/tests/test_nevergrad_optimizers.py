@@ -1,32 +1,66 @@
 #  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
 #  All rights reserved.
 
+import asyncio
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import Mock, patch
 import numpy as np
 from functools import partial
 
+from traits.api import TraitError
+
 from force_nevergrad.engine.nevergrad_optimizers import (
     _nevergrad_ask_tell,
+    _nevergrad_tell,
+    iterate_async,
+    nevergrad_batch_function,
+    nevergrad_coroutine,
     nevergrad_function,
     NevergradMultiOptimizer,
     NevergradScalarOptimizer,
 )
 
+from force_nevergrad.engine.checkpoint import Checkpointer
+from force_nevergrad.engine.deduplication import CandidateDeduplicator
+from force_nevergrad.engine.evaluation_cache import EvaluationCache
+from force_nevergrad.engine.hypervolume import (
+    hypervolume,
+    HypervolumeLoss,
+    OnlineHypervolumeLoss
+)
+from force_nevergrad.engine.metrics import MetricsExporter
+from force_nevergrad.engine.phase_timer import phase_timer
+from force_nevergrad.engine.run_statistics import RunStatistics
+from force_nevergrad.engine.stopping import StoppingCriteria
+from force_nevergrad.engine.surrogate import RBFSurrogate
 from force_nevergrad.engine.parameter_translation import (
     translate_mco_to_ng,
+    translation_plan
 )
 
 from force_nevergrad.tests.mock_classes.mock_optimizer import (
-    MockPoint,
     MockOptimizer,
     MockMultiObjectiveFunction
 )
+from force_nevergrad.tests.probe_classes.optimizer import (
+    GridValleyObjective,
+    TwoMinimaObjective
+)
 
 from nevergrad.optimization.base import Optimizer
 from nevergrad.functions import MultiobjectiveFunction
 
 
+def _negative_sum(mco_values):
+    """A picklable constraint on the TwoMinima parameters"""
+    x, y = mco_values[0]
+    return x + y <= 0.0
+
+
 ASK_TELL_PATH = (
     'force_nevergrad.engine.nevergrad_optimizers'
     '._nevergrad_ask_tell')
@@ -67,6 +101,25 @@ class TestNevergradOptimizer(TestCase):
             self.assertEqual(1, value)
             mock_loss.assert_called()
 
+    def test_nevergrad_tell(self):
+
+        optimizer = MockOptimizer(params=self.params)
+        ob_func = MockMultiObjectiveFunction(params=self.params)
+        x = optimizer.ask()
+
+        with patch.object(MockMultiObjectiveFunction,
+                          'compute_aggregate_loss',
+                          return_value=-2) as mock_loss, \
+                patch.object(MockOptimizer, 'tell') as mock_tell:
+
+            _nevergrad_tell(optimizer, ob_func, x, 1, no_bias=True)
+            mock_loss.assert_not_called()
+            mock_tell.assert_called_with(x, 0)
+
+            _nevergrad_tell(optimizer, ob_func, x, 1)
+            mock_loss.assert_called_with(1, 0, 1)
+            mock_tell.assert_called_with(x, -2)
+
     def test_nevergrad_function(self):
 
         # scalar (summed) objective
@@ -85,6 +138,72 @@ class TestNevergradOptimizer(TestCase):
         )
         self.assertListEqual(objective, [1, 2, 3])
 
+        # translated by a plan
+        plan = translation_plan(self.params)
+        nevergrad_function(
+            *self.instrumentation.args,
+            function=self.m_foo,
+            plan=plan
+        )
+        self.m_foo.assert_called_with(
+            [0.0, np.zeros((3, 3)).tolist()])
+
+    def test_nevergrad_coroutine(self):
+
+        async def foo(mco_params):
+            return self.m_foo(mco_params)
+
+        loop = asyncio.new_event_loop()
+
+        # scalar (summed) objective
+        objective = loop.run_until_complete(
+            nevergrad_coroutine(function=foo, is_scalar=True))
+        self.assertEqual(objective, 6)
+
+        # multi-objective
+        objective = loop.run_until_complete(
+            nevergrad_coroutine(function=foo, is_scalar=False))
+        self.assertListEqual(objective, [1, 2, 3])
+
+        loop.close()
+
+    def test_nevergrad_batch_function(self):
+
+        plan = translation_plan(self.params)
+        batch = [self.instrumentation.spawn_child().args for _ in range(4)]
+        function = Mock(return_value=np.ones((4, 3)))
+
+        # Rows of MCO parameter values, with vectors in place
+        objectives = nevergrad_batch_function(
+            batch, function=function, is_scalar=False, plan=plan)
+        parameters = function.call_args[0][0]
+        self.assertEqual((4, 10), parameters.shape)
+        np.testing.assert_array_equal(np.ones((4, 3)), objectives)
+
+        # scalar (summed) objectives
+        objectives = nevergrad_batch_function(
+            batch, function=function, is_scalar=True)
+        np.testing.assert_array_equal([3.0, 3.0, 3.0, 3.0], objectives)
+
+        # One result is expected for each candidate
+        function.return_value = np.ones((3, 3))
+        with self.assertRaises(ValueError):
+            nevergrad_batch_function(batch, function=function)
+
+    def test_iterate_async(self):
+
+        async def count(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                yield i
+
+        self.assertListEqual([0, 1, 2], list(iterate_async(count(3))))
+
+        # Generators can be abandoned part way through
+        for i in iterate_async(count(3)):
+            break
+        self.assertEqual(0, i)
+
     @patch.object(
         NevergradScalarOptimizer,
         'get_optimizer',
@@ -97,26 +216,28 @@ class TestNevergradOptimizer(TestCase):
     )
     def test_nevergrad_scalar_optimizer(self, mock_optimizer):
 
-        # IOptimizer that optimizes with MockOptimizer.minimize()
-        optimizer = NevergradScalarOptimizer()
+        # IOptimizer that optimizes with MockOptimizer ask and tell
+        optimizer = NevergradScalarOptimizer(budget=10)
 
         # default algorithm
         self.assertEqual(optimizer._algorithms_default(), "TwoPointsDE")
 
         # optimize
-        count = 0
-        for x in optimizer.optimize_function(self.m_foo, [1.0]):
-            # x0 of first parameter
-            self.assertEqual(x[0], 0.0)
-            # value of second parameter
-            self.assertListEqual(
-                x[1],
-                [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
-            )
-            count += 1
+        results = list(optimizer.optimize_function(self.m_foo, [1.0]))
 
-        # only one optimal point should be returned
-        self.assertEqual(count, 1)
+        # The first candidate is the best so far, as all have the same
+        # value, followed by the optimal point of the optimizer
+        self.assertEqual(2, len(results))
+        self.assertListEqual([0, 1], results[0])
+        x = results[-1]
+        # x0 of first parameter
+        self.assertEqual(x[0], 0.0)
+        # value of second parameter
+        self.assertListEqual(
+            x[1],
+            [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+        )
+        self.assertEqual(10, self.m_foo.call_count)
 
     @patch.object(
         NevergradMultiOptimizer,
@@ -141,41 +262,829 @@ class TestNevergradOptimizer(TestCase):
     )
     @patch.object(
         NevergradMultiOptimizer,
-        '_calculate_upper_bounds',
+        'get_calibration_sample',
+        return_value=[]
+    )
+    @patch.object(
+        NevergradMultiOptimizer,
+        '_estimate_upper_bounds',
         return_value=[10, 10]
     )
-    def test_nevergrad_multi_optimizer(self, mock1, mock2, mock3):
+    def test_nevergrad_multi_optimizer(self, mock1, mock2, mock3, mock4):
 
         # IOptimizer that optimizes with MockOptimizer.minimize()
-        # and returns a pareto front from MockMockMultiObjectiveFunction
+        # and returns the pareto front of its archive
         optimizer = NevergradMultiOptimizer()
 
         # default algorithm
         self.assertEqual(optimizer._algorithms_default(), "TwoPointsDE")
 
-        # optimize
-        count = 0
-        for x in optimizer.optimize_function(self.m_foo, [1.0]):
-            # x0 of first parameter
-            self.assertEqual(x[0], 0.0)
-            # value of second parameter
-            self.assertListEqual(
-                x[1],
-                [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
-            )
-            count += 1
-
-        # ten points in Pareto front
-        self.assertEqual(count, 10)
+        # optimize: every candidate has the same losses, so the
+        # Pareto front holds only the first
+        results = list(optimizer.optimize_function(self.m_foo, [1.0]))
+        self.assertEqual(1, len(results))
+        self.assertListEqual(optimizer.archive.pareto_front(), results)
+        self.assertEqual(
+            optimizer.statistics.n_evaluations, optimizer.archive.n_points)
 
         # Check MCO runs with both or one KPI upper bounds assigned
         optimizer.upper_bounds = [None, 5]
         results = list(optimizer.optimize_function(self.m_foo, [1.0]))
-        self.assertEqual(10, len(results))
+        self.assertEqual(1, len(results))
 
         optimizer.upper_bounds = [5, 5]
         results = list(optimizer.optimize_function(self.m_foo, [1.0]))
-        self.assertEqual(10, len(results))
+        self.assertEqual(1, len(results))
+
+    def test_parallel_scalar_optimizer(self):
+
+        # The first candidate may otherwise be the best of all
+        np.random.seed(0)
+        objective = GridValleyObjective()
+        params = objective.get_params()
+
+        def total(mco_params):
+            return np.sum(objective.objective(mco_params))
+
+        for executor_type in ['thread', 'process']:
+            optimizer = NevergradScalarOptimizer(
+                budget=30,
+                num_workers=4,
+                executor_type=executor_type
+            )
+
+            # Each new best point is reported as soon as it is found,
+            # so their values decrease
+            results = list(optimizer.optimize_function(
+                objective.objective, params))
+            values = [total(point) for point in results[:-1]]
+            self.assertGreater(len(values), 0)
+            self.assertListEqual(sorted(values, reverse=True), values)
+            self.assertEqual(30, optimizer.statistics.n_evaluations)
+
+            # Or every evaluated point, if verbose
+            results = list(optimizer.optimize_function(
+                objective.objective, params, verbose_run=True))
+            self.assertGreaterEqual(len(results), 30)
+
+        # Coroutine functions are awaited concurrently
+        async def evaluate(mco_params):
+            await asyncio.sleep(0.001)
+            return objective.objective(mco_params)
+
+        optimizer = NevergradScalarOptimizer(budget=20, num_workers=4)
+        results = list(optimizer.optimize_function(evaluate, params))
+        self.assertGreater(len(results), 0)
+        self.assertEqual(20, optimizer.statistics.n_evaluations)
+
+    def test_parallel_multi_optimizer(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+
+        for executor_type in ['thread', 'process']:
+            optimizer = NevergradMultiOptimizer(
+                budget=20,
+                bound_sample=4,
+                upper_bounds=[None, None],
+                num_workers=4,
+                executor_type=executor_type
+            )
+
+            # Every candidate in the budget is reported back
+            results = list(optimizer.optimize_function(
+                objective.objective, params, verbose_run=True))
+            self.assertEqual(20, len(results))
+
+            # The Pareto front is drawn from the evaluated points
+            front = list(optimizer.optimize_function(
+                objective.objective, params))
+            self.assertGreater(len(front), 0)
+            for point in front:
+                self.assertIn(point[0], objective.xpoints)
+                self.assertIn(point[1], objective.ypoints)
+
+    def test_async_multi_optimizer(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        running = []
+
+        async def async_objective(mco_params):
+            running.append(None)
+            n_running = len(running)
+            await asyncio.sleep(0.001)
+            running.pop()
+            return objective.objective(mco_params), n_running
+
+        async def evaluate(mco_params):
+            value, _ = await async_objective(mco_params)
+            return value
+
+        optimizer = NevergradMultiOptimizer(
+            budget=20,
+            bound_sample=4,
+            upper_bounds=[None, None],
+            num_workers=4
+        )
+
+        # Every candidate in the budget is reported back through the
+        # synchronous wrapper
+        results = list(optimizer.optimize_function(
+            evaluate, params, verbose_run=True))
+        self.assertEqual(20, len(results))
+
+        # Evaluations are awaited concurrently, up to num_workers at once
+        n_running = []
+
+        async def count_running(mco_params):
+            value, n = await async_objective(mco_params)
+            n_running.append(n)
+            return value
+
+        async def collect():
+            return [
+                point async for point in optimizer.optimize_function_async(
+                    count_running, params)
+            ]
+
+        loop = asyncio.new_event_loop()
+        front = loop.run_until_complete(collect())
+        loop.close()
+
+        self.assertGreater(len(front), 0)
+        self.assertEqual(20, len(n_running))
+        self.assertEqual(4, max(n_running))
+
+    def test_batch_multi_optimizer(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        batch_sizes = []
+
+        def batch_objective(parameters):
+            batch_sizes.append(len(parameters))
+            return np.array([objective.objective(row) for row in parameters])
+
+        optimizer = NevergradMultiOptimizer(
+            budget=50,
+            bound_sample=10,
+            upper_bounds=[None, None],
+            batch_size=15
+        )
+        results = list(optimizer.optimize_function(
+            batch_objective, params, verbose_run=True))
+
+        # The calibration sample is evaluated in a single call, and the
+        # rest of the budget in batches of batch_size
+        self.assertListEqual([10, 15, 15, 10], batch_sizes)
+        self.assertEqual(50, len(results))
+        self.assertEqual(50, optimizer.statistics.n_told)
+        for point in results:
+            self.assertIn(point[0], objective.xpoints)
+            self.assertIn(point[1], objective.ypoints)
+
+        # Cached candidates are left out of the batches
+        batch_sizes[:] = []
+        optimizer.cache = EvaluationCache()
+        optimizer.budget = 200
+        list(optimizer.optimize_function(batch_objective, params))
+        self.assertEqual(
+            optimizer.statistics.n_evaluations, sum(batch_sizes))
+
+        # The scalar optimizer evaluates batches of summed objectives
+        batch_sizes[:] = []
+        optimizer = NevergradScalarOptimizer(budget=30, batch_size=10)
+        results = list(optimizer.optimize_function(batch_objective, params))
+        self.assertGreater(len(results), 0)
+        self.assertListEqual([10, 10, 10], batch_sizes)
+
+    def test_surrogate_screening(self):
+
+        objective = TwoMinimaObjective()
+        params = objective.get_params()
+        function = Mock(side_effect=objective.objective)
+
+        for optimizer in [
+                NevergradScalarOptimizer(budget=30),
+                NevergradMultiOptimizer(
+                    budget=30, bound_sample=5, upper_bounds=[None, None])]:
+            function.reset_mock()
+            optimizer.surrogate = RBFSurrogate(min_points=8)
+            optimizer.screening_ratio = 5
+            phase_timer.reset()
+            phase_timer.enabled = True
+            try:
+                with self.assertLogs(
+                        "force_nevergrad.engine.nevergrad_optimizers",
+                        level="INFO") as logs:
+                    list(optimizer.optimize_function(
+                        function, params, verbose_run=True))
+            finally:
+                phase_timer.enabled = False
+            counts = phase_timer.summary()["counters"]
+            phase_timer.reset()
+
+            # Only the best of the screened candidates are evaluated
+            self.assertEqual(30, optimizer.statistics.n_evaluations)
+            self.assertEqual(30, function.call_count)
+            self.assertEqual(30, optimizer.surrogate.n_points)
+            self.assertGreater(counts["screened_out"], 0)
+            self.assertEqual(0, counts["screened_out"] % 4)
+            self.assertTrue(any(
+                "Surrogate model" in line for line in logs.output))
+
+            statistics = optimizer.surrogate.statistics()
+            self.assertGreater(statistics["fits"], 0)
+            self.assertGreater(statistics["predictions"], 0)
+            metrics = optimizer.progress_metrics()
+            self.assertEqual(
+                statistics["fit_time"], metrics["surrogate_fit_seconds"])
+
+        # No surrogate metrics without a surrogate
+        optimizer = NevergradScalarOptimizer(budget=10)
+        list(optimizer.optimize_function(function, params))
+        self.assertIsNone(optimizer.progress_metrics()[
+            "surrogate_fit_seconds"])
+
+    def test_constrained_optimizers(self):
+
+        objective = TwoMinimaObjective()
+        params = objective.get_params()
+        function = Mock(side_effect=objective.objective)
+
+        def feasible(mco_values):
+            x, y = mco_values[0]
+            return x + y <= 0.0
+
+        for optimizer in [
+                NevergradScalarOptimizer(budget=30),
+                NevergradMultiOptimizer(
+                    budget=30, upper_bounds=[None, None]),
+                NevergradMultiOptimizer(
+                    budget=30, upper_bounds=[None, None], encoding="flat")]:
+            function.reset_mock()
+            optimizer.constraints = [feasible]
+            with self.assertLogs(
+                    "force_nevergrad.engine.nevergrad_optimizers",
+                    level="INFO") as logs:
+                list(optimizer.optimize_function(function, params))
+
+            # Infeasible candidates are never evaluated, including
+            # those of the calibration sample
+            self.assertEqual(30, function.call_count)
+            for call in function.call_args_list:
+                self.assertTrue(feasible(call[0][0]))
+
+            n_rejected = optimizer.progress_metrics()["rejected_candidates"]
+            self.assertGreater(n_rejected, 0)
+            self.assertTrue(any(
+                "Constraints rejected {} of".format(n_rejected) in line
+                for line in logs.output))
+
+        # No rejections without constraints
+        optimizer = NevergradScalarOptimizer(budget=10)
+        list(optimizer.optimize_function(function, params))
+        self.assertIsNone(
+            optimizer.progress_metrics()["rejected_candidates"])
+
+    def test_cached_multi_optimizer(self):
+
+        # Grid with only 16 distinct points
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        for param in params:
+            param.levels = [0.0, 0.3, 0.6, 0.9]
+        function = Mock(side_effect=objective.objective)
+
+        for num_workers in [1, 4]:
+            function.reset_mock()
+            cache = EvaluationCache(maxsize=100)
+            optimizer = NevergradMultiOptimizer(
+                algorithms='RandomSearch',
+                budget=10,
+                upper_bounds=[10.0, 10.0],
+                num_workers=num_workers,
+                cache=cache
+            )
+
+            # Cached candidates are still reported back, but do not
+            # use up the budget
+            results = list(optimizer.optimize_function(
+                function, params, verbose_run=True))
+            self.assertEqual(10, function.call_count)
+            self.assertEqual(10, cache.misses)
+            self.assertEqual(10 + cache.hits, len(results))
+
+            # Unless requested
+            function.reset_mock()
+            cache.clear()
+            optimizer.cache_uses_budget = True
+            results = list(optimizer.optimize_function(
+                function, params, verbose_run=True))
+            self.assertEqual(10, len(results))
+            self.assertEqual(10 - cache.hits, function.call_count)
+
+        # Stop if the optimizer only asks for points already cached
+        optimizer = NevergradMultiOptimizer(
+            algorithms='RandomSearch',
+            budget=40,
+            upper_bounds=[10.0, 10.0],
+            cache=EvaluationCache(maxsize=100)
+        )
+        function.reset_mock()
+        list(optimizer.optimize_function(function, params))
+        self.assertLessEqual(function.call_count, 16)
+
+    def test_deduplicated_multi_optimizer(self):
+
+        # Grid with only 16 distinct points
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        for param in params:
+            param.levels = [0.0, 0.3, 0.6, 0.9]
+        running = []
+        evaluated = []
+
+        async def evaluate(mco_params):
+            point = tuple(mco_params)
+            self.assertNotIn(point, running)
+            running.append(point)
+            evaluated.append(point)
+            await asyncio.sleep(0.001)
+            running.remove(point)
+            return objective.objective(mco_params)
+
+        for policy in ["wait", "reask"]:
+            evaluated[:] = []
+            deduplicator = CandidateDeduplicator(policy=policy)
+            optimizer = NevergradMultiOptimizer(
+                algorithms='RandomSearch',
+                budget=30,
+                upper_bounds=[10.0, 10.0],
+                num_workers=4,
+                deduplicator=deduplicator
+            )
+            results = list(optimizer.optimize_function(
+                evaluate, params, verbose_run=True))
+
+            # No point is evaluated twice, neither while it is in
+            # flight nor afterwards
+            self.assertEqual(len(set(evaluated)), len(evaluated))
+            self.assertGreater(
+                deduplicator.n_waited + deduplicator.n_reasked, 0)
+            self.assertEqual(
+                deduplicator.n_suppressed,
+                optimizer.progress_metrics()["duplicate_candidates"])
+
+            # Duplicates do not use up the budget, and are all told
+            # and reported back
+            self.assertEqual(
+                len(evaluated), optimizer.statistics.n_evaluations)
+            self.assertEqual(
+                optimizer.statistics.n_told,
+                optimizer.statistics.n_evaluations
+                + deduplicator.n_suppressed)
+            self.assertEqual(optimizer.statistics.n_told, len(results))
+
+        # Points of the calibration sample are evaluated once
+        evaluated[:] = []
+        optimizer.upper_bounds = [None, None]
+        optimizer.bound_sample = 20
+        optimizer.budget = 20
+        results = list(optimizer.optimize_function(
+            evaluate, params, verbose_run=True))
+        self.assertEqual(20, len(results))
+        self.assertEqual(len(set(evaluated)), len(evaluated))
+        self.assertLessEqual(len(evaluated), 16)
+
+        # Without a deduplicator, nothing is suppressed
+        optimizer.deduplicator = None
+        list(optimizer.optimize_function(evaluate, params))
+        self.assertIsNone(
+            optimizer.progress_metrics()["duplicate_candidates"])
+
+    def test_in_flight_duplicates(self):
+
+        objective = TwoMinimaObjective()
+        optimizer = NevergradScalarOptimizer(num_workers=4)
+        ng_optimizer = optimizer.get_optimizer(objective.get_params())
+        a, b, c = [ng_optimizer.ask() for _ in range(3)]
+
+        async def evaluate(*args):
+            await asyncio.sleep(0.01)
+            return 1.0
+
+        for policy in ["wait", "reask"]:
+            optimizer.deduplicator = CandidateDeduplicator(policy=policy)
+            tell = Mock()
+            candidates = [a, a, a, a, b, c]
+            with patch.object(
+                    NevergradScalarOptimizer, '_ask',
+                    side_effect=lambda *args: [candidates.pop(0)]):
+                results = list(iterate_async(optimizer._ask_tell_async(
+                    ng_optimizer, evaluate, tell, 3)))
+
+            # Duplicates of a candidate in flight do not end the run
+            # early, and are told its result
+            self.assertEqual([], candidates)
+            self.assertEqual(6, len(results))
+            self.assertEqual(6, tell.call_count)
+            self.assertEqual(1, optimizer.deduplicator.n_waited
+                             + optimizer.deduplicator.n_reasked)
+
+    def test_stream_front(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        optimizer = NevergradMultiOptimizer(
+            budget=30,
+            upper_bounds=[10.0, 10.0],
+            stream_front=True
+        )
+
+        members = set()
+        optimizer.on_trait_change(
+            lambda archive: archive.on_trait_change(
+                lambda member: members.add(tuple(member[0])), 'added'),
+            'archive'
+        )
+
+        # Each new member of the Pareto front is yielded as it is found
+        results = list(optimizer.optimize_function(
+            objective.objective, params))
+        self.assertEqual(len(members), len(results))
+        self.assertGreaterEqual(len(results), len(optimizer.archive))
+
+        # The archive holds the final Pareto front
+        for point in optimizer.archive.pareto_front():
+            self.assertIn(list(point), results)
+
+    def test_hypervolume_multi_optimizer(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        optimizer = NevergradMultiOptimizer(
+            budget=30,
+            upper_bounds=[10.0, 10.0],
+            aggregate_loss="hypervolume"
+        )
+
+        with TemporaryDirectory() as tmp_dir:
+            optimizer.checkpoint = Checkpointer(
+                path=os.path.join(tmp_dir, 'run.checkpoint'))
+            front = list(optimizer.optimize_function(
+                objective.objective, params))
+
+            # The Pareto front is that of the hypervolume loss
+            self.assertCountEqual(
+                [list(point) for point in optimizer.archive.pareto_front()],
+                front
+            )
+
+            # And it is restored with the rest of the checkpoint
+            optimizer.resume = True
+            self.assertCountEqual(
+                front,
+                list(optimizer.optimize_function(
+                    objective.objective, params))
+            )
+
+    def test_flat_encoding(self):
+
+        for objective in [GridValleyObjective(), TwoMinimaObjective()]:
+            params = objective.get_params()
+
+            # The parameters are packed into a single array
+            optimizer = NevergradScalarOptimizer(budget=20, encoding="flat")
+            ng_optimizer = optimizer.get_optimizer(params)
+            self.assertEqual(1, len(ng_optimizer.parametrization.args))
+
+            # Points are reported as MCO parameter values
+            def total(mco_params):
+                return np.sum(objective.objective(mco_params))
+
+            costs = []
+            optimizer.cost_function = lambda point, value: (
+                costs.append(point) or 1.0)
+            results = list(optimizer.optimize_function(total, params))
+            self.assertGreater(len(results), 0)
+            self.assertEqual(20, len(costs))
+            for point in results + costs:
+                self.assertEqual(len(params), len(point))
+
+            optimizer = NevergradMultiOptimizer(
+                budget=20,
+                upper_bounds=[None, None],
+                encoding="flat",
+                cache=EvaluationCache()
+            )
+            front = list(optimizer.optimize_function(
+                objective.objective, params))
+            self.assertGreater(len(front), 0)
+            for point in front:
+                for value, param in zip(point, params):
+                    if hasattr(param, 'levels'):
+                        self.assertIn(value, param.levels)
+                    else:
+                        self.assertTrue(np.all(
+                            np.array(value) >= param.lower_bound))
+                        self.assertTrue(np.all(
+                            np.array(value) <= param.upper_bound))
+
+    def test_phase_timing(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        optimizer = NevergradMultiOptimizer(
+            budget=20,
+            bound_sample=15,
+            upper_bounds=[None, None],
+            aggregate_loss="hypervolume"
+        )
+
+        phase_timer.reset()
+        phase_timer.enabled = True
+        try:
+            list(optimizer.optimize_function(objective.objective, params))
+        finally:
+            phase_timer.enabled = False
+
+        phases = phase_timer.summary()["phases"]
+        # The calibration sample is evaluated and told, but not asked
+        self.assertEqual(5, phases["ask"]["count"])
+        for name in ["evaluate", "translate", "aggregate_loss", "tell"]:
+            self.assertEqual(20, phases[name]["count"])
+
+        # Nothing is recorded once disabled
+        list(optimizer.optimize_function(objective.objective, params))
+        self.assertEqual(phases, phase_timer.summary()["phases"])
+        phase_timer.reset()
+
+    def test_metrics_export(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        cache = EvaluationCache()
+
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metrics.jsonl')
+            optimizer = NevergradMultiOptimizer(
+                budget=20,
+                upper_bounds=[None, None],
+                aggregate_loss="hypervolume",
+                cache=cache,
+                metrics=MetricsExporter(path=path, every_seconds=0.0)
+            )
+            list(optimizer.optimize_function(objective.objective, params))
+
+            with open(path) as file:
+                records = [json.loads(line) for line in file]
+
+        # Exported before each candidate is asked, and at the end
+        self.assertEqual(0, records[0]["finished"])
+        final = records[-1]
+        self.assertEqual(1, final["finished"])
+        self.assertEqual(20, final["evaluations"])
+        self.assertEqual(len(optimizer.archive), final["pareto_size"])
+        self.assertGreater(final["hypervolume"], 0)
+        self.assertEqual(cache.hit_rate, final["cache_hit_rate"])
+        self.assertEqual(0, final["in_flight"])
+        self.assertEqual(0, final["seconds_to_budget"])
+
+        # The scalar optimizer has no Pareto front
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metrics.jsonl')
+            optimizer = NevergradScalarOptimizer(
+                budget=10,
+                metrics=MetricsExporter(path=path)
+            )
+            list(optimizer.optimize_function(
+                lambda p: sum(objective.objective(p)), params))
+
+            with open(path) as file:
+                records = [json.loads(line) for line in file]
+
+        self.assertEqual(10, records[-1]["evaluations"])
+        self.assertIsNone(records[-1]["hypervolume"])
+        self.assertIsNone(records[-1]["cache_hit_rate"])
+
+    def test_seconds_to_budget(self):
+        optimizer = NevergradScalarOptimizer(budget=100)
+        statistics = RunStatistics(start_time=time.time() - 10.0)
+        self.assertIsNone(optimizer._seconds_to_budget(statistics))
+
+        # 10 evaluations per second
+        statistics.n_evaluations = 100
+        self.assertEqual(0, optimizer._seconds_to_budget(statistics))
+        optimizer.budget = 200
+        self.assertAlmostEqual(
+            10.0, optimizer._seconds_to_budget(statistics), places=1)
+
+        # The time and cost budgets run out first
+        optimizer.time_budget = 15.0
+        self.assertAlmostEqual(
+            5.0, optimizer._seconds_to_budget(statistics), places=1)
+        optimizer.cost_budget = 3.0
+        statistics.total_cost = 2.0
+        self.assertAlmostEqual(
+            5.0, optimizer._seconds_to_budget(statistics), places=1)
+        statistics.total_cost = 2.5
+        self.assertAlmostEqual(
+            2.0, optimizer._seconds_to_budget(statistics), places=1)
+
+    def test_early_stopping(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+
+        # A constant objective never improves the Pareto front
+        for num_workers in [1, 4]:
+            function = Mock(return_value=np.array([1.0, 1.0]))
+            optimizer = NevergradMultiOptimizer(
+                budget=100,
+                upper_bounds=[10.0, 10.0],
+                num_workers=num_workers,
+                stopping=StoppingCriteria(pareto_window=10)
+            )
+
+            results = list(optimizer.optimize_function(
+                function, params, verbose_run=True))
+
+            # In-flight evaluations are completed and reported when
+            # the criterion is met, after the 11th evaluation
+            self.assertGreaterEqual(len(results), 11)
+            self.assertLessEqual(len(results), 10 + num_workers)
+            self.assertEqual(len(results), function.call_count)
+            self.assertIn("Pareto", optimizer.stopping.reason)
+
+        # The criteria are reset for each run
+        optimizer.num_workers = 1
+        results = list(optimizer.optimize_function(
+            function, params, verbose_run=True))
+        self.assertEqual(11, len(results))
+
+        # Stop once the target hypervolume is reached, which it is by
+        # the first point
+        optimizer = NevergradMultiOptimizer(
+            budget=100,
+            upper_bounds=[10.0, 10.0],
+            aggregate_loss="hypervolume",
+            stopping=StoppingCriteria(target_hypervolume=1.0)
+        )
+        front = list(optimizer.optimize_function(
+            objective.objective, params))
+        self.assertEqual(1, optimizer.statistics.n_evaluations)
+        self.assertEqual(1, len(front))
+
+        # Whatever the aggregate loss, the hypervolume is that of the
+        # Pareto front of the archive
+        optimizer.aggregate_loss = "nevergrad"
+        front = list(optimizer.optimize_function(
+            objective.objective, params))
+        self.assertEqual(1, optimizer.statistics.n_evaluations)
+        self.assertAlmostEqual(
+            hypervolume(optimizer.archive.losses(), [10.0, 10.0]),
+            optimizer.progress_metrics()["hypervolume"])
+
+    def test_time_and_cost_budgets(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+
+        def slow_objective(mco_params):
+            time.sleep(0.01)
+            return objective.objective(mco_params)
+
+        # Time budget, with evaluations in flight when it is used up
+        optimizer = NevergradMultiOptimizer(
+            budget=1000,
+            upper_bounds=[10.0, 10.0],
+            num_workers=4,
+            time_budget=0.2
+        )
+        results = list(optimizer.optimize_function(
+            slow_objective, params, verbose_run=True))
+        statistics = optimizer.statistics
+        self.assertLess(len(results), 100)
+        self.assertEqual(len(results), statistics.n_evaluations)
+        self.assertEqual(0, statistics.n_in_flight)
+        self.assertGreaterEqual(statistics.total_cost, 0.01 * len(results))
+
+        # Cost budget, with a cost for each evaluation
+        optimizer = NevergradMultiOptimizer(
+            budget=1000,
+            bound_sample=5,
+            upper_bounds=[None, 10.0],
+            cost_budget=20.0,
+            cost_function=lambda mco_params, value: 2.0
+        )
+        front = list(optimizer.optimize_function(
+            objective.objective, params))
+        self.assertEqual(10, optimizer.statistics.n_evaluations)
+        self.assertEqual(20.0, optimizer.statistics.total_cost)
+        self.assertGreater(len(front), 0)
+
+        # Scalar optimizer
+        optimizer = NevergradScalarOptimizer(
+            budget=1000,
+            cost_budget=20.0,
+            cost_function=lambda mco_params, value: 2.0
+        )
+        list(optimizer.optimize_function(objective.objective, params))
+        self.assertEqual(10, optimizer.statistics.n_evaluations)
+
+        optimizer = NevergradScalarOptimizer(budget=1000, time_budget=0.1)
+        list(optimizer.optimize_function(slow_objective, params))
+        self.assertLess(optimizer.statistics.n_evaluations, 20)
+
+        # Budgets cannot be negative
+        for name in ["time_budget", "cost_budget"]:
+            with self.assertRaises(TraitError):
+                setattr(optimizer, name, -1.0)
+
+    def test_record_cost(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+
+        # Costs go through the hook subclasses override, serially and
+        # concurrently
+        for num_workers in [1, 4]:
+            optimizer = NevergradScalarOptimizer(
+                budget=10, num_workers=num_workers)
+            with patch.object(NevergradScalarOptimizer, '_record_cost',
+                              autospec=True) as record_cost:
+                list(optimizer.optimize_function(
+                    objective.objective, params))
+            self.assertEqual(10, record_cost.call_count)
+            self.assertEqual(0.0, optimizer.statistics.total_cost)
+
+    def test_checkpoint_resume(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        function = Mock(side_effect=objective.objective)
+
+        with TemporaryDirectory() as tmp_dir:
+            checkpoint = Checkpointer(
+                path=os.path.join(tmp_dir, 'run.checkpoint'),
+                every_evaluations=5
+            )
+            optimizer = NevergradMultiOptimizer(
+                budget=20,
+                upper_bounds=[10.0, 10.0],
+                checkpoint=checkpoint
+            )
+
+            # Crash part way through the run
+            for index, _ in enumerate(optimizer.optimize_function(
+                    function, params, verbose_run=True)):
+                if index == 11:
+                    break
+            self.assertEqual(12, function.call_count)
+
+            # Resuming continues after the last checkpoint, using
+            # only the remaining budget
+            function.reset_mock()
+            optimizer.resume = True
+            results = list(optimizer.optimize_function(
+                function, params, verbose_run=True))
+            self.assertEqual(10, len(results))
+            self.assertEqual(10, function.call_count)
+            self.assertEqual(20, optimizer.statistics.n_evaluations)
+
+            # A completed run is checkpointed, and resuming it only
+            # reports the Pareto front
+            function.reset_mock()
+            front = list(optimizer.optimize_function(function, params))
+            self.assertGreater(len(front), 0)
+            function.assert_not_called()
+
+    def test_constrained_checkpoint_resume(self):
+
+        objective = TwoMinimaObjective()
+        params = objective.get_params()
+
+        with TemporaryDirectory() as tmp_dir:
+            optimizer = NevergradMultiOptimizer(
+                budget=20,
+                upper_bounds=[None, None],
+                constraints=[_negative_sum],
+                checkpoint=Checkpointer(
+                    path=os.path.join(tmp_dir, 'run.checkpoint'))
+            )
+            list(optimizer.optimize_function(objective.objective, params))
+            n_rejected = optimizer.progress_metrics()["rejected_candidates"]
+            self.assertGreater(n_rejected, 0)
+
+            # Resuming the completed run restores the constraints the
+            # optimizer checks, with their counts
+            optimizer.resume = True
+            list(optimizer.optimize_function(objective.objective, params))
+            self.assertEqual(
+                n_rejected,
+                optimizer.progress_metrics()["rejected_candidates"])
 
     def test_valid_upper_bounds(self):
         optimizer = NevergradMultiOptimizer()
@@ -190,25 +1099,105 @@ class TestNevergradOptimizer(TestCase):
 
     def test_estimate_upper_bounds(self):
         optimizer = NevergradMultiOptimizer()
-        ng_optimizer = optimizer.get_optimizer(self.params)
         optimizer.upper_bounds = [None, None, 10]
 
-        with patch.object(MultiobjectiveFunction,
-                          'compute_aggregate_loss') as mock_loss:
-            upper_bounds = optimizer._calculate_upper_bounds(
-                ng_optimizer, self.m_foo)
+        upper_bounds = optimizer._estimate_upper_bounds(
+            [[1, 0, 3], [0, 2, 1]])
+        self.assertListEqual([1, 2, 10], upper_bounds)
 
-            self.assertListEqual([1, 2, 10], upper_bounds)
-            mock_loss.assert_not_called()
+    def test_get_calibration_sample(self):
+        optimizer = NevergradMultiOptimizer(bound_sample=5)
+        ng_optimizer = optimizer.get_optimizer(self.params)
+
+        # Distinct candidates, that have not been asked for
+        sample = optimizer.get_calibration_sample(ng_optimizer, self.params)
+        self.assertEqual(5, len(sample))
+        self.assertEqual(0, ng_optimizer.num_ask)
+        self.assertEqual(
+            5, len({tuple(x.get_standardized_data(
+                reference=ng_optimizer.parametrization)) for x in sample})
+        )
+
+        # Which can be told to the optimizer
+        for x in sample:
+            ng_optimizer.tell(x, 1.0)
+        self.assertEqual(5, ng_optimizer.num_tell)
 
-        optimizer.bound_sample = 5
-        with patch(ASK_TELL_PATH) as mock_func:
-            mock_func.return_value = (
-                MockPoint(args=[0, 1], kwargs={}), 1)
+        # The sample never exceeds the budget
+        optimizer.budget = 3
+        self.assertEqual(
+            3, len(optimizer.get_calibration_sample(
+                ng_optimizer, self.params)))
 
-            optimizer._calculate_upper_bounds(
-                ng_optimizer, self.m_foo)
-            self.assertEqual(5, mock_func.call_count)
+    def test_constrained_calibration_sample(self):
+        params = TwoMinimaObjective().get_params()
+        optimizer = NevergradMultiOptimizer(
+            bound_sample=20, constraints=[_negative_sum])
+        optimizer._reset_constraints()
+        ng_optimizer = optimizer.get_optimizer(params)
+
+        # Infeasible points are replaced by others, never by repeats
+        sample = optimizer.get_calibration_sample(ng_optimizer, params)
+        self.assertEqual(20, len(sample))
+        self.assertEqual(
+            20, len({tuple(x.get_standardized_data(
+                reference=ng_optimizer.parametrization)) for x in sample})
+        )
+        for x in sample:
+            self.assertTrue(_negative_sum(x.args))
+
+        # A sample without any feasible point is an error
+        optimizer = NevergradMultiOptimizer(
+            bound_sample=5, constraints=[lambda mco_values: False])
+        optimizer._reset_constraints()
+        ng_optimizer = optimizer.get_optimizer(params)
+        with self.assertRaisesRegex(ValueError, "calibration points"):
+            optimizer.get_calibration_sample(ng_optimizer, params)
+
+    def test_calibration_uses_budget(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        function = Mock(side_effect=objective.objective)
+        optimizer = NevergradMultiOptimizer(
+            budget=20,
+            bound_sample=6,
+            upper_bounds=[None, 10.0]
+        )
+
+        # The calibration sample is reported along with the other
+        # evaluated points, and counts towards the budget
+        results = list(optimizer.optimize_function(
+            function, params, verbose_run=True))
+        self.assertEqual(20, len(results))
+        self.assertEqual(20, function.call_count)
+        self.assertEqual(20, optimizer.statistics.n_told)
+        self.assertEqual(20, optimizer.archive.n_points)
+
+    def test_online_bounds(self):
+
+        objective = GridValleyObjective()
+        params = objective.get_params()
+        function = Mock(side_effect=objective.objective)
+        optimizer = NevergradMultiOptimizer(
+            budget=20,
+            upper_bounds=[None, None],
+            bound_estimation="online"
+        )
+
+        with patch.object(NevergradMultiOptimizer,
+                          'get_calibration_sample') as mock_sample:
+            front = list(optimizer.optimize_function(function, params))
+            mock_sample.assert_not_called()
+
+        # No calibration phase: the whole budget is spent optimizing
+        self.assertEqual(20, function.call_count)
+        self.assertEqual(20, optimizer.statistics.n_told)
+        self.assertGreater(len(front), 0)
+        self.assertCountEqual(
+            [list(point) for point in optimizer.archive.pareto_front()],
+            front
+        )
 
     def test_get_optimizer(self):
 
@@ -221,6 +1210,10 @@ class TestNevergradOptimizer(TestCase):
         ng_optimizer = optimizer.get_optimizer(self.params)
         self.assertIsInstance(ng_optimizer, Optimizer)
 
+        optimizer.num_workers = 4
+        ng_optimizer = optimizer.get_optimizer(self.params)
+        self.assertEqual(4, ng_optimizer.num_workers)
+
     def test_get_multiobjective_function(self):
 
         # optimizer
@@ -233,6 +1226,18 @@ class TestNevergradOptimizer(TestCase):
             is_scalar=False
         )
 
-        # get multi-objective function object
+        # get multi-objective function object, by default the
+        # hypervolume loss, which requires upper bounds
+        multi_objective = optimizer.get_multiobjective_function(
+            ng_func, [1.0, 1.0])
+        self.assertIsInstance(multi_objective, HypervolumeLoss)
+        with self.assertRaises(ValueError):
+            optimizer.get_multiobjective_function(ng_func)
+
+        optimizer.aggregate_loss = "nevergrad"
         multi_objective = optimizer.get_multiobjective_function(ng_func)
         self.assertIsInstance(multi_objective, MultiobjectiveFunction)
+
+        optimizer.bound_estimation = "online"
+        multi_objective = optimizer.get_multiobjective_function(ng_func)
+        self.assertIsInstance(multi_objective, OnlineHypervolumeLoss)
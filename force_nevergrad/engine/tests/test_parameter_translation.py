@@ -6,10 +6,16 @@ from types import MethodType
 import numpy as np
 
 from ..parameter_translation import (
+    ARRAY_SLOT,
+    CheapConstraint,
     get_attribute,
     duck_type_param,
+    FlatEncoding,
+    MIXED_SLOT,
     translate_mco_to_ng,
     translate_ng_to_mco,
+    translation_plan,
+    VALUE_SLOT
 )
 
 from nevergrad import p as ngp
@@ -35,6 +41,42 @@ class TestParameterTranslation(TestCase):
     def setUp(self):
         pass
 
+    def get_params(self):
+        return [
+            FixedMCOParameter(
+                factory=None,
+                value=1.0
+            ),  # ... 1
+            RangedMCOParameter(
+                factory=None,
+                initial_value=1.0
+            ),  # ... 1
+            RangedVectorMCOParameter(
+                factory=None,
+                initial_value=[1.0 for i in range(10)]
+            ),  # ... 10
+            ListedMCOParameter(
+                factory=None,
+                levels=[i for i in range(10)]
+            ),  # ... 1
+            CategoricalMCOParameter(
+                factory=None,
+                categories=['a', 'b', 'c', 'd']
+            ),  # ... 1
+            Mock(**{'set': ['no', 'good', 'foo']}),
+            # ... 1
+            Mock(**{'levels': ['a', 'b', 'c']}),
+            # ... 1
+            Mock(**{'x0': 0.0}),
+            # ... 1
+            Mock(**{'x0': np.zeros((5,))}),
+            # ... 5
+            Mock(**{'value': np.zeros((3, 3))}),
+            # ... 9
+            86  # counts as "some other object"
+            #                           # ... 1
+        ]
+
     def test_get_attribute(self):
 
         duck = Mock(**{
@@ -79,40 +121,7 @@ class TestParameterTranslation(TestCase):
 
     def test_translate(self):
 
-        params = [
-            FixedMCOParameter(
-                factory=None,
-                value=1.0
-            ),  # ... 1
-            RangedMCOParameter(
-                factory=None,
-                initial_value=1.0
-            ),  # ... 1
-            RangedVectorMCOParameter(
-                factory=None,
-                initial_value=[1.0 for i in range(10)]
-            ),  # ... 10
-            ListedMCOParameter(
-                factory=None,
-                levels=[i for i in range(10)]
-            ),  # ... 1
-            CategoricalMCOParameter(
-                factory=None,
-                categories=['a', 'b', 'c', 'd']
-            ),  # ... 1
-            Mock(**{'set': ['no', 'good', 'foo']}),
-            # ... 1
-            Mock(**{'levels': ['a', 'b', 'c']}),
-            # ... 1
-            Mock(**{'x0': 0.0}),
-            # ... 1
-            Mock(**{'x0': np.zeros((5,))}),
-            # ... 5
-            Mock(**{'value': np.zeros((3, 3))}),
-            # ... 9
-            86  # counts as "some other object"
-            #                           # ... 1
-        ]
+        params = self.get_params()
 
         # translate to nevergrad instrumentation
         instrumentation = translate_mco_to_ng(params)
@@ -138,3 +147,123 @@ class TestParameterTranslation(TestCase):
 
         # is the non-recognisable parameter set to null constant?
         self.assertEqual(mco_values[10], 'null')
+
+    def test_translation_plan(self):
+
+        params = self.get_params()
+        instrumentation = translate_mco_to_ng(params)
+
+        plan = translation_plan(params)
+        self.assertEqual(
+            (VALUE_SLOT, VALUE_SLOT, ARRAY_SLOT, VALUE_SLOT, VALUE_SLOT,
+             VALUE_SLOT, VALUE_SLOT, VALUE_SLOT, ARRAY_SLOT, ARRAY_SLOT,
+             VALUE_SLOT),
+            plan.signature
+        )
+
+        # The plan translates values like translate_ng_to_mco
+        for _ in range(5):
+            ng_values = instrumentation.spawn_child().args
+            self.assertEqual(
+                translate_ng_to_mco(ng_values), plan.to_mco(ng_values))
+
+        # And is shared by parameters with the same signature
+        self.assertIs(plan, translation_plan(self.get_params()))
+
+    def test_translation_plan_mixed(self):
+
+        params = [
+            FixedMCOParameter(factory=None, value=1.0),
+            Mock(**{'choices': [np.zeros(2), 1.0]}),
+            Mock(**{'value': np.zeros(2)}),
+        ]
+        plan = translation_plan(params)
+        self.assertEqual(
+            (VALUE_SLOT, MIXED_SLOT, ARRAY_SLOT), plan.signature)
+        self.assertEqual(
+            [1.0, [0.0, 0.0], [1.0, 2.0]],
+            plan.to_mco((1.0, np.zeros(2), np.array([1.0, 2.0])))
+        )
+        self.assertEqual(
+            [1.0, 1.0, [1.0, 2.0]],
+            plan.to_mco((1.0, 1.0, np.array([1.0, 2.0])))
+        )
+
+    def test_flat_encoding(self):
+
+        params = self.get_params()
+        params[1].lower_bound = 0.0
+        params[1].upper_bound = 2.0
+        encoding = FlatEncoding(params)
+
+        # The ranged, ranged vector and listed parameters are packed
+        # into the array, followed by the other parameters
+        self.assertEqual(12, encoding.dimension)
+        instrumentation = encoding.parametrization()
+        self.assertEqual(9, len(instrumentation.args))
+        self.assertEqual((12,), instrumentation.args[0].shape)
+
+        # The initial values decode to those of the parameters, and
+        # the middle level of the listed parameter
+        mco_values = encoding.to_mco(instrumentation.value[0])
+        self.assertEqual(11, len(mco_values))
+        self.assertEqual(1.0, mco_values[0])
+        self.assertAlmostEqual(1.0, mco_values[1])
+        self.assertIsInstance(mco_values[2], list)
+        self.assertEqual(10, len(mco_values[2]))
+        self.assertEqual(5, mco_values[3])
+        self.assertEqual(np.zeros((3, 3)).tolist(), mco_values[9])
+
+        # Values decode within the parameter ranges and levels
+        for _ in range(20):
+            child = instrumentation.spawn_child()
+            child.mutate()
+            mco_values = encoding.to_mco(child.args)
+            self.assertTrue(0.0 <= mco_values[1] <= 2.0)
+            self.assertIn(mco_values[3], params[3].levels)
+            self.assertIn(mco_values[4], params[4].categories)
+
+        # The bounds of the unit array decode to the range ends and
+        # the first and last levels
+        ng_values = list(instrumentation.value[0])
+        ng_values[0] = np.zeros(12)
+        mco_values = encoding.to_mco(ng_values)
+        self.assertEqual(0.0, mco_values[1])
+        self.assertEqual(0, mco_values[3])
+        ng_values[0] = np.ones(12)
+        mco_values = encoding.to_mco(ng_values)
+        self.assertEqual(2.0, mco_values[1])
+        self.assertEqual(9, mco_values[3])
+
+    def test_constraints(self):
+
+        params = [
+            RangedMCOParameter(
+                factory=None, lower_bound=0.0, upper_bound=1.0,
+                initial_value=0.5),
+            ListedMCOParameter(factory=None, levels=[0, 1, 2]),
+        ]
+
+        def below_diagonal(mco_values):
+            return mco_values[0] <= mco_values[1] / 2
+
+        # Constraints are checked on the MCO parameter values of each
+        # candidate, counting those they reject
+        np.random.seed(0)
+        for constraint, instrumentation in [
+                (CheapConstraint(function=below_diagonal),
+                 translate_mco_to_ng),
+                (CheapConstraint(function=below_diagonal),
+                 lambda params, constraints: FlatEncoding(
+                     params).parametrization(constraints=constraints))]:
+            parametrization = instrumentation(params, constraints=[
+                constraint, below_diagonal])
+            for _ in range(20):
+                child = parametrization.spawn_child()
+                child.mutate()
+                mco_values = constraint.translation.to_mco(child.args)
+                self.assertEqual(
+                    below_diagonal(mco_values), child.satisfies_constraints())
+            self.assertEqual(20, constraint.n_checked)
+            self.assertGreater(constraint.n_rejected, 0)
+            self.assertLess(constraint.n_rejected, 20)
@@ -0,0 +1,142 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import pickle
+from unittest import TestCase
+
+import numpy as np
+
+from force_nevergrad.engine.pareto_archive import ParetoArchive
+
+
+def brute_force_front(points):
+    """Indices of the non-dominated points, keeping the first of any
+    duplicates"""
+    front = []
+    for i, point in enumerate(points):
+        if not any(
+                np.all(other <= point) and (np.any(other < point) or j < i)
+                for j, other in enumerate(points)):
+            front.append(i)
+    return front
+
+
+class TestParetoArchive(TestCase):
+
+    def test_add_2d(self):
+
+        archive = ParetoArchive()
+
+        self.assertTrue(archive.add('a', [1.0, 3.0]))
+        self.assertTrue(archive.add('b', [3.0, 1.0]))
+        self.assertTrue(archive.add('c', [2.0, 2.0]))
+
+        # dominated and duplicate points
+        self.assertFalse(archive.add('d', [2.0, 2.5]))
+        self.assertFalse(archive.add('e', [2.0, 2.0]))
+
+        # dominates both 'c' and 'b'
+        self.assertTrue(archive.add('f', [1.5, 0.5]))
+
+        self.assertListEqual(['a', 'f'], archive.pareto_front())
+        np.testing.assert_array_equal(
+            [[1.0, 3.0], [1.5, 0.5]], archive.losses())
+        self.assertEqual(6, archive.n_points)
+
+    def test_add_nd(self):
+
+        archive = ParetoArchive()
+
+        self.assertTrue(archive.add('a', [1.0, 2.0, 3.0]))
+        self.assertTrue(archive.add('b', [3.0, 2.0, 1.0]))
+        self.assertFalse(archive.add('c', [3.0, 2.0, 3.0]))
+        self.assertTrue(archive.add('d', [0.5, 2.0, 3.0]))
+
+        self.assertListEqual(['b', 'd'], archive.pareto_front())
+        self.assertEqual(2, len(archive))
+
+        # Single objective
+        archive = ParetoArchive()
+        archive.add('a', 2.0)
+        archive.add('b', 1.0)
+        archive.add('c', 3.0)
+        self.assertListEqual(['b'], archive.pareto_front())
+
+        with self.assertRaises(ValueError):
+            archive.add('d', [1.0, 2.0])
+
+    def test_pickle(self):
+
+        for losses in [[[1.0, 3.0], [3.0, 1.0], [2.0, 2.0]],
+                       [[1.0, 2.0, 3.0], [3.0, 2.0, 1.0]]]:
+            archive = ParetoArchive()
+            for index, value in enumerate(losses):
+                archive.add(index, value)
+
+            restored = pickle.loads(pickle.dumps(archive))
+            self.assertListEqual(
+                archive.pareto_front(), restored.pareto_front())
+            np.testing.assert_array_equal(
+                archive.losses(), restored.losses())
+            self.assertEqual(archive.n_points, restored.n_points)
+
+            # The restored archive keeps maintaining the front
+            self.assertTrue(restored.add('a', [0.5] * len(losses[0])))
+            self.assertListEqual(['a'], restored.pareto_front())
+            self.assertFalse(restored.add('b', losses[0]))
+
+        # Empty archive
+        restored = pickle.loads(pickle.dumps(ParetoArchive()))
+        self.assertEqual(0, len(restored))
+        self.assertTrue(restored.add('a', [1.0, 1.0]))
+
+    def test_brute_force(self):
+
+        random = np.random.RandomState(0)
+        for n_objectives in [1, 2, 3, 4]:
+            for _ in range(10):
+                # Integer losses give many ties and duplicates
+                points = random.randint(
+                    0, 6, size=(60, n_objectives)).astype(float)
+                archive = ParetoArchive()
+                for index, point in enumerate(points):
+                    archive.add(index, point)
+
+                self.assertListEqual(
+                    brute_force_front(points),
+                    sorted(archive.pareto_front())
+                )
+
+    def test_events(self):
+
+        archive = ParetoArchive()
+        members = set()
+
+        def added(member):
+            members.add(member[0])
+
+        def removed(member):
+            members.remove(member[0])
+
+        archive.on_trait_change(added, 'added')
+        archive.on_trait_change(removed, 'removed')
+
+        random = np.random.RandomState(1)
+        for n_objectives in [2, 3]:
+            members.clear()
+            archive = ParetoArchive()
+            archive.on_trait_change(added, 'added')
+            archive.on_trait_change(removed, 'removed')
+            for index, point in enumerate(
+                    random.rand(200, n_objectives)):
+                archive.add(index, point)
+
+            self.assertSetEqual(set(archive.pareto_front()), members)
+
+    def test_upper_bounds(self):
+
+        archive = ParetoArchive(upper_bounds=np.array([2.0, 2.0]))
+        self.assertFalse(archive.add('a', [0.0, 3.0]))
+        self.assertTrue(archive.add('b', [1.0, 2.0]))
+        self.assertListEqual(['b'], archive.pareto_front())
+        self.assertEqual(2, archive.n_points)
@@ -0,0 +1,92 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from unittest import TestCase
+
+from force_nevergrad.engine.phase_timer import (
+    PhaseHistogram,
+    PhaseTimer
+)
+
+
+class TestPhaseHistogram(TestCase):
+
+    def test_add(self):
+        histogram = PhaseHistogram(name="ask")
+        for duration in [0.001, 0.002, 0.004, 0.1]:
+            histogram.add(duration)
+
+        summary = histogram.summary()
+        self.assertEqual(4, summary["count"])
+        self.assertAlmostEqual(0.107, summary["total"])
+        self.assertAlmostEqual(0.02675, summary["mean"])
+        self.assertEqual(0.001, summary["min"])
+        self.assertEqual(0.1, summary["max"])
+        self.assertEqual(4, histogram.bins.sum())
+
+        # Quantiles are the upper edges of their bins, which are
+        # within a factor of two of the durations
+        self.assertLessEqual(0.002, summary["p50"])
+        self.assertLess(summary["p50"], 0.004)
+        self.assertEqual(0.1, summary["p99"])
+
+    def test_extreme_durations(self):
+        histogram = PhaseHistogram()
+        histogram.add(0.0)
+        histogram.add(1e6)
+        self.assertEqual(1, histogram.bins[0])
+        self.assertEqual(1, histogram.bins[-1])
+
+    def test_empty(self):
+        summary = PhaseHistogram().summary()
+        self.assertEqual(0, summary["count"])
+        self.assertEqual(0.0, summary["mean"])
+        self.assertEqual(0.0, summary["min"])
+        self.assertEqual(0.0, summary["p90"])
+
+
+class TestPhaseTimer(TestCase):
+
+    def setUp(self):
+        self.timer = PhaseTimer()
+
+    def test_disabled(self):
+        with self.timer.phase("ask"):
+            pass
+        self.timer.record("tell", 1.0)
+        self.timer.count("cache_hits")
+        self.assertEqual(
+            {"phases": {}, "counters": {}}, self.timer.summary())
+
+    def test_enabled(self):
+        self.timer.enabled = True
+        for _ in range(3):
+            with self.timer.phase("ask"):
+                pass
+        self.timer.record("tell", 1.0)
+        self.timer.count("cache_hits")
+        self.timer.count("cache_hits", 2)
+
+        summary = self.timer.summary()
+        self.assertEqual(3, summary["phases"]["ask"]["count"])
+        self.assertEqual(1.0, summary["phases"]["tell"]["total"])
+        self.assertEqual({"cache_hits": 3}, summary["counters"])
+
+        # Phases are listed by decreasing total duration
+        lines = self.timer.format_summary().splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertTrue(lines[1].startswith("tell"))
+        self.assertTrue(lines[2].startswith("ask"))
+        self.assertTrue(lines[3].startswith("cache_hits"))
+
+        self.timer.reset()
+        self.assertEqual(
+            {"phases": {}, "counters": {}}, self.timer.summary())
+
+    def test_phase_exception(self):
+        self.timer.enabled = True
+        with self.assertRaises(ValueError):
+            with self.timer.phase("evaluate"):
+                raise ValueError
+        self.assertEqual(
+            1, self.timer.summary()["phases"]["evaluate"]["count"])
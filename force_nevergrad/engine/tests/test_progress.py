@@ -0,0 +1,69 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import logging
+import time
+from unittest import TestCase
+
+from force_nevergrad.engine.progress import (
+    install_screen_handler,
+    PLUGIN_LOGGER,
+    ProgressReporter
+)
+from force_nevergrad.engine.run_statistics import RunStatistics
+
+PROGRESS_LOGGER = "force_nevergrad.engine.progress"
+
+
+class TestProgressReporter(TestCase):
+
+    def setUp(self):
+        self.statistics = RunStatistics()
+
+    def report(self, reporter, n_evaluations, budget=100):
+        """ Updates the reporter after each of n_evaluations evaluations,
+        returning the evaluations that were reported"""
+        reported = []
+        for _ in range(n_evaluations):
+            self.statistics.n_evaluations += 1
+            if reporter.update(self.statistics, budget):
+                reported.append(self.statistics.n_evaluations)
+        return reported
+
+    def test_every_evaluations(self):
+        reporter = ProgressReporter(every_evaluations=10, every_seconds=0)
+        with self.assertLogs(PROGRESS_LOGGER, level="INFO") as logs:
+            reported = self.report(reporter, 25)
+        self.assertEqual([10, 20], reported)
+        self.assertIn("Evaluated 10 / 100 points", logs.output[0])
+
+    def test_every_seconds(self):
+        reporter = ProgressReporter(every_evaluations=1, every_seconds=60)
+        self.assertEqual([1], self.report(reporter, 25))
+
+        # Reports are due again once enough time has passed
+        reporter._last_time = time.time() - 60
+        self.assertEqual([26], self.report(reporter, 5))
+
+    def test_last_evaluation(self):
+        reporter = ProgressReporter(every_evaluations=7, every_seconds=60)
+        self.assertEqual([7, 10], self.report(reporter, 10, budget=10))
+
+        reporter.reset()
+        self.statistics = RunStatistics()
+        self.assertEqual([7, 10], self.report(reporter, 10, budget=10))
+
+
+class TestInstallScreenHandler(TestCase):
+
+    def test_install_once(self):
+        logger = logging.getLogger(PLUGIN_LOGGER)
+        n_handlers = len(logger.handlers)
+
+        handler = install_screen_handler()
+        self.addCleanup(logger.removeHandler, handler)
+        self.assertIn(handler, logger.handlers)
+        self.assertEqual(n_handlers + 1, len(logger.handlers))
+
+        self.assertIs(handler, install_screen_handler())
+        self.assertEqual(n_handlers + 1, len(logger.handlers))
@@ -0,0 +1,36 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+import time
+from unittest import TestCase
+
+from force_nevergrad.engine.run_statistics import RunStatistics
+
+
+class TestRunStatistics(TestCase):
+
+    def test_evaluations_per_second(self):
+        statistics = RunStatistics(
+            n_evaluations=10, start_time=time.time() - 5.0)
+        self.assertAlmostEqual(2.0, statistics.evaluations_per_second,
+                               places=1)
+
+    def test_start_time(self):
+        start_time = time.time()
+        statistics = RunStatistics()
+        time.sleep(0.01)
+        self.assertGreaterEqual(statistics.start_time, start_time)
+        self.assertGreaterEqual(statistics.elapsed_time, 0.01)
+
+    def test_exhausted_budget(self):
+        statistics = RunStatistics(start_time=time.time() - 5.0)
+
+        # Disabled budgets
+        self.assertEqual("", statistics.exhausted_budget())
+
+        self.assertEqual("", statistics.exhausted_budget(time_budget=10.0))
+        self.assertIn("time", statistics.exhausted_budget(time_budget=4.0))
+
+        statistics.total_cost = 3.0
+        self.assertEqual("", statistics.exhausted_budget(cost_budget=4.0))
+        self.assertIn("cost", statistics.exhausted_budget(cost_budget=3.0))
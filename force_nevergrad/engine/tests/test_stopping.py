@@ -0,0 +1,50 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from unittest import TestCase
+
+from force_nevergrad.engine.stopping import StoppingCriteria
+
+
+class TestStoppingCriteria(TestCase):
+
+    def test_disabled(self):
+        stopping = StoppingCriteria()
+        for _ in range(100):
+            self.assertFalse(stopping.update(0.0, False))
+        self.assertEqual("", stopping.reason)
+
+    def test_hypervolume_window(self):
+        stopping = StoppingCriteria(
+            hypervolume_window=3,
+            hypervolume_tolerance=0.1
+        )
+
+        self.assertFalse(stopping.update(1.0, True))
+        self.assertFalse(stopping.update(1.05, True))
+        self.assertFalse(stopping.update(1.2, True))
+        self.assertFalse(stopping.update(1.2, False))
+        self.assertFalse(stopping.update(1.25, True))
+        self.assertTrue(stopping.update(1.3, True))
+        self.assertIn("hypervolume", stopping.reason)
+
+        stopping.reset()
+        self.assertEqual("", stopping.reason)
+        self.assertFalse(stopping.update(1.0, True))
+
+    def test_pareto_window(self):
+        stopping = StoppingCriteria(pareto_window=2)
+
+        self.assertFalse(stopping.update(1.0, True))
+        self.assertFalse(stopping.update(1.0, False))
+        self.assertFalse(stopping.update(1.5, True))
+        self.assertFalse(stopping.update(1.5, False))
+        self.assertTrue(stopping.update(1.5, False))
+        self.assertIn("Pareto", stopping.reason)
+
+    def test_target_hypervolume(self):
+        stopping = StoppingCriteria(target_hypervolume=2.0)
+
+        self.assertFalse(stopping.update(1.0, True))
+        self.assertTrue(stopping.update(2.0, True))
+        self.assertIn("target", stopping.reason)
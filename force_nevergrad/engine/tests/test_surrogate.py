@@ -0,0 +1,115 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from unittest import TestCase
+
+import numpy as np
+
+from force_nevergrad.engine.surrogate import (
+    BaseSurrogate,
+    GaussianProcessSurrogate,
+    RBFSurrogate,
+    SURROGATES
+)
+
+
+def _quadratic(x):
+    return np.array([np.sum(x ** 2), np.sum((x - 1.0) ** 2)])
+
+
+class TestSurrogate(TestCase):
+
+    def setUp(self):
+        self.points = np.array([
+            [0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [1.0, 1.0],
+            [0.5, 0.5], [0.2, 0.8], [0.8, 0.2], [0.4, 0.1]
+        ])
+
+    def add_points(self, surrogate, points):
+        for x in points:
+            surrogate.add(x, _quadratic(x))
+
+    def test_surrogates(self):
+        self.assertIs(RBFSurrogate, SURROGATES["rbf"])
+        self.assertIs(GaussianProcessSurrogate, SURROGATES["gp"])
+
+    def test_base_surrogate(self):
+        # Subclasses must implement the fit and predictions
+        with self.assertRaises(TypeError):
+            BaseSurrogate(min_points=1)
+
+    def test_is_ready(self):
+        surrogate = RBFSurrogate(min_points=4)
+        self.assertFalse(surrogate.is_ready())
+        self.add_points(surrogate, self.points[:3])
+        self.assertEqual(3, surrogate.n_points)
+        self.assertFalse(surrogate.is_ready())
+        self.add_points(surrogate, self.points[3:4])
+        self.assertTrue(surrogate.is_ready())
+
+    def test_predict(self):
+        for surrogate_class in [RBFSurrogate, GaussianProcessSurrogate]:
+            surrogate = surrogate_class(min_points=4)
+            self.add_points(surrogate, self.points[:4])
+            mean, std = surrogate.predict(self.points)
+            self.assertEqual((8, 2), mean.shape)
+            self.assertEqual((8, 2), std.shape)
+            self.assertTrue(np.all(std >= 0))
+
+            # Evaluated points are interpolated, with little uncertainty
+            expected = np.array([_quadratic(x) for x in self.points[:4]])
+            np.testing.assert_allclose(expected, mean[:4], atol=1e-2)
+            np.testing.assert_allclose(0.0, std[:4], atol=0.1)
+
+            # Other points are less certain
+            self.assertTrue(np.all(std[4] > std[0]))
+
+    def test_incremental_update(self):
+        surrogate = RBFSurrogate(min_points=4)
+        self.add_points(surrogate, self.points[:4])
+        surrogate.predict(self.points)
+        self.assertEqual(1, surrogate.n_fits)
+
+        # Points added since the last prediction are fitted at once,
+        # by updating the model until their number doubles
+        self.add_points(surrogate, self.points[4:7])
+        updated_mean, _ = surrogate.predict(self.points)
+        self.assertEqual(2, surrogate.n_fits)
+        self.assertEqual(4, surrogate._n_refitted)
+
+        refitted = RBFSurrogate(min_points=4)
+        self.add_points(refitted, self.points[:7])
+        mean, _ = refitted.predict(self.points)
+        self.assertEqual(7, refitted._n_refitted)
+        np.testing.assert_allclose(mean[:7], updated_mean[:7], atol=1e-2)
+
+        self.add_points(surrogate, self.points[7:])
+        surrogate.predict(self.points)
+        self.assertEqual(8, surrogate._n_refitted)
+
+    def test_max_points(self):
+        surrogate = RBFSurrogate(min_points=4, max_points=6)
+        self.add_points(surrogate, self.points)
+        surrogate.predict(self.points[:1])
+
+        # Only the most recent half of the points are kept
+        self.assertEqual(3, surrogate.n_points)
+        np.testing.assert_array_equal(self.points[5:], surrogate._x)
+
+    def test_statistics(self):
+        surrogate = GaussianProcessSurrogate(min_points=4)
+        self.add_points(surrogate, self.points[:4])
+        surrogate.predict(self.points)
+        statistics = surrogate.statistics()
+        self.assertEqual(4, statistics["points"])
+        self.assertEqual(1, statistics["fits"])
+        self.assertEqual(8, statistics["predictions"])
+        self.assertGreater(statistics["fit_time"], 0)
+        self.assertGreater(statistics["predict_time"], 0)
+
+        surrogate.reset()
+        statistics = surrogate.statistics()
+        self.assertEqual(0, statistics["points"])
+        self.assertEqual(0, statistics["fits"])
+        self.assertEqual(0.0, statistics["fit_time"])
+        self.assertFalse(surrogate.is_ready())
@@ -0,0 +1,35 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from traits.api import Any, HasStrictTraits, Instance, provides
+
+from force_bdss.api import IEvaluator
+
+from force_nevergrad.engine.broker import TaskBroker
+
+
+@provides(IEvaluator)
+class BrokerEvaluator(HasStrictTraits):
+    """ Wraps an evaluator, sending each point to the workers of a
+    TaskBroker to evaluate rather than calling it. The workers evaluate
+    the same workflow, either from the workflow file on other nodes,
+    or from the wrapped evaluator itself in local worker processes.
+    """
+
+    #: The wrapped evaluator
+    evaluator = Any()
+
+    #: The broker distributing points to the workers
+    broker = Instance(TaskBroker)
+
+    @property
+    def mco_model(self):
+        return self.evaluator.mco_model
+
+    def evaluate(self, parameter_values):
+        return self.broker.evaluate(parameter_values)
+
+    async def evaluate_async(self, parameter_values):
+        """ Coroutine counterpart of evaluate, awaiting the KPIs of the
+        point while other points are evaluated by other workers"""
+        return await self.broker.evaluate_async(parameter_values)
@@ -0,0 +1,252 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Worker evaluating the points of a NevergradMCO run distributed by
+its broker (see the broker_address model option), on any node with
+access to the workflow file of the run:
+
+    python -m force_nevergrad.mco.broker_worker head-node:5555 \\
+        workflow.json --processes 4
+
+Each point is evaluated by the command-line evaluation of force_bdss,
+which reads the point from stdin and writes its KPIs to stdout through
+the NevergradMCOCommunicator. With --stream, each worker instead keeps a
+single evaluation process alive, serving its points in the streaming
+mode of the communicator, by default with force_nevergrad_serve.
+
+The connection to the broker is neither authenticated nor encrypted:
+workers must only connect to brokers on a trusted network.
+"""
+
+from concurrent.futures import Future
+import argparse
+import itertools
+import logging
+import multiprocessing
+import shlex
+import subprocess
+import sys
+import threading
+
+from traits.api import Any, Bool, Dict, File, HasStrictTraits, List, Str
+
+from force_nevergrad.engine.broker import run_worker
+
+log = logging.getLogger(__name__)
+
+#: Default command evaluating a point of a workflow file
+EVALUATE_COMMAND = "force_bdss --evaluate"
+
+#: Default command serving the points of a workflow file in the
+#: streaming mode
+SERVE_COMMAND = "force_nevergrad_serve"
+
+
+class SubprocessEvaluator(HasStrictTraits):
+    """ Evaluates points of a workflow file with the command-line
+    evaluation of force_bdss, in a new process for each point, or in a
+    single warm process serving all of them in the streaming mode of the
+    NevergradMCOCommunicator.
+
+    In the streaming mode, points are sent with a request ID, and their
+    replies are matched by it, so that the evaluator can be shared by
+    threads, and the process may reply out of order. The process is
+    started on the first evaluation, and again if it exits.
+
+    Notes
+    -----
+    Points are written as a single line of comma-separated values, so
+    RangedVectorMCOParameter values are not supported.
+    """
+
+    #: Path of the workflow file
+    workflow_file = File()
+
+    #: Command evaluating a point of the workflow file, given as its
+    #: last argument (by default, EVALUATE_COMMAND, or SERVE_COMMAND in
+    #: the streaming mode)
+    command = List(Str)
+
+    #: Whether or not the command serves points in the streaming mode,
+    #: in a process kept alive between them
+    streaming = Bool(False)
+
+    #: Evaluation process of the streaming mode
+    _process = Any(transient=True)
+
+    #: Lock of the streaming process and its requests
+    _lock = Any(transient=True)
+
+    #: Replies awaited from the streaming process, by request ID
+    _requests = Dict(transient=True)
+
+    #: Source of the request IDs
+    _request_ids = Any(transient=True)
+
+    def __init__(self, **traits):
+        super(SubprocessEvaluator, self).__init__(**traits)
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+
+    def __setstate__(self, state):
+        # The streaming process and its lock are not pickled, so that
+        # the evaluator can be sent to worker processes, which start
+        # their own
+        super(SubprocessEvaluator, self).__setstate__(state)
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+
+    def _command_default(self):
+        if self.streaming:
+            return shlex.split(SERVE_COMMAND)
+        return shlex.split(EVALUATE_COMMAND)
+
+    def evaluate(self, parameter_values):
+        """ Returns the KPI values of a list of MCO parameter values
+
+        Raises
+        ------
+        subprocess.CalledProcessError
+            If the evaluation fails in its own process
+        RuntimeError
+            If the evaluation fails in the streaming process, or is
+            replied to with an error line
+        """
+        if self.streaming:
+            return self._request(parameter_values).result()
+
+        process = subprocess.run(
+            self.command + [self.workflow_file],
+            input=",".join(str(value) for value in parameter_values) + "\n",
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True
+        )
+        lines = [line for line in process.stdout.splitlines() if line]
+        fields = lines[-1].split("\t")
+        if fields[0] == "error":
+            # A single point served by the streaming mode, without a
+            # request ID
+            raise RuntimeError(
+                "Evaluation failed: {}".format("\t".join(fields[1:])))
+        return [float(value) for value in fields]
+
+    def close(self):
+        """ Ends the streaming process, once it has replied to the
+        requests sent to it"""
+        with self._lock:
+            process = self._process
+            self._process = None
+        if process is not None:
+            process.stdin.close()
+            process.wait()
+
+    def _request(self, parameter_values):
+        """ Sends a point to the streaming process, starting it if needed,
+        and returns the Future of its KPI values"""
+        future = Future()
+        with self._lock:
+            if self._process is None:
+                self._process = subprocess.Popen(
+                    self.command + [self.workflow_file],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    universal_newlines=True,
+                    bufsize=1
+                )
+                threading.Thread(
+                    target=self._read_replies, args=(self._process,),
+                    daemon=True).start()
+            request_id = "#{}".format(next(self._request_ids))
+            self._requests[request_id] = future
+            try:
+                self._process.stdin.write("{},{}\n".format(
+                    request_id,
+                    ",".join(str(value) for value in parameter_values)))
+                self._process.stdin.flush()
+            except OSError as error:
+                self._requests.pop(request_id, None)
+                raise RuntimeError(
+                    "Evaluation process is not running") from error
+        return future
+
+    def _read_replies(self, process):
+        """ Completes the Future of each request the streaming process
+        replies to, failing those left when it exits"""
+        for line in process.stdout:
+            fields = line.rstrip("\n").split("\t")
+            with self._lock:
+                future = self._requests.pop(fields[0], None)
+            if future is None:
+                continue
+            if fields[1:2] == ["error"]:
+                future.set_exception(RuntimeError(
+                    "Evaluation failed: {}".format("\t".join(fields[2:]))))
+            else:
+                future.set_result([float(value) for value in fields[1:]])
+
+        process.wait()
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            requests = self._requests
+            self._requests = {}
+        for future in requests.values():
+            future.set_exception(RuntimeError(
+                "Evaluation process exited with code {}".format(
+                    process.returncode)))
+
+
+def main(argv=None):
+    """ Starts the worker processes, and waits until the broker shuts
+    them down"""
+    parser = argparse.ArgumentParser(
+        description="Evaluates the points of a distributed NevergradMCO "
+                    "run.")
+    parser.add_argument(
+        "address", help="Address of the broker, as host:port")
+    parser.add_argument(
+        "workflow_file", help="Workflow file of the run")
+    parser.add_argument(
+        "--processes", type=int, default=1,
+        help="Number of worker processes")
+    parser.add_argument(
+        "--heartbeat-interval", type=float, default=5.0,
+        help="Seconds between heartbeats, shorter than the heartbeat "
+             "timeout of the broker")
+    parser.add_argument(
+        "--command",
+        help="Command evaluating a point of the workflow file (by "
+             "default, {!r}, or {!r} with --stream)".format(
+                 EVALUATE_COMMAND, SERVE_COMMAND))
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Whether or not the command serves points in the streaming "
+             "mode of NevergradMCOCommunicator, in a process kept alive "
+             "by each worker")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    evaluator = SubprocessEvaluator(
+        workflow_file=args.workflow_file,
+        streaming=args.stream
+    )
+    if args.command is not None:
+        evaluator.command = shlex.split(args.command)
+    processes = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(args.address, evaluator.evaluate),
+            kwargs=dict(heartbeat_interval=args.heartbeat_interval)
+        )
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
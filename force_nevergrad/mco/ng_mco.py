@@ -1,17 +1,41 @@
 #  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
 #  All rights reserved.
 
+import asyncio
+import hashlib
+import json
 import logging
-import sys
+import pickle
+import time
 
 from force_bdss.api import BaseMCO, DataValue
 
 from force_bdss.mco.optimizer_engines.aposteriori_optimizer_engine import (
     AposterioriOptimizerEngine
 )
+from force_nevergrad.engine.broker import TaskBroker
+from force_nevergrad.engine.checkpoint import Checkpointer
+from force_nevergrad.engine.deduplication import CandidateDeduplicator
+from force_nevergrad.engine.evaluation_cache import EvaluationCache
+from force_nevergrad.engine.evaluation_store import EvaluationStore
+from force_nevergrad.engine.metrics import MetricsExporter
+from force_nevergrad.engine.multi_fidelity import (
+    NevergradMultiFidelityOptimizer
+)
 from force_nevergrad.engine.nevergrad_optimizers import (
-    NevergradMultiOptimizer
+    NevergradMultiOptimizer,
+    NevergradScalarOptimizer,
+    iterate_async
+)
+from force_nevergrad.engine.phase_timer import phase_timer
+from force_nevergrad.engine.progress import (
+    install_screen_handler,
+    ProgressReporter
 )
+from force_nevergrad.engine.stopping import StoppingCriteria
+from force_nevergrad.engine.surrogate import SURROGATES
+from force_nevergrad.mco.broker_evaluator import BrokerEvaluator
+from force_nevergrad.mco.stored_evaluator import StoredEvaluator
 
 log = logging.getLogger(__name__)
 
@@ -48,6 +72,34 @@ class NevergradOptimizerEngine(AposterioriOptimizerEngine):
             value if kpi.use_bounds else None
             for kpi, value in zip(self.kpis, score_upper_bounds)]
 
+    def __getstate__(self):
+        """Returns the state of the engine to pickle, without the
+        optimizer, so that _score can be sent to the processes of a
+        process executor along with the evaluator and KPIs alone
+        """
+        state = super(NevergradOptimizerEngine, self).__getstate__()
+        state.pop("optimizer", None)
+        return state
+
+    async def _score_async(self, input_point):
+        """Coroutine counterpart of _score, awaiting the evaluate_async
+        coroutine of the single point evaluator
+        """
+        score = await self.single_point_evaluator.evaluate_async(
+            input_point)
+        return self._minimization_score(score)
+
+    async def optimize_async(self, verbose_run=False):
+        """Asynchronous counterpart of optimize, yielding each point
+        returned by the optimizer along with its KPI values.
+        """
+        async for point in self.optimizer.optimize_function_async(
+                self._score_async,
+                self.parameters,
+                verbose_run=verbose_run):
+            kpis = await self.single_point_evaluator.evaluate_async(point)
+            yield point, kpis
+
 
 class NevergradMCO(BaseMCO):
     """ Base Nevergrad MCO class to run gradient-free global optimization.
@@ -55,11 +107,66 @@ class NevergradMCO(BaseMCO):
     The `run` method will perform ".optimize" operation using the
     Nevergrad OptimizerEngine. User should overload this method and
     implement / extend it for custom MCO run.
+
+    If the evaluator provides an `evaluate_async` coroutine method,
+    the optimization is driven asynchronously, awaiting up to
+    `num_workers` evaluations concurrently in a single event loop.
+
+    If the model's `profile_phases` is set, the phases of the
+    optimization loop are timed by the shared `phase_timer`, whose
+    summary is logged when the run ends and remains available until
+    the next profiled run.
+
+    If the model's `broker_address` is set, points are evaluated by
+    distributed workers connected to a TaskBroker for the duration of
+    the run, either started on other nodes with the workflow file (see
+    `force_nevergrad.mco.broker_worker`), or on this machine. The
+    broker does not authenticate its workers, so its address must be
+    on a trusted interface only.
     """
 
     def run(self, evaluator):
         model = evaluator.mco_model
 
+        if not model.broker_address:
+            self._run(evaluator)
+            return
+
+        broker = TaskBroker(
+            address=model.broker_address,
+            heartbeat_timeout=model.broker_heartbeat_timeout,
+            max_attempts=model.broker_max_attempts,
+            worker_timeout=model.broker_worker_timeout,
+            local_workers=model.broker_local_workers,
+            local_function=evaluator.evaluate
+        )
+        broker.start()
+        try:
+            self._run(BrokerEvaluator(evaluator=evaluator, broker=broker))
+        finally:
+            broker.close()
+
+    def _run(self, evaluator):
+        """Optimizes the workflow of the evaluator, notifying its model
+        of the progress"""
+        model = evaluator.mco_model
+
+        evaluate_async = getattr(evaluator, "evaluate_async", None)
+        use_async = asyncio.iscoroutinefunction(evaluate_async)
+
+        # Look up previously evaluated points in a persistent store,
+        # if requested
+        if model.store_path:
+            evaluator = StoredEvaluator(
+                evaluator=evaluator,
+                store=EvaluationStore(
+                    model.store_path,
+                    namespace=_store_namespace(model),
+                    n_kpis=len(model.kpis),
+                    tolerance=model.cache_tolerance
+                )
+            )
+
         engine = NevergradOptimizerEngine(
             kpis=model.kpis,
             parameters=model.parameters,
@@ -67,30 +174,287 @@ class NevergradMCO(BaseMCO):
             verbose_run=model.verbose_run
         )
 
+        # Points are scored in other processes by the process executor,
+        # which must be able to send the evaluator there
+        if (model.executor_type == "process" and model.num_workers > 1
+                and not use_async):
+            _check_picklable(
+                engine._score,
+                "The process executor requires a picklable evaluator, "
+                "but pickling it failed ({!r}). Use the thread executor "
+                "instead.")
+
         # Transform the KPI upper bounds values using the
         # score function
         upper_bounds = engine.score_upper_bounds()
 
-        # Assign optimizer with KPI score upper bounds
-        engine.optimizer = NevergradMultiOptimizer(
+        # Memoize evaluations of repeated points, if requested
+        if model.cache_size > 0:
+            cache = EvaluationCache(
+                maxsize=model.cache_size,
+                tolerance=model.cache_tolerance
+            )
+        else:
+            cache = None
+
+        # Suppress duplicate candidates, if requested
+        if model.duplicate_policy != "evaluate":
+            deduplicator = CandidateDeduplicator(
+                policy=model.duplicate_policy,
+                recent_size=model.duplicate_memory
+            )
+        else:
+            deduplicator = None
+
+        # The fidelity parameter is only screened over by the
+        # multi-objective optimizer
+        if model.objective_mode == "single" and model.fidelity_parameter:
+            raise ValueError(
+                "A fidelity parameter is only supported by "
+                "multi-objective optimizations")
+
+        # Periodically save the optimization state, if requested
+        if model.checkpoint_path and (model.objective_mode == "single"
+                                      or model.fidelity_parameter):
+            raise ValueError(
+                "Checkpointing is only supported by multi-objective "
+                "optimizations without a fidelity parameter")
+        if model.checkpoint_path:
+            # The constraints are saved with the optimizer, so must not
+            # fail the first checkpoint after evaluations were spent
+            _check_picklable(
+                model.constraints,
+                "Checkpointing requires picklable constraints, but "
+                "pickling them failed ({!r}). Use module-level functions "
+                "rather than lambdas or closures.")
+            checkpoint = Checkpointer(
+                path=model.checkpoint_path,
+                every_evaluations=model.checkpoint_every,
+                every_seconds=model.checkpoint_interval
+            )
+        else:
+            checkpoint = None
+
+        # Stop early on convergence, if requested
+        if (model.stop_hypervolume_window or model.stop_pareto_window
+                or model.stop_target_hypervolume):
+            stopping = StoppingCriteria(
+                hypervolume_window=model.stop_hypervolume_window,
+                hypervolume_tolerance=model.stop_hypervolume_tolerance,
+                pareto_window=model.stop_pareto_window,
+                target_hypervolume=model.stop_target_hypervolume
+            )
+        else:
+            stopping = None
+
+        # Periodically export the progress metrics, if requested
+        if model.metrics_path:
+            metrics = MetricsExporter(
+                path=model.metrics_path,
+                format=model.metrics_format,
+                every_seconds=model.metrics_interval
+            )
+        else:
+            metrics = None
+
+        # Pre-screen candidates with a surrogate model, if requested
+        if model.surrogate != "none":
+            surrogate = SURROGATES[model.surrogate]()
+        else:
+            surrogate = None
+
+        optimizer_traits = dict(
             algorithms=model.algorithms,
             budget=model.budget,
-            bound_sample=model.bound_sample,
-            upper_bounds=upper_bounds
+            time_budget=model.time_budget,
+            cost_budget=model.cost_budget,
+            num_workers=model.num_workers,
+            executor_type=model.executor_type,
+            encoding=model.encoding,
+            constraints=model.constraints,
+            surrogate=surrogate,
+            screening_ratio=model.screening_ratio,
+            exploration=model.exploration,
+            cache=cache,
+            cache_uses_budget=model.cache_uses_budget,
+            deduplicator=deduplicator,
+            metrics=metrics,
+            progress=ProgressReporter(
+                every_evaluations=model.progress_every,
+                every_seconds=model.progress_interval
+            )
         )
 
-        formatter = logging.Formatter(
-            fmt='%(asctime)s %(levelname)-8s %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S')
-        screen_handler = logging.StreamHandler(stream=sys.stdout)
-        screen_handler.setFormatter(formatter)
-        log.addHandler(screen_handler)
-
-        for index, (optimal_point, optimal_kpis) \
-                in enumerate(engine.optimize(verbose_run=model.verbose_run)):
-            # When there is new data, this operation informs the system that
-            # new data has been received. It must be a dictionary as given.
-            model.notify_progress_event(
-                [DataValue(value=v) for v in optimal_point],
-                [DataValue(value=v) for v in optimal_kpis],
+        if model.objective_mode == "single":
+            # Minimize the sum of the KPI scores
+            engine.optimizer = NevergradScalarOptimizer(**optimizer_traits)
+        elif model.fidelity_parameter:
+            # Screen candidates at low fidelity, promoting only the best
+            # to full fidelity
+            engine.optimizer = NevergradMultiFidelityOptimizer(
+                fidelity_index=_parameter_index(
+                    model.parameters, model.fidelity_parameter),
+                schedule=model.fidelity_schedule,
+                eta=model.fidelity_eta,
+                n_rungs=model.fidelity_rungs,
+                bound_sample=model.bound_sample,
+                bound_estimation=model.bound_estimation,
+                upper_bounds=upper_bounds,
+                aggregate_loss=model.aggregate_loss,
+                stream_front=model.stream_front,
+                stopping=stopping,
+                **optimizer_traits
             )
+        else:
+            # Assign optimizer with KPI score upper bounds
+            engine.optimizer = NevergradMultiOptimizer(
+                bound_sample=model.bound_sample,
+                bound_estimation=model.bound_estimation,
+                upper_bounds=upper_bounds,
+                aggregate_loss=model.aggregate_loss,
+                stream_front=model.stream_front,
+                checkpoint=checkpoint,
+                resume=model.resume,
+                stopping=stopping,
+                **optimizer_traits
+            )
+
+        # Members of a streamed Pareto front that are later dominated
+        # are reported by the archive of the optimizer
+        removed = None
+        if (model.stream_front and not model.verbose_run
+                and model.objective_mode != "single"):
+            removed = []
+            engine.optimizer.on_trait_change(
+                lambda member: removed.append(member[0]),
+                "archive:removed"
+            )
+
+        install_screen_handler()
+
+        if use_async:
+            results = iterate_async(
+                engine.optimize_async(verbose_run=model.verbose_run))
+        else:
+            results = engine.optimize(verbose_run=model.verbose_run)
+
+        profiling = model.profile_phases and not phase_timer.enabled
+        if profiling:
+            phase_timer.reset()
+            phase_timer.enabled = True
+
+        try:
+            with phase_timer.phase("run"):
+                self._notify_results(model, results, removed)
+        finally:
+            if profiling:
+                phase_timer.enabled = False
+                log.info("Optimization phase timings:\n{}".format(
+                    phase_timer.format_summary()))
+
+    def _notify_results(self, model, results, removed=None):
+        """Notifies the progress of the run for each optimal point and
+        its KPIs as they are found, in batches of notify_batch_size
+        points, or fewer if notify_interval has passed since the last
+        batch.
+
+        If a list is given to collect the points removed from a
+        streamed Pareto front, the whole current front is notified
+        again as soon as a point already reported is removed. The
+        front is then made of the points of the last such
+        notification, and those reported after it."""
+        front = []
+        batch = []
+        last_time = time.time()
+        for optimal_point, optimal_kpis in results:
+            if removed:
+                # Points are yielded as the same objects the archive
+                # holds, which may contain arrays, so compare identities
+                members = [
+                    member for member in front
+                    if not any(member[0] is point for point in removed)
+                ]
+                if len(members) < len(front):
+                    front = members
+                    batch = list(front)
+                del removed[:]
+            if removed is not None:
+                front.append((optimal_point, optimal_kpis))
+
+            batch.append((optimal_point, optimal_kpis))
+            if len(batch) < model.notify_batch_size and not (
+                    0 < model.notify_interval
+                    <= time.time() - last_time):
+                continue
+            self._notify_batch(model, batch)
+            batch = []
+            last_time = time.time()
+
+        self._notify_batch(model, batch)
+
+    def _notify_batch(self, model, batch):
+        """Notifies the progress of the run for a batch of optimal
+        points and their KPIs"""
+        with phase_timer.phase("notify_progress_event"):
+            for optimal_point, optimal_kpis in batch:
+                # When there is new data, this operation informs the
+                # system that new data has been received. It must be a
+                # dictionary as given.
+                model.notify_progress_event(
+                    [DataValue(value=v) for v in optimal_point],
+                    [DataValue(value=v) for v in optimal_kpis],
+                )
+
+
+def _check_picklable(value, message):
+    """Checks that a value, such as the score function of an engine
+    with the evaluator it calls, can be pickled before the run starts
+
+    Parameters
+    ----------
+    value: object
+        The value to pickle
+    message: str
+        Message of the error, formatted with the pickling error
+
+    Raises
+    ------
+    ValueError
+        If the value cannot be pickled
+    """
+    try:
+        pickle.dumps(value)
+    except Exception as error:
+        raise ValueError(message.format(error)) from error
+
+
+def _store_namespace(model):
+    """Returns the namespace of the evaluations of the model in an
+    EvaluationStore: its store_namespace if set, or else one derived
+    from the names and types of its parameters and KPIs, so that
+    different studies sharing a store do not read each other's KPIs
+    """
+    if model.store_namespace:
+        return model.store_namespace
+
+    signature = json.dumps([
+        [[type(parameter).__name__, parameter.name, parameter.type]
+         for parameter in model.parameters],
+        [[kpi.name, kpi.objective] for kpi in model.kpis]
+    ])
+    return "auto-" + hashlib.sha1(signature.encode()).hexdigest()[:16]
+
+
+def _parameter_index(parameters, name):
+    """Returns the index of the MCO parameter with the given name
+
+    Raises
+    ------
+    ValueError
+        If none of the parameters has the name
+    """
+    for index, parameter in enumerate(parameters):
+        if parameter.name == name:
+            return index
+    raise ValueError(
+        "No MCO parameter is named {!r}".format(name))
@@ -1,8 +1,10 @@
 #  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
 #  All rights reserved.
 
+from concurrent.futures import ThreadPoolExecutor, wait
 import sys
 import re
+import threading
 
 from force_bdss.api import (
     BaseMCOCommunicator,
@@ -35,6 +37,18 @@ class NevergradMCOCommunicator(BaseMCOCommunicator):
     When running outside the shell and its environment, prefix force-bdss
     with: edm run -e environment-name --
 
+    Evaluate points in a loop, in a single process kept alive between
+    them, through the streaming mode of `serve`. It evaluates the point
+    on each input line until the end of the input, and flushes a line of
+    KPIs for each. An input line may start with a request ID, as in
+    "#7,1.0,-1.0", in which case its KPI line starts with the same ID, as
+    in "#7\t0.5\t2.0", or "#7\terror\t<message>" if the evaluation
+    fails. With several workers, points with a request ID are evaluated
+    concurrently and replied to as they complete, out of order. The
+    force_nevergrad_serve command serves the points of a workflow file:
+
+    echo "#7,1.0,-1.0" | force_nevergrad_serve gaussian.json
+
     Notes
     -----
     Evaluate a single point in parameter space, from stdin, and return the KPIs
@@ -44,6 +58,9 @@ class NevergradMCOCommunicator(BaseMCOCommunicator):
     points as stdin and waits for KPIs to return as stdout.
     2) Write a bash pipe that iterates through sets of single points and
     processes the output accordingly.
+    3) Write a driver that keeps a process serving points in the streaming
+    mode (see `force_nevergrad.mco.broker_worker.SubprocessEvaluator`), to
+    save the cost of starting Python and loading the workflow per point.
     """
 
     def receive_from_mco(self, model):
@@ -53,7 +70,12 @@ class NevergradMCOCommunicator(BaseMCOCommunicator):
         # Can be tab or comma delimited.
         line = sys.stdin.readline()
         data = re.split(r'[,\s]+', line)
+        return self._parse_inputs(model, data)
 
+    def _parse_inputs(self, model, data):
+        """ Returns the DataValues of the model parameters, from a list of
+        strings given for each, in order.
+        """
         # Get the parameter values based on parameterization and stdin
         inputs = []
         for i, param in enumerate(model.parameters):
@@ -86,3 +108,70 @@ class NevergradMCOCommunicator(BaseMCOCommunicator):
         # tab-delimited output
         data = "\t".join([str(dv.value) for dv in kpi_results]) + '\n'
         sys.stdout.write(data)
+
+    def serve(self, evaluator, stdin=None, stdout=None, max_workers=1):
+        """ Evaluates the point on each line of the input in turn, until
+        the end of the input, writing and flushing a line of KPIs for each.
+
+        Parameters
+        ----------
+        evaluator: IEvaluator
+            The workflow evaluating the points, with an mco_model
+        stdin: file, optional
+            The input, sys.stdin by default
+        stdout: file, optional
+            The output, sys.stdout by default
+        max_workers: int, optional
+            The largest number of points with a request ID evaluated
+            concurrently, in threads. Other points are evaluated in this
+            thread, once all points before them have been replied to.
+
+        Return
+        ------
+        int
+            The number of points evaluated
+        """
+        stdin = sys.stdin if stdin is None else stdin
+        stdout = sys.stdout if stdout is None else stdout
+        model = evaluator.mco_model
+        lock = threading.Lock()
+
+        def reply(request_id, fields):
+            if request_id is not None:
+                fields = [request_id] + fields
+            with lock:
+                stdout.write("\t".join(fields) + "\n")
+                stdout.flush()
+
+        def evaluate(request_id, data):
+            try:
+                inputs = self._parse_inputs(model, data)
+                kpis = evaluator.evaluate([dv.value for dv in inputs])
+            except Exception as error:
+                message = " ".join(repr(error).split())
+                reply(request_id, ["error", message])
+            else:
+                reply(request_id, [str(value) for value in kpis])
+
+        n_evaluated = 0
+        pending = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for line in iter(stdin.readline, ""):
+                line = line.strip()
+                if not line:
+                    continue
+                data = re.split(r'[,\s]+', line)
+                n_evaluated += 1
+                request_id = None
+                if data[0].startswith("#"):
+                    request_id, data = data[0], data[1:]
+                if request_id is not None and max_workers > 1:
+                    pending = {
+                        future for future in pending if not future.done()}
+                    pending.add(executor.submit(evaluate, request_id, data))
+                else:
+                    wait(pending)
+                    pending = set()
+                    evaluate(request_id, data)
+
+        return n_evaluated
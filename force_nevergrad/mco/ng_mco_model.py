@@ -1,12 +1,25 @@
 #  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
 #  All rights reserved.
 
-from traits.api import Enum, Bool
+from traits.api import (
+    Bool,
+    Callable,
+    Enum,
+    File,
+    Float,
+    List,
+    Range,
+    Str
+)
 from traitsui.api import View, Item, Group, VFold
 
 from force_bdss.api import BaseMCOModel, PositiveInt
 
-from force_nevergrad.engine.nevergrad_optimizers import ALGORITHMS_KEYS
+from force_nevergrad.engine.nevergrad_optimizers import (
+    AGGREGATE_LOSSES,
+    ALGORITHMS_KEYS,
+    EXECUTOR_TYPES
+)
 
 
 class NevergradMCOModel(BaseMCOModel):
@@ -16,31 +29,345 @@ class NevergradMCOModel(BaseMCOModel):
     #: Algorithms available to work with
     algorithms = Enum(*ALGORITHMS_KEYS)
 
+    #: Optimize the KPIs for a Pareto front ("multi"), or minimize the
+    #: sum of their scores for a single optimal point ("single")
+    objective_mode = Enum("multi", "single")
+
     #: Defines the allowed number of objective calls
     budget = PositiveInt(100)
 
+    #: Seconds the optimization may last (0 disables)
+    time_budget = Range(0.0, None, 0.0)
+
+    #: Accumulated seconds of workflow evaluation time the optimization
+    #: may use, across all concurrent evaluations (0 disables)
+    cost_budget = Range(0.0, None, 0.0)
+
     #: Defines the sample size to estimate the KPI upper bounds
     bound_sample = PositiveInt(15)
 
+    #: Estimate the KPI upper bounds from a sample evaluated up front,
+    #: or from the running KPI values during the optimization
+    bound_estimation = Enum("sample", "online")
+
+    #: Aggregate loss the multi-objective optimization is based on
+    aggregate_loss = Enum(*AGGREGATE_LOSSES)
+
     #: Display the generated points at runtime
     verbose_run = Bool(True)
 
+    #: Report members of the Pareto front as soon as they are found,
+    #: when not displaying all generated points. Whenever a reported
+    #: member is dominated by a new one, the whole current front is
+    #: reported again.
+    stream_front = Bool(False)
+
+    #: Stop after this many evaluations without a significant increase
+    #: in the hypervolume of the Pareto front (0 disables)
+    stop_hypervolume_window = Range(0, None, 0)
+
+    #: Relative hypervolume increase considered significant
+    stop_hypervolume_tolerance = Float(0.0)
+
+    #: Stop after this many evaluations without a new member of the
+    #: Pareto front (0 disables)
+    stop_pareto_window = Range(0, None, 0)
+
+    #: Stop once the hypervolume of the Pareto front reaches this
+    #: value (0 disables)
+    stop_target_hypervolume = Float(0.0)
+
+    #: Number of workflow evaluations performed concurrently
+    num_workers = PositiveInt(1)
+
+    #: Type of executor used for concurrent evaluations. Process
+    #: executors require an evaluator that can be pickled, and sent to
+    #: the processes along with each point: evaluators that fail to
+    #: pickle, for instance because they hold open files, sockets or
+    #: locks, are rejected when the run starts.
+    executor_type = Enum(*EXECUTOR_TYPES)
+
+    #: Address on which to listen for distributed workers, as
+    #: "host:port", which then evaluate the workflow instead of this
+    #: process, up to num_workers at once (empty evaluates locally).
+    #: Workers are not authenticated, so the address must be on a
+    #: trusted interface only, such as 127.0.0.1 or a private cluster
+    #: network.
+    broker_address = Str()
+
+    #: Number of distributed workers started on this machine
+    broker_local_workers = Range(0, None, 0)
+
+    #: Seconds without a heartbeat after which a distributed worker is
+    #: considered lost, and its point evaluated by another
+    broker_heartbeat_timeout = Float(30.0)
+
+    #: Number of distributed workers a point is sent to, as they are
+    #: lost, before its evaluation fails
+    broker_max_attempts = Range(1, None, 3)
+
+    #: Seconds points wait for a distributed worker while none is
+    #: connected, after which their evaluation fails (0 waits forever)
+    broker_worker_timeout = Range(0.0, None, 300.0)
+
+    #: Encoding of the MCO parameters: separate nevergrad parameters,
+    #: or continuous and ordinal dimensions packed into a single array
+    encoding = Enum("separate", "flat")
+
+    #: Constraints on the MCO parameter values: functions of a list of
+    #: values, returning whether or not they are feasible. Infeasible
+    #: candidates are rejected by the optimizer without evaluating the
+    #: workflow.
+    constraints = List(Callable, transient=True)
+
+    #: Surrogate model used to pre-screen candidates before they are
+    #: evaluated ("none" evaluates every candidate)
+    surrogate = Enum("none", "rbf", "gp")
+
+    #: Number of candidates screened by the surrogate model for each
+    #: candidate evaluated
+    screening_ratio = PositiveInt(10)
+
+    #: Weight of the uncertainty of the surrogate predictions in the
+    #: screening: 0 selects the candidates predicted to be best, and
+    #: larger values increasingly favour the most uncertain
+    exploration = Range(0.0, None, 1.0)
+
+    #: Name of the MCO parameter setting the fidelity of the workflow,
+    #: which is not optimized, but raised by successive halving (an
+    #: empty name disables). Only supported in multi-objective mode.
+    fidelity_parameter = Str()
+
+    #: Schedule of the successive halving brackets
+    fidelity_schedule = Enum("successive_halving", "hyperband")
+
+    #: Ratio of the candidates evaluated at each fidelity to those
+    #: promoted to the next
+    fidelity_eta = Range(2, None, 3)
+
+    #: Largest number of fidelities the fidelity parameter takes
+    fidelity_rungs = PositiveInt(3)
+
+    #: Maximum number of evaluations held in the memoization cache
+    #: (0 disables the cache)
+    cache_size = Range(0, None, 0)
+
+    #: Tolerance within which numerical parameter values are
+    #: considered equal by the memoization cache
+    cache_tolerance = Float(0.0)
+
+    #: Whether or not cached evaluations count towards the budget
+    cache_uses_budget = Bool(False)
+
+    #: What happens to candidates with the same parameter values as one
+    #: being evaluated: evaluated again, or told its result once it
+    #: completes, waiting for it before asking for other candidates, or
+    #: not. Unless evaluated again, those with the same values as a
+    #: recent evaluation are not evaluated.
+    duplicate_policy = Enum("evaluate", "wait", "reask")
+
+    #: Number of recent evaluations remembered to suppress duplicates
+    duplicate_memory = Range(0, None, 256)
+
+    #: Path of an SQLite file storing evaluations across runs
+    #: (an empty path disables the store)
+    store_path = File()
+
+    #: Name under which evaluations of this study are stored (an empty
+    #: name is derived from the names and types of the parameters and
+    #: KPIs)
+    store_namespace = Str()
+
+    #: Path of the file the optimization state is checkpointed to
+    #: (an empty path disables checkpointing)
+    checkpoint_path = File()
+
+    #: Number of evaluations between checkpoints (0 disables)
+    checkpoint_every = Range(0, None, 0)
+
+    #: Number of seconds between checkpoints (0 disables)
+    checkpoint_interval = Float(0.0)
+
+    #: Resume the optimization from the last checkpoint, if any
+    resume = Bool(False)
+
+    #: Time each phase of the optimization loop, and log a summary
+    #: when the run ends
+    profile_phases = Bool(False)
+
+    #: Path of a file the progress metrics of the run are written to
+    #: (an empty path disables the export)
+    metrics_path = File()
+
+    #: Format of the metrics file: appended lines of JSON, or a
+    #: Prometheus textfile
+    metrics_format = Enum("jsonl", "prometheus")
+
+    #: Number of seconds between metrics exports
+    metrics_interval = Float(10.0)
+
+    #: Least number of evaluations between progress log messages
+    progress_every = Range(1, None, 1)
+
+    #: Least number of seconds between progress log messages
+    progress_interval = Float(5.0)
+
+    #: Number of points reported together by notify_progress_event,
+    #: which groups the events of verbose runs
+    notify_batch_size = Range(1, None, 1)
+
+    #: Number of seconds after which a partial batch of points is
+    #: reported anyway (0 waits for a full batch)
+    notify_interval = Float(0.0)
+
     def _algorithms_default(self):
         return "TwoPointsDE"
 
     def default_traits_view(self):
         return View(
             Item("algorithms"),
+            Item("objective_mode",
+                 label="Objective mode"),
             Item("budget",
                  label="Allowed number of objective calls"),
+            Item("time_budget",
+                 label="Allowed run time (s)"),
+            Item("cost_budget",
+                 label="Allowed evaluation time (s)"),
             VFold(
                 Group(
                     Item("bound_sample",
                          label="Sample size for upper bound estimation",
                          visible_when='advanced'),
+                    Item("bound_estimation",
+                         label="Upper bound estimation",
+                         visible_when='advanced'),
+                    Item("aggregate_loss",
+                         label="Aggregate loss",
+                         visible_when='advanced'),
                     Item("verbose_run",
                          label="Report all calculated points?",
                          visible_when='advanced'),
+                    Item("stream_front",
+                         label="Report Pareto front as it is found?",
+                         visible_when='advanced'),
+                    Item("stop_hypervolume_window",
+                         label="Stop after evaluations without "
+                               "hypervolume increase",
+                         visible_when='advanced'),
+                    Item("stop_hypervolume_tolerance",
+                         label="Relative hypervolume increase tolerance",
+                         visible_when='advanced'),
+                    Item("stop_pareto_window",
+                         label="Stop after evaluations without new "
+                               "Pareto members",
+                         visible_when='advanced'),
+                    Item("stop_target_hypervolume",
+                         label="Stop at target hypervolume",
+                         visible_when='advanced'),
+                    Item("num_workers",
+                         label="Number of concurrent evaluations",
+                         visible_when='advanced'),
+                    Item("executor_type",
+                         label="Concurrent executor type",
+                         visible_when='advanced'),
+                    Item("broker_address",
+                         label="Distributed broker address",
+                         visible_when='advanced'),
+                    Item("broker_local_workers",
+                         label="Local distributed workers",
+                         visible_when='advanced'),
+                    Item("broker_heartbeat_timeout",
+                         label="Worker heartbeat timeout",
+                         visible_when='advanced'),
+                    Item("broker_max_attempts",
+                         label="Workers tried per point",
+                         visible_when='advanced'),
+                    Item("broker_worker_timeout",
+                         label="Timeout without workers",
+                         visible_when='advanced'),
+                    Item("encoding",
+                         label="Parameter encoding",
+                         visible_when='advanced'),
+                    Item("surrogate",
+                         label="Surrogate pre-screening",
+                         visible_when='advanced'),
+                    Item("screening_ratio",
+                         label="Candidates screened per evaluation",
+                         visible_when='advanced'),
+                    Item("exploration",
+                         label="Surrogate exploration weight",
+                         visible_when='advanced'),
+                    Item("fidelity_parameter",
+                         label="Fidelity parameter",
+                         visible_when='advanced'),
+                    Item("fidelity_schedule",
+                         label="Fidelity schedule",
+                         visible_when='advanced'),
+                    Item("fidelity_eta",
+                         label="Fidelity promotion ratio",
+                         visible_when='advanced'),
+                    Item("fidelity_rungs",
+                         label="Number of fidelities",
+                         visible_when='advanced'),
+                    Item("cache_size",
+                         label="Evaluation cache size",
+                         visible_when='advanced'),
+                    Item("cache_tolerance",
+                         label="Evaluation cache tolerance",
+                         visible_when='advanced'),
+                    Item("cache_uses_budget",
+                         label="Cached evaluations use budget?",
+                         visible_when='advanced'),
+                    Item("duplicate_policy",
+                         label="Duplicate candidates",
+                         visible_when='advanced'),
+                    Item("duplicate_memory",
+                         label="Recent evaluations remembered",
+                         visible_when='advanced'),
+                    Item("store_path",
+                         label="Evaluation store file",
+                         visible_when='advanced'),
+                    Item("store_namespace",
+                         label="Evaluation store namespace",
+                         visible_when='advanced'),
+                    Item("checkpoint_path",
+                         label="Checkpoint file",
+                         visible_when='advanced'),
+                    Item("checkpoint_every",
+                         label="Evaluations between checkpoints",
+                         visible_when='advanced'),
+                    Item("checkpoint_interval",
+                         label="Seconds between checkpoints",
+                         visible_when='advanced'),
+                    Item("resume",
+                         label="Resume from last checkpoint?",
+                         visible_when='advanced'),
+                    Item("profile_phases",
+                         label="Time optimization phases?",
+                         visible_when='advanced'),
+                    Item("metrics_path",
+                         label="Metrics file",
+                         visible_when='advanced'),
+                    Item("metrics_format",
+                         label="Metrics file format",
+                         visible_when='advanced'),
+                    Item("metrics_interval",
+                         label="Seconds between metrics exports",
+                         visible_when='advanced'),
+                    Item("progress_every",
+                         label="Evaluations between progress messages",
+                         visible_when='advanced'),
+                    Item("progress_interval",
+                         label="Seconds between progress messages",
+                         visible_when='advanced'),
+                    Item("notify_batch_size",
+                         label="Points reported per progress batch",
+                         visible_when='advanced'),
+                    Item("notify_interval",
+                         label="Seconds before a partial batch is "
+                               "reported",
+                         visible_when='advanced'),
                     label='Advanced Options'
                 )
             )
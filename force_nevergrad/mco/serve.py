@@ -0,0 +1,64 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+""" Evaluates points of a workflow file in a single process kept alive
+between them, in the streaming mode of the NevergradMCOCommunicator:
+
+    echo "#7,1.0,-1.0" | force_nevergrad_serve workflow.json
+
+This is the evaluation command of ``force_nevergrad_worker --stream``.
+"""
+
+import argparse
+import logging
+import sys
+
+from force_bdss.app.bdss_application import BDSSApplication
+from force_bdss.core_plugins.factory_registry_plugin import (
+    FACTORY_REGISTRY_PLUGIN_ID
+)
+from force_bdss.io.workflow_reader import WorkflowReader
+
+from force_nevergrad.mco.ng_mco_communicator import NevergradMCOCommunicator
+
+
+def load_workflow(workflow_file):
+    """ Reads a workflow file, with the factories of the installed
+    force_bdss plugins.
+
+    Return
+    ------
+    Workflow
+        The workflow of the file, which evaluates points as an
+        IEvaluator
+    """
+    # The application loads the plugins, but is not started, so that
+    # its MCO driver does not run
+    application = BDSSApplication(False, workflow_file)
+    factory_registry = application.get_plugin(FACTORY_REGISTRY_PLUGIN_ID)
+    return WorkflowReader(factory_registry).read(workflow_file)
+
+
+def main(argv=None):
+    """ Serves the points of stdin until its end, writing their KPIs to
+    stdout"""
+    parser = argparse.ArgumentParser(
+        description="Evaluates the point on each line of stdin, writing "
+                    "a line of KPIs for each to stdout.")
+    parser.add_argument(
+        "workflow_file", help="Workflow file evaluating the points")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of points with a request ID evaluated concurrently")
+    args = parser.parse_args(argv)
+
+    # Logs go to stderr, as stdout carries the KPIs
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    workflow = load_workflow(args.workflow_file)
+    communicator = NevergradMCOCommunicator(workflow.mco_model.factory)
+    communicator.serve(workflow, max_workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+#  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
+#  All rights reserved.
+
+from traits.api import Any, HasStrictTraits, Instance, provides
+
+from force_bdss.api import IEvaluator
+
+from force_nevergrad.engine.evaluation_store import EvaluationStore
+
+
+@provides(IEvaluator)
+class StoredEvaluator(HasStrictTraits):
+    """ Wraps an evaluator, looking up the KPIs of each point in a
+    persistent EvaluationStore before calling it. Newly evaluated KPIs
+    are added to the store.
+    """
+
+    #: The wrapped evaluator
+    evaluator = Any()
+
+    #: The store of previously evaluated KPIs
+    store = Instance(EvaluationStore)
+
+    @property
+    def mco_model(self):
+        return self.evaluator.mco_model
+
+    def evaluate(self, parameter_values):
+        kpis = self.store.lookup(parameter_values)
+        if kpis is None:
+            kpis = self.evaluator.evaluate(parameter_values)
+            self.store.store(parameter_values, kpis)
+        return kpis
+
+    async def evaluate_async(self, parameter_values):
+        """ Coroutine counterpart of evaluate, for wrapped evaluators
+        that provide an evaluate_async coroutine method"""
+        kpis = self.store.lookup(parameter_values)
+        if kpis is None:
+            kpis = await self.evaluator.evaluate_async(parameter_values)
+            self.store.store(parameter_values, kpis)
+        return kpis
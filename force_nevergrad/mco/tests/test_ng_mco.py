@@ -3,8 +3,15 @@
 
 from unittest import TestCase, mock
 from io import StringIO
+import logging
+import os
+import pickle
+import sys
+import threading
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
+from traits.api import TraitError
 from traits.testing.unittest_tools import UnittestTools
 
 from traitsui.api import View
@@ -20,13 +27,27 @@ from force_bdss.api import (
     BaseMCOParameter
 )
 
+from force_nevergrad.engine.evaluation_store import EvaluationStore
+from force_nevergrad.engine.nevergrad_optimizers import (
+    NevergradMultiOptimizer
+)
+from force_nevergrad.engine.phase_timer import phase_timer
+from force_nevergrad.engine.surrogate import RBFSurrogate
 from force_nevergrad.nevergrad_plugin import NevergradPlugin
-from force_nevergrad.mco.ng_mco import NevergradMCO, NevergradOptimizerEngine
+from force_nevergrad.mco import broker_worker, serve
+from force_nevergrad.mco.broker_worker import SubprocessEvaluator
+from force_nevergrad.mco.ng_mco import (
+    NevergradMCO, NevergradOptimizerEngine, _store_namespace
+)
 from force_nevergrad.mco.ng_mco_factory import NevergradMCOFactory
 from force_nevergrad.mco.ng_mco_model import NevergradMCOModel
 from force_nevergrad.mco.ng_mco_communicator import NevergradMCOCommunicator
+from force_nevergrad.mco.stored_evaluator import StoredEvaluator
 
-from force_nevergrad.tests.probe_classes.workflow import ProbeWorkflow
+from force_nevergrad.tests.probe_classes.workflow import (
+    AsyncProbeWorkflow,
+    ProbeWorkflow
+)
 
 
 class TestNevergradOptimizerEngine(TestCase):
@@ -75,9 +96,46 @@ class TestMCO(TestCase, UnittestTools):
     def test_mco_model(self):
         self.assertEqual(100, self.model.budget)
         self.assertEqual(True, self.model.verbose_run)
+        self.assertEqual("multi", self.model.objective_mode)
+        self.assertEqual("hypervolume", self.model.aggregate_loss)
+        self.assertEqual("sample", self.model.bound_estimation)
+        self.assertEqual(0, self.model.stop_pareto_window)
+        self.assertEqual(0.0, self.model.time_budget)
+        self.assertEqual(0.0, self.model.cost_budget)
+        self.assertEqual(1, self.model.num_workers)
+        self.assertEqual("thread", self.model.executor_type)
+        self.assertEqual("separate", self.model.encoding)
+        self.assertEqual([], self.model.constraints)
+        self.assertEqual("none", self.model.surrogate)
+        self.assertEqual(10, self.model.screening_ratio)
+        self.assertEqual(1.0, self.model.exploration)
+        self.assertEqual("", self.model.fidelity_parameter)
+        self.assertEqual("successive_halving", self.model.fidelity_schedule)
+        self.assertEqual(3, self.model.fidelity_eta)
+        self.assertEqual(0, self.model.cache_size)
+        self.assertEqual("", self.model.broker_address)
+        self.assertEqual(0, self.model.broker_local_workers)
+        self.assertEqual(3, self.model.broker_max_attempts)
+        self.assertEqual(300.0, self.model.broker_worker_timeout)
+        self.assertEqual("evaluate", self.model.duplicate_policy)
+        self.assertEqual(256, self.model.duplicate_memory)
+        self.assertFalse(self.model.profile_phases)
+        self.assertEqual("", self.model.metrics_path)
+        self.assertEqual(1, self.model.notify_batch_size)
         view = self.model.default_traits_view()
         self.assertIsInstance(view, View)
 
+        # Counts and sizes cannot be negative, and batches not empty
+        for name in ["cache_size", "duplicate_memory", "checkpoint_every",
+                     "broker_local_workers", "broker_worker_timeout",
+                     "time_budget", "cost_budget"]:
+            with self.assertRaises(TraitError):
+                setattr(self.model, name, -1)
+        for name in ["progress_every", "notify_batch_size",
+                     "broker_max_attempts"]:
+            with self.assertRaises(TraitError):
+                setattr(self.model, name, 0)
+
     def test_mco_factory(self):
         self.assertIsInstance(self.factory, NevergradMCOFactory)
         self.assertEqual("nevergrad_mco", self.factory.get_identifier())
@@ -114,6 +172,367 @@ class TestMCO(TestCase, UnittestTools):
         with self.assertTraitChanges(workflow.mco_model, "event"):
             mco.run(workflow)
 
+    def test_single_objective_run(self):
+
+        for workflow in [ProbeWorkflow(), AsyncProbeWorkflow()]:
+            workflow.mco_model.objective_mode = "single"
+            workflow.mco_model.verbose_run = False
+            workflow.mco_model.num_workers = 2
+            mco = self.factory.create_optimizer()
+
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+    def test_process_executor_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.executor_type = "process"
+        workflow.mco_model.num_workers = 2
+        workflow.mco_model.budget = 20
+        mco = self.factory.create_optimizer()
+
+        # The evaluator is sent to the processes with each point
+        with self.assertTraitChanges(
+                workflow.mco_model, "event", count=20):
+            mco.run(workflow)
+
+        # Unless it cannot be pickled
+        workflow.lock = threading.Lock()
+        with self.assertRaisesRegex(ValueError, "picklable evaluator"):
+            mco.run(workflow)
+
+        # Which does not matter for the thread executor
+        workflow.mco_model.executor_type = "thread"
+        with self.assertTraitChanges(workflow.mco_model, "event"):
+            mco.run(workflow)
+
+    def test_cached_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.cache_size = 1000
+        mco = self.factory.create_optimizer()
+
+        with self.assertTraitChanges(workflow.mco_model, "event"):
+            mco.run(workflow)
+
+    def test_distributed_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.broker_address = "127.0.0.1:0"
+        workflow.mco_model.broker_local_workers = 2
+        workflow.mco_model.num_workers = 2
+        workflow.mco_model.budget = 20
+        mco = self.factory.create_optimizer()
+
+        # Points are evaluated by the local workers, in other processes
+        with patch.object(ProbeWorkflow, 'evaluate',
+                          side_effect=workflow.evaluate) as mock_evaluate:
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+        mock_evaluate.assert_not_called()
+
+    def test_deduplicated_run(self):
+
+        for policy in ["wait", "reask"]:
+            workflow = ProbeWorkflow()
+            workflow.mco_model.duplicate_policy = policy
+            workflow.mco_model.num_workers = 2
+            mco = self.factory.create_optimizer()
+
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+    def test_constrained_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.constraints = [lambda p: p[0] <= p[1]]
+        mco = self.factory.create_optimizer()
+
+        with patch.object(ProbeWorkflow, 'evaluate',
+                          side_effect=workflow.evaluate) as mock_evaluate:
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+        for call in mock_evaluate.call_args_list:
+            x, y = call[0][0]
+            self.assertLessEqual(x, y)
+
+    def test_multi_fidelity_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.fidelity_parameter = "y"
+        workflow.mco_model.verbose_run = False
+        mco = self.factory.create_optimizer()
+
+        with patch.object(ProbeWorkflow, 'evaluate',
+                          side_effect=workflow.evaluate) as mock_evaluate:
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+        # Candidates are screened at the lower fidelities
+        fidelities = [call[0][0][1] for call in mock_evaluate.call_args_list]
+        self.assertEqual([0.1, 0.3, 1.0], sorted(set(fidelities)))
+        self.assertGreater(len(fidelities), workflow.mco_model.budget)
+
+        workflow.mco_model.fidelity_parameter = "z"
+        with self.assertRaises(ValueError):
+            mco.run(workflow)
+
+    def test_early_stopping_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.stop_pareto_window = 5
+        mco = self.factory.create_optimizer()
+
+        with patch.object(ProbeWorkflow, 'evaluate',
+                          return_value=[1.0, 1.0]) as mock_evaluate:
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+            self.assertLess(mock_evaluate.call_count,
+                            workflow.mco_model.budget)
+
+    def test_cost_budget_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.cost_budget = 1e-9
+        mco = self.factory.create_optimizer()
+
+        with patch.object(ProbeWorkflow, 'evaluate',
+                          return_value=[1.0, 1.0]) as mock_evaluate:
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+            self.assertLess(mock_evaluate.call_count,
+                            workflow.mco_model.budget)
+
+    def test_profiled_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.profile_phases = True
+        mco = self.factory.create_optimizer()
+
+        with self.assertTraitChanges(workflow.mco_model, "event"):
+            mco.run(workflow)
+
+        # The timer is switched off again, but keeps the summary
+        self.assertFalse(phase_timer.enabled)
+        phases = phase_timer.summary()["phases"]
+        for name in ["run", "ask", "evaluate", "translate",
+                     "aggregate_loss", "tell", "notify_progress_event"]:
+            self.assertIn(name, phases)
+        self.assertEqual(
+            workflow.mco_model.budget, phases["translate"]["count"])
+
+    def test_screen_handler_installed_once(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.budget = 20
+        mco = self.factory.create_optimizer()
+        logger = logging.getLogger("force_nevergrad")
+
+        mco.run(workflow)
+        n_handlers = len(logger.handlers)
+        mco.run(workflow)
+        self.assertEqual(n_handlers, len(logger.handlers))
+
+    def test_batched_progress_events(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.notify_batch_size = 7
+        mco = self.factory.create_optimizer()
+
+        # Verbose runs still report every point
+        with self.assertTraitChanges(
+                workflow.mco_model, "event",
+                count=workflow.mco_model.budget):
+            mco.run(workflow)
+
+    def test_surrogate_exploration(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.verbose_run = False
+        workflow.mco_model.surrogate = "rbf"
+        workflow.mco_model.exploration = 0.5
+        mco = self.factory.create_optimizer()
+
+        with patch.object(NevergradMultiOptimizer, "optimize_function",
+                          autospec=True, return_value=iter([])) as optimize:
+            mco.run(workflow)
+
+        optimizer = optimize.call_args[0][0]
+        self.assertIsInstance(optimizer.surrogate, RBFSurrogate)
+        self.assertEqual(0.5, optimizer.exploration)
+
+    def test_streamed_front_removals(self):
+
+        model = ProbeWorkflow().mco_model
+        model.notify_batch_size = 2
+        mco = self.factory.create_optimizer()
+        a, b, c, d = [0.0], [1.0], [2.0], [3.0]
+        removed = []
+
+        def results():
+            yield a, [0.0]
+            yield b, [1.0]
+            yield c, [2.0]
+            # d dominates a, so the front is notified again
+            removed.append(a)
+            yield d, [3.0]
+
+        batches = []
+        with mock.patch.object(
+                NevergradMCO, "_notify_batch",
+                side_effect=lambda model, batch: batches.append(
+                    [point for point, _ in batch])):
+            mco._notify_results(model, results(), removed)
+
+        self.assertEqual([[a, b], [b, c, d], []], batches)
+        self.assertEqual([], removed)
+
+    def test_streamed_front_run(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.verbose_run = False
+        workflow.mco_model.stream_front = True
+        mco = self.factory.create_optimizer()
+
+        with self.assertTraitChanges(workflow.mco_model, "event"):
+            mco.run(workflow)
+
+    def test_metrics_run(self):
+
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metrics.prom')
+            workflow = ProbeWorkflow()
+            workflow.mco_model.metrics_path = path
+            workflow.mco_model.metrics_format = "prometheus"
+            mco = self.factory.create_optimizer()
+
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+            with open(path) as file:
+                text = file.read()
+            self.assertIn("force_nevergrad_evaluations 100.0", text)
+            self.assertIn("force_nevergrad_finished 1.0", text)
+
+    def test_stored_run(self):
+
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'evaluations.db')
+
+            workflow = ProbeWorkflow()
+            workflow.mco_model.store_path = path
+            mco = self.factory.create_optimizer()
+
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+            # Evaluations have been stored for later runs, under a
+            # namespace derived from the parameters and KPIs
+            namespace = _store_namespace(workflow.mco_model)
+            store = EvaluationStore(path, namespace=namespace)
+            self.assertGreater(len(store), 0)
+            self.assertEqual(0, len(EvaluationStore(path)))
+
+    def test_store_namespace(self):
+
+        model = ProbeWorkflow().mco_model
+        namespace = _store_namespace(model)
+        self.assertTrue(namespace.startswith("auto-"))
+        self.assertEqual(namespace, _store_namespace(model))
+
+        # Studies of other KPIs are stored apart
+        model.kpis = model.kpis[:1]
+        self.assertNotEqual(namespace, _store_namespace(model))
+
+        model.store_namespace = "study"
+        self.assertEqual("study", _store_namespace(model))
+
+    def test_checkpointed_run(self):
+
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'run.checkpoint')
+
+            workflow = ProbeWorkflow()
+            workflow.mco_model.checkpoint_path = path
+            workflow.mco_model.checkpoint_every = 10
+            mco = self.factory.create_optimizer()
+
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+            self.assertTrue(os.path.exists(path))
+
+            # Resuming a completed run reports its results again
+            workflow.mco_model.resume = True
+            with self.assertTraitChanges(workflow.mco_model, "event"):
+                mco.run(workflow)
+
+    def test_unsupported_fidelity(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.objective_mode = "single"
+        workflow.mco_model.fidelity_parameter = (
+            workflow.mco_model.parameters[0].name)
+        mco = self.factory.create_optimizer()
+        with self.assertRaisesRegex(ValueError, "fidelity parameter"):
+            mco.run(workflow)
+
+    def test_unsupported_checkpoint(self):
+
+        workflow = ProbeWorkflow()
+        workflow.mco_model.checkpoint_path = "run.checkpoint"
+        mco = self.factory.create_optimizer()
+
+        workflow.mco_model.objective_mode = "single"
+        with self.assertRaisesRegex(ValueError, "Checkpointing"):
+            mco.run(workflow)
+
+        workflow.mco_model.objective_mode = "multi"
+        workflow.mco_model.fidelity_parameter = (
+            workflow.mco_model.parameters[0].name)
+        with self.assertRaisesRegex(ValueError, "Checkpointing"):
+            mco.run(workflow)
+
+        # Constraints are saved in the checkpoints, so must be picklable
+        workflow.mco_model.fidelity_parameter = ""
+        workflow.mco_model.constraints = [lambda mco_values: True]
+        with patch.object(ProbeWorkflow, 'evaluate') as mock_evaluate:
+            with self.assertRaisesRegex(
+                    ValueError, "picklable constraints"):
+                mco.run(workflow)
+            mock_evaluate.assert_not_called()
+
+    def test_stored_evaluator(self):
+
+        with TemporaryDirectory() as tmp_dir:
+            workflow = ProbeWorkflow()
+            evaluator = StoredEvaluator(
+                evaluator=workflow,
+                store=EvaluationStore(os.path.join(tmp_dir, 'test.db'))
+            )
+            self.assertIs(workflow.mco_model, evaluator.mco_model)
+
+            with patch.object(ProbeWorkflow, 'evaluate',
+                              return_value=[1.0, 2.0]) as mock_evaluate:
+                self.assertListEqual(
+                    [1.0, 2.0], list(evaluator.evaluate([0.1, 0.2])))
+                self.assertListEqual(
+                    [1.0, 2.0], list(evaluator.evaluate([0.1, 0.2])))
+                self.assertEqual(1, mock_evaluate.call_count)
+
+    def test_async_run(self):
+
+        # workflow with an evaluate_async coroutine method
+        workflow = AsyncProbeWorkflow()
+        workflow.mco_model.num_workers = 4
+        mco = self.factory.create_optimizer()
+
+        with self.assertTraitChanges(workflow.mco_model, "event"):
+            mco.run(workflow)
+
+        # evaluations were awaited concurrently
+        self.assertEqual(4, workflow.max_running)
+
     def test_communicator(self):
 
         # communicator
@@ -151,3 +570,162 @@ class TestMCO(TestCase, UnittestTools):
             comm.send_to_mco(self.model, kpis)
             # return should be tab-delimited line of KPIs
             self.assertEqual('1.0\t1.0\n', stdout.getvalue())
+
+    def test_communicator_streaming(self):
+
+        comm = NevergradMCOCommunicator(self.factory)
+        workflow = ProbeWorkflow()
+        expected = [str(value) for value in workflow.evaluate([1.0, 2.0])]
+
+        # One line of KPIs per point, with the request ID of the point
+        stdin = StringIO('1.0,2.0\n\n#7,1.0,2.0\n#8\t1.0\t2.0\n')
+        stdout = StringIO()
+        with patch.object(workflow, 'evaluate', side_effect=[
+                workflow.evaluate([1.0, 2.0]),
+                workflow.evaluate([1.0, 2.0]),
+                ValueError('failed')]):
+            self.assertEqual(3, comm.serve(workflow, stdin, stdout))
+        lines = [line.split('\t') for line in stdout.getvalue().splitlines()]
+        self.assertEqual(expected, lines[0])
+        self.assertEqual(['#7'] + expected, lines[1])
+        self.assertEqual(['#8', 'error', "ValueError('failed')"], lines[2])
+
+        # Points with request IDs are replied to as they complete
+        stdin = StringIO(''.join(
+            '#{},1.0,2.0\n'.format(index) for index in range(8)))
+        stdout = StringIO()
+        self.assertEqual(8, comm.serve(workflow, stdin, stdout,
+                                       max_workers=4))
+        lines = [line.split('\t') for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            ['#{}'.format(index) for index in range(8)],
+            sorted(line[0] for line in lines))
+        for line in lines:
+            self.assertEqual(expected, line[1:])
+
+    def test_streaming_subprocess(self):
+
+        workflow = ProbeWorkflow()
+        evaluator = SubprocessEvaluator(
+            command=[
+                sys.executable, '-c',
+                'from force_nevergrad.mco.ng_mco_communicator import '
+                'NevergradMCOCommunicator\n'
+                'from force_nevergrad.tests.probe_classes.workflow import '
+                'ProbeWorkflow\n'
+                'NevergradMCOCommunicator(None).serve(ProbeWorkflow())\n'
+            ],
+            streaming=True
+        )
+
+        # The points are evaluated by the same process
+        try:
+            kpis = evaluator.evaluate([1.0, 2.0])
+            process = evaluator._process
+            self.assertEqual(kpis, evaluator.evaluate([1.0, 2.0]))
+            self.assertIs(process, evaluator._process)
+        finally:
+            evaluator.close()
+
+        self.assertEqual(list(workflow.evaluate([1.0, 2.0])), kpis)
+        self.assertEqual(0, process.returncode)
+
+    def test_subprocess_error_line(self):
+
+        # Points without a request ID that fail are replied to with an
+        # error line, rather than KPIs
+        evaluator = SubprocessEvaluator(
+            command=[
+                sys.executable, '-c',
+                'print("error\\tValueError(\'failed\')")'
+            ]
+        )
+        with self.assertRaisesRegex(RuntimeError, "ValueError"):
+            evaluator.evaluate([1.0, 2.0])
+
+    def test_pickled_subprocess_evaluator(self):
+
+        evaluator = SubprocessEvaluator(
+            command=[
+                sys.executable, '-c',
+                'from force_nevergrad.mco.ng_mco_communicator import '
+                'NevergradMCOCommunicator\n'
+                'from force_nevergrad.tests.probe_classes.workflow import '
+                'ProbeWorkflow\n'
+                'NevergradMCOCommunicator(None).serve(ProbeWorkflow())\n'
+            ],
+            streaming=True
+        )
+        try:
+            kpis = evaluator.evaluate([1.0, 2.0])
+
+            # Worker processes are sent the evaluator without its
+            # streaming process, and start their own
+            evaluate = pickle.loads(pickle.dumps(evaluator.evaluate))
+            self.assertIsNone(evaluate.__self__._process)
+            try:
+                self.assertEqual(kpis, evaluate([1.0, 2.0]))
+                self.assertIsNot(
+                    evaluator._process, evaluate.__self__._process)
+            finally:
+                evaluate.__self__.close()
+        finally:
+            evaluator.close()
+
+    def test_serve_entry_point(self):
+
+        workflow = ProbeWorkflow()
+        expected = [str(value) for value in workflow.evaluate([1.0, 2.0])]
+        stdin = StringIO('#1,1.0,2.0\n#2,1.0,2.0\n')
+        stdout = StringIO()
+        with patch.object(serve, 'load_workflow',
+                          return_value=workflow) as load_workflow, \
+                patch.object(sys, 'stdin', stdin), \
+                patch.object(sys, 'stdout', stdout), \
+                patch.object(serve.logging, 'basicConfig'):
+            self.assertEqual(
+                0, serve.main(['workflow.json', '--workers', '2']))
+        load_workflow.assert_called_once_with('workflow.json')
+        lines = sorted(
+            line.split('\t') for line in stdout.getvalue().splitlines())
+        self.assertEqual([['#1'] + expected, ['#2'] + expected], lines)
+
+        # Streaming workers serve their points through the entry point
+        evaluator = SubprocessEvaluator(
+            workflow_file='workflow.json',
+            command=[
+                sys.executable, '-c',
+                'import sys\n'
+                'from unittest import mock\n'
+                'from force_nevergrad.mco import serve\n'
+                'from force_nevergrad.tests.probe_classes.workflow import '
+                'ProbeWorkflow\n'
+                'with mock.patch.object(serve, "load_workflow", '
+                'return_value=ProbeWorkflow()):\n'
+                '    sys.exit(serve.main(sys.argv[1:]))\n'
+            ],
+            streaming=True
+        )
+        try:
+            kpis = evaluator.evaluate([1.0, 2.0])
+        finally:
+            evaluator.close()
+        self.assertEqual(list(workflow.evaluate([1.0, 2.0])), kpis)
+
+    def test_broker_worker_command(self):
+
+        # Streaming workers default to the serving entry point
+        for options, command in [
+                ([], ['force_bdss', '--evaluate']),
+                (['--stream'], ['force_nevergrad_serve']),
+                (['--stream', '--command', 'serve --fast'],
+                 ['serve', '--fast'])]:
+            with patch.object(broker_worker.multiprocessing,
+                              'Process') as process, \
+                    patch.object(broker_worker.logging, 'basicConfig'):
+                self.assertEqual(0, broker_worker.main(
+                    ['node-1:5555', 'workflow.json'] + options))
+            evaluate = process.call_args[1]['args'][1]
+            self.assertEqual(command, evaluate.__self__.command)
+            self.assertEqual('--stream' in options,
+                             evaluate.__self__.streaming)
@@ -24,6 +24,9 @@ class MockOptimizer:
     def tell(self, x, volume):
         return
 
+    def provide_recommendation(self):
+        return self.ng_params
+
 
 class MockMultiObjectiveFunction:
 
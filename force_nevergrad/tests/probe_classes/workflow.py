@@ -1,6 +1,8 @@
 #  (C) Copyright 2010-2020 Enthought, Inc., Austin, TX
 #  All rights reserved.
 
+import asyncio
+
 from traits.api import Instance, provides
 
 from force_bdss.api import IEvaluator
@@ -26,3 +28,23 @@ class ProbeWorkflow:
 
     def evaluate(self, parameter_values):
         return self.objective_function.objective(parameter_values)
+
+
+class AsyncProbeWorkflow(ProbeWorkflow):
+    """ A ProbeWorkflow that can also be evaluated as a coroutine,
+    as an evaluator waiting on external processes would be.
+    """
+
+    def __init__(self):
+        super().__init__()
+        #: Number of evaluations currently being awaited
+        self.n_running = 0
+        #: Highest number of evaluations awaited at once
+        self.max_running = 0
+
+    async def evaluate_async(self, parameter_values):
+        self.n_running += 1
+        self.max_running = max(self.max_running, self.n_running)
+        await asyncio.sleep(0.001)
+        self.n_running -= 1
+        return self.evaluate(parameter_values)
@@ -28,6 +28,12 @@ setup(
             "force.bdss.extensions": [
                 "force_nevergrad = "
                 "force_nevergrad.nevergrad_plugin:NevergradPlugin"
+            ],
+            "console_scripts": [
+                "force_nevergrad_worker = "
+                "force_nevergrad.mco.broker_worker:main",
+                "force_nevergrad_serve = "
+                "force_nevergrad.mco.serve:main"
             ]
         },
     packages=find_packages(),